@@ -32,16 +32,17 @@ export const apiClient = {
   getStats: () => api.get("/stats"),
 
   // Chat endpoints
-  chat: (query, conversationHistory = null, topK = null) =>
+  chat: (query, userId, conversationHistory = null, topK = null) =>
     api.post("/chat", {
       query,
+      user_id: userId,
       conversation_history: conversationHistory,
       top_k: topK,
       stream: false,
     }),
 
   // Streaming chat endpoint
-  chatStream: async (query, conversationHistory = null, topK = null, onChunk) => {
+  chatStream: async (query, userId, conversationHistory = null, topK = null, onChunk) => {
     const response = await fetch(`${API_BASE_URL}/chat/stream`, {
       method: 'POST',
       headers: {
@@ -49,6 +50,7 @@ export const apiClient = {
       },
       body: JSON.stringify({
         query,
+        user_id: userId,
         conversation_history: conversationHistory,
         top_k: topK,
         stream: true,
@@ -44,6 +44,41 @@ CREATE TABLE IF NOT EXISTS messages (
     FOREIGN KEY(conversation_id) REFERENCES conversations(conversation_id) ON DELETE CASCADE
 );
 
+-- Conversation summaries table (one summary per completed batch of messages)
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    conversation_id TEXT NOT NULL,
+    start_index INTEGER NOT NULL,  -- Position of the first summarized message
+    end_index INTEGER NOT NULL,    -- Position after the last summarized message
+    summary TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(conversation_id, start_index, end_index),
+    FOREIGN KEY(conversation_id) REFERENCES conversations(conversation_id) ON DELETE CASCADE
+);
+
+-- Sources table (catalog of documents indexed in the vector store)
+CREATE TABLE IF NOT EXISTS sources (
+    source_key TEXT PRIMARY KEY,  -- Matches the 'source_key' chunk metadata
+    source_name TEXT NOT NULL,
+    user_id TEXT,
+    org_id TEXT,
+    visibility TEXT NOT NULL DEFAULT 'global',
+    file_type TEXT,
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    content_digest TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Glossary table (acronyms defined in indexed documents, built at ingest)
+CREATE TABLE IF NOT EXISTS glossary (
+    org_id TEXT NOT NULL DEFAULT '',  -- '' for terms from global documents
+    acronym TEXT NOT NULL,
+    expansion TEXT NOT NULL,
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY(org_id, acronym, expansion)
+);
+
 -- Indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
 CREATE INDEX IF NOT EXISTS idx_conversations_org_id ON conversations(org_id);
@@ -52,6 +87,8 @@ CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation
 CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at);
 CREATE INDEX IF NOT EXISTS idx_users_org_id ON users(org_id);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_sources_org_visibility ON sources(org_id, visibility);
+CREATE INDEX IF NOT EXISTS idx_sources_user_id ON sources(user_id);
 
 -- Trigger to update conversations.updated_at on new messages
 CREATE TRIGGER IF NOT EXISTS update_conversation_timestamp
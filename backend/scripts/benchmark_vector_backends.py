@@ -0,0 +1,116 @@
+"""Benchmark the ChromaDB and NumPy vector backends on synthetic embeddings.
+
+Reports ingest throughput, open (startup) time, query latency percentiles and
+recall@k against exact float32 search, so the backend can be chosen per tenant
+size without touching the real collection.
+"""
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add src directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from loguru import logger
+from utils import setup_logging
+from vector_backends import ChromaBackend, NumpyBackend
+
+
+def make_corpus(num_docs: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Generate clustered unit vectors resembling sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, num_docs // 50), dim))
+    assignments = rng.integers(0, len(centers), size=num_docs)
+    vectors = centers[assignments] + 0.5 * rng.normal(size=(num_docs, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, top_k: int) -> list:
+    """Ground-truth neighbours by exact float32 inner product."""
+    scores = queries @ corpus.T
+    return [set(np.argsort(-row)[:top_k]) for row in scores]
+
+
+def run_backend(name: str, open_backend, corpus, queries, truth, top_k, batch_size) -> dict:
+    """Ingest the corpus into a backend and measure search performance."""
+    ids = [str(i) for i in range(len(corpus))]
+    contents = [f"chunk {i}" for i in range(len(corpus))]
+    metadatas = [{"source": f"file_{i % 100}.md", "chunk_index": i} for i in range(len(corpus))]
+
+    backend = open_backend()
+    started = time.perf_counter()
+    for start in range(0, len(corpus), batch_size):
+        end = start + batch_size
+        backend.upsert(ids[start:end], list(corpus[start:end]), contents[start:end], metadatas[start:end])
+    ingest_seconds = time.perf_counter() - started
+    del backend
+
+    started = time.perf_counter()
+    backend = open_backend()
+    open_seconds = time.perf_counter() - started
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        results = backend.query([query], top_k)[0]
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(expected & {int(doc['id']) for doc in results})
+
+    return {
+        "backend": name,
+        "ingest_docs_per_sec": len(corpus) / ingest_seconds,
+        "open_ms": open_seconds * 1000,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "recall": hits / (len(queries) * top_k)
+    }
+
+
+def main(num_docs: int, dim: int, num_queries: int, top_k: int, batch_size: int):
+    """Run the benchmark and log a comparison table."""
+    setup_logging()
+
+    corpus = make_corpus(num_docs, dim)
+    queries = make_corpus(num_queries, dim, seed=1)
+    truth = exact_top_k(corpus, queries, top_k)
+
+    logger.info(f"Benchmarking {num_docs} docs x {dim} dims, {num_queries} queries, top_k={top_k}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        results.append(run_backend(
+            "chroma", lambda: ChromaBackend(tmp / "chroma", "bench", None),
+            corpus, queries, truth, top_k, batch_size
+        ))
+        for dtype in ("float32", "float16"):
+            results.append(run_backend(
+                f"numpy-{dtype}", lambda: NumpyBackend(tmp / f"numpy_{dtype}", "bench", dtype=dtype),
+                corpus, queries, truth, top_k, batch_size
+            ))
+
+    logger.info("=" * 78)
+    logger.info(f"{'backend':<15}{'ingest/s':>12}{'open ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'recall@k':>11}")
+    for r in results:
+        logger.info(
+            f"{r['backend']:<15}{r['ingest_docs_per_sec']:>12.0f}{r['open_ms']:>10.1f}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['recall']:>11.3f}"
+        )
+    logger.info("=" * 78)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ChromaDB against the NumPy exact backend")
+    parser.add_argument("--docs", type=int, default=20000, help="Number of synthetic chunks")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (MiniLM: 384)")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--top-k", type=int, default=5, help="Results per query")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Upsert batch size")
+
+    args = parser.parse_args()
+    main(args.docs, args.dim, args.queries, args.top_k, args.batch_size)
@@ -10,10 +10,17 @@ from loguru import logger
 from config import settings
 from utils import setup_logging
 from document_loader import load_documents
-from vector_store import VectorStore
+from vector_store import VectorStore, build_source_records
+from database import Database
+from glossary import build_glossary_records
 
 
-def main(curated_data: bool = False, program_logs: bool = False):
+def main(
+    curated_data: bool = False,
+    program_logs: bool = False,
+    batch_size: int = None,
+    workers: int = None
+):
     """Main ingestion function."""
     # Setup logging
     setup_logging()
@@ -136,6 +143,7 @@ def main(curated_data: bool = False, program_logs: bool = False):
     # Initialize vector store
     logger.info("Initializing vector store...")
     vector_store = VectorStore()
+    db = Database(str(settings.db_path))
 
     # Check if collection already has documents
     existing_count = vector_store.get_collection_count()
@@ -145,12 +153,23 @@ def main(curated_data: bool = False, program_logs: bool = False):
         if response.lower() in ['yes', 'y']:
             logger.info("Resetting collection...")
             vector_store.reset_collection()
+            db.delete_all_sources()
+            db.delete_glossary()
         else:
-            logger.info("Appending to existing collection...")
+            logger.info("Appending to existing collection (unchanged chunks are skipped)...")
 
     # Ingest documents
     logger.info("Ingesting documents into vector store...")
-    vector_store.add_documents(documents)
+    stats = vector_store.add_documents(documents, batch_size=batch_size, workers=workers)
+
+    # Update the source catalog
+    for record in build_source_records(documents):
+        db.upsert_source(**record)
+
+    # Update the acronym glossary used for local query expansion
+    glossary_terms = build_glossary_records(documents)
+    db.upsert_glossary_terms(glossary_terms)
+    logger.info(f"Glossary terms found: {len(glossary_terms)}")
 
     # Verify ingestion
     final_count = vector_store.get_collection_count()
@@ -159,6 +178,19 @@ def main(curated_data: bool = False, program_logs: bool = False):
     logger.info(f"Total documents in vector store: {final_count}")
     logger.info(f"Collection name: {settings.collection_name}")
     logger.info(f"Embedding model: {settings.embedding_model}")
+    logger.info(
+        f"Batches: {stats.get('batches', 0)} x {stats.get('batch_size', 0)} docs, "
+        f"{stats.get('workers', 0)} worker(s)"
+    )
+    logger.info(
+        f"Chunks embedded: {stats.get('embedded', 0)}, "
+        f"skipped (unchanged): {stats.get('skipped', 0)}, "
+        f"metadata updated: {stats.get('relabelled', 0)}, "
+        f"pruned (stale): {stats.get('pruned', 0)}"
+    )
+    logger.info(f"Embedding throughput: {stats.get('embed_docs_per_sec', 0):.1f} docs/sec")
+    logger.info(f"Write throughput: {stats.get('write_docs_per_sec', 0):.1f} docs/sec")
+    logger.info(f"Overall throughput: {stats.get('docs_per_sec', 0):.1f} docs/sec")
     logger.info("=" * 60)
 
 
@@ -176,13 +208,27 @@ if __name__ == "__main__":
         action="store_true",
         help="Process only data/program_logs directory (character-based chunking)"
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help=f"Documents per embedding batch (default: {settings.embedding_batch_size})"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help=f"Number of embedding worker threads (default: {settings.embedding_workers})"
+    )
 
     args = parser.parse_args()
 
     try:
         main(
             curated_data=args.curated_data,
-            program_logs=args.program_logs
+            program_logs=args.program_logs,
+            batch_size=args.batch_size,
+            workers=args.workers
         )
     except KeyboardInterrupt:
         logger.info("\nIngestion cancelled by user")
@@ -0,0 +1,91 @@
+"""Concurrent load test for a running CTLChat API server.
+
+Fires N chat requests at once while probing /health, and reports how far
+the requests overlapped. If handlers block the event loop, requests run one
+after another: wall time approaches the sum of latencies and /health stalls
+behind them. With blocking work off the loop, wall time stays close to the
+slowest single request and /health answers immediately.
+
+Usage:
+    python scripts/load_test.py --url http://localhost:8000 --user-id <id> --concurrency 8
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+import httpx
+
+# Add src directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from loguru import logger
+from utils import setup_logging
+
+
+async def timed_post(client: httpx.AsyncClient, path: str, payload: dict) -> float:
+    """POST a request and return its latency in seconds."""
+    started = time.perf_counter()
+    response = await client.post(path, json=payload)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> list:
+    """Poll /health until stopped and collect its latencies."""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run(url: str, user_id: str, concurrency: int, query: str, timeout: float):
+    """Run the load test and log a summary."""
+    payload = {"query": query, "user_id": user_id, "stream": False}
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+        # Warm up caches and connections so the first request isn't an outlier
+        baseline = await timed_post(client, "/chat", payload)
+        payload["query"] = f"{query} (load test)"
+
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe_health(client, stop, interval=0.05))
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*[
+            timed_post(client, "/chat", {**payload, "query": f"{payload['query']} #{i}"})
+            for i in range(concurrency)
+        ])
+        wall = time.perf_counter() - started
+
+        stop.set()
+        health = await prober
+
+    total = sum(latencies)
+    logger.info("=" * 60)
+    logger.info(f"Single request (warm-up):    {baseline:.2f}s")
+    logger.info(f"Concurrent requests:         {concurrency}")
+    logger.info(f"Wall time:                   {wall:.2f}s")
+    logger.info(f"Sum of request latencies:    {total:.2f}s")
+    logger.info(f"Slowest request:             {max(latencies):.2f}s")
+    logger.info(f"Overlap factor (sum / wall): {total / wall:.1f}x (1.0x = fully serialized)")
+    if health:
+        logger.info(f"/health during load:         max {max(health) * 1000:.0f} ms over {len(health)} probes")
+    logger.info("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that concurrent API requests do not serialize")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--user-id", required=True, help="ID of an existing user to send the chat requests as")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of simultaneous chat requests")
+    parser.add_argument("--query", default="What services does the organization offer?", help="Chat query")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+
+    args = parser.parse_args()
+    setup_logging()
+    asyncio.run(run(args.url, args.user_id, args.concurrency, args.query, args.timeout))
@@ -0,0 +1,112 @@
+"""Report recall vs. memory of the NumPy backend's quantization modes on our corpus.
+
+Embeds every chunk in the configured vector store (through the embedding
+cache), loads the embeddings into temporary NumPy stores with each
+quantization mode, and measures recall@k against exact float32 search for a
+range of rescore factors, alongside the bytes scanned per search.
+"""
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add src directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from loguru import logger
+from utils import setup_logging
+from vector_store import VectorStore
+from vector_backends import NumpyBackend
+
+
+def load_queries(contents: list, queries_file: str, num_queries: int) -> list:
+    """Load evaluation queries from a file, or sample chunk openings as pseudo-queries."""
+    if queries_file:
+        lines = Path(queries_file).read_text(encoding="utf-8").splitlines()
+        return [line.strip() for line in lines if line.strip()][:num_queries]
+
+    rng = random.Random(0)
+    sample = rng.sample(contents, min(num_queries, len(contents)))
+    return [text[:200] for text in sample]
+
+
+def evaluate(backend: NumpyBackend, queries: list, truth: list, top_k: int) -> tuple:
+    """Measure recall@k and median latency of a backend against ground truth."""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        results = backend.query([query], top_k)[0]
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(expected & {doc['id'] for doc in results})
+    return hits / (len(queries) * top_k), float(np.percentile(latencies, 50))
+
+
+def main(queries_file: str, num_queries: int, top_k: int, rescore_factors: list):
+    """Build the report."""
+    setup_logging()
+
+    vector_store = VectorStore()
+    ids, contents, metadatas = [], [], []
+    for batch_ids, batch_contents, batch_metadatas in vector_store.backend.iter_chunks():
+        ids.extend(batch_ids)
+        contents.extend(batch_contents)
+        metadatas.extend(m or {} for m in batch_metadatas)
+
+    if not ids:
+        logger.error("The vector store is empty; ingest documents first")
+        return
+
+    logger.info(f"Embedding {len(ids)} chunks (cached embeddings are reused)")
+    embeddings = vector_store.embed_texts(contents)
+    queries = vector_store.embed_queries(load_queries(contents, queries_file, num_queries))
+    logger.info(f"Evaluating {len(queries)} queries, top_k={top_k}")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        def build(dtype: str, quantization: str) -> NumpyBackend:
+            backend = NumpyBackend(Path(tmp) / f"{dtype}_{quantization}", "report", dtype, quantization)
+            backend.upsert(ids, embeddings, contents, metadatas)
+            return backend
+
+        exact = build("float32", "none")
+        truth = [{doc['id'] for doc in results} for results in exact.query(queries, top_k)]
+        recall, p50 = evaluate(exact, queries, truth, top_k)
+        rows.append(("float32", "-", exact.index_bytes(), recall, p50))
+
+        for dtype, quantization in (("float16", "none"), ("float16", "int8"), ("float16", "binary")):
+            backend = build(dtype, quantization)
+            factors = rescore_factors if quantization != "none" else [1]
+            for factor in factors:
+                backend.rescore_factor = factor
+                recall, p50 = evaluate(backend, queries, truth, top_k)
+                label = dtype if quantization == "none" else quantization
+                rows.append((label, factor if quantization != "none" else "-", backend.index_bytes(), recall, p50))
+
+    baseline = rows[0][2]
+    logger.info("=" * 78)
+    logger.info(f"{'mode':<10}{'rescore':>8}{'index MB':>11}{'bytes/vec':>11}{'vs f32':>8}{'recall@k':>10}{'p50 ms':>9}")
+    for mode, factor, nbytes, recall, p50 in rows:
+        logger.info(
+            f"{mode:<10}{str(factor):>8}{nbytes / 1e6:>11.2f}{nbytes / exact.capacity:>11.1f}"
+            f"{baseline / nbytes:>7.1f}x{recall:>10.3f}{p50:>9.2f}"
+        )
+    logger.info("=" * 78)
+    logger.info("Quantized modes keep the full-precision matrix on disk for rescoring; "
+                "only the codes need to stay resident")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs. memory report for quantized vector storage")
+    parser.add_argument("--queries-file", help="Text file with one evaluation question per line")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries to evaluate")
+    parser.add_argument("--top-k", type=int, default=5, help="Results per query")
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Shortlist sizes to evaluate, as multiples of top_k")
+
+    args = parser.parse_args()
+    main(args.queries_file, args.queries, args.top_k, args.rescore_factors)
@@ -0,0 +1,49 @@
+"""Rebuild the source catalog and glossary tables from the chunks in the vector store.
+
+Run this once after upgrading an existing deployment, or whenever the catalog
+and the collection may have drifted apart.
+"""
+import sys
+from pathlib import Path
+
+# Add src directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from loguru import logger
+from config import settings
+from utils import setup_logging
+from database import Database
+from vector_store import VectorStore, build_source_records
+from glossary import build_glossary_records
+
+
+def sync_sources():
+    """Scan the collection once and rewrite the source catalog."""
+    setup_logging()
+
+    vector_store = VectorStore()
+    db = Database(str(settings.db_path))
+
+    documents = []
+    for _, contents, metadatas in vector_store.backend.iter_chunks():
+        documents.extend(
+            {'content': content, 'metadata': metadata or {}}
+            for content, metadata in zip(contents, metadatas)
+        )
+
+    records = build_source_records(documents)
+
+    db.delete_all_sources()
+    for record in records:
+        db.upsert_source(**record)
+
+    glossary_terms = build_glossary_records(documents)
+    db.delete_glossary()
+    db.upsert_glossary_terms(glossary_terms)
+
+    logger.info(f"Source catalog rebuilt: {len(records)} sources from {len(documents)} chunks")
+    logger.info(f"Glossary rebuilt: {len(glossary_terms)} terms")
+
+
+if __name__ == "__main__":
+    sync_sources()
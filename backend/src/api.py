@@ -1,7 +1,7 @@
 """FastAPI server for CTLChat RAG application."""
-from typing import List, Optional, Dict, Any
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
@@ -11,8 +11,19 @@ from utils import setup_logging
 from rag_engine import RAGEngine
 from file_handler import process_file_upload
 from database import Database
-from query_preprocessing import preprocess_query, build_search_query
-from conversation_summary import get_conversation_context_string
+from query_preprocessing import (
+    preprocess_query, preprocess_and_summarize, build_search_queries, get_preprocessing_cache,
+    preprocessing_stats, fallback_result
+)
+from conversation_summary import (
+    build_conversation_context, format_context_for_claude, summarize_pending_batches, fallback_summary,
+    is_reusable_span
+)
+from retrieval import build_access_filter
+from concurrency import run_compute, run_db, shutdown_executors
+from llm_client import create_message, close_clients
+from deadline import Deadline
+import asyncio
 import json
 
 
@@ -29,6 +40,8 @@ class ChatRequest(BaseModel):
     conversation_history: Optional[List[ChatMessage]] = None
     top_k: Optional[int] = None
     stream: bool = False
+    user_id: str  # the organization comes from the stored user record
+    selected_sources: Optional[List[str]] = None
 
 
 class ChatResponse(BaseModel):
@@ -42,6 +55,9 @@ class StatsResponse(BaseModel):
     total_documents: int
     collection_name: str
     embedding_model: str
+    cache: Optional[Dict[str, Any]] = None
+    reranker: Optional[Dict[str, Any]] = None
+    query_preprocessing: Optional[Dict[str, Any]] = None
 
 
 class UploadResponse(BaseModel):
@@ -94,6 +110,7 @@ class ChatAnswerResponse(BaseModel):
     full_context: Optional[str] = None
     chart: Optional[Dict[str, Any]] = None
     data: Optional[Any] = None
+    degradations: Optional[Dict[str, str]] = None  # stages degraded to meet the request deadline
 
 
 # Global instances
@@ -126,6 +143,8 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down CTLChat API server...")
+    shutdown_executors()
+    await close_clients()
 
 
 # Create FastAPI app
@@ -146,6 +165,38 @@ app.add_middleware(
 )
 
 
+async def chat_access_filter(request: ChatRequest) -> Dict[str, Any]:
+    """Build the retrieval filter for a stateless chat request.
+
+    The identity comes from the stored user record, the same way
+    send_message() uses the conversation record, so a client cannot read
+    another organization's documents by naming it.
+
+    Args:
+        request: Chat request
+
+    Returns:
+        Where filter for the vector search
+
+    Raises:
+        HTTPException: If no user is given or the user does not exist
+    """
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not initialized")
+    if not request.user_id:
+        raise HTTPException(status_code=400, detail="user_id is required")
+
+    user = await run_db(db.get_user, request.user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return build_access_filter(
+        org_id=user["org_id"],
+        user_id=user["user_id"],
+        selected_sources=request.selected_sources
+    )
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -162,9 +213,10 @@ async def health_check():
     if rag_engine is None:
         raise HTTPException(status_code=503, detail="RAG Engine not initialized")
 
+    stats = await run_compute(rag_engine.get_store_stats)
     return {
         "status": "healthy",
-        "vector_store_documents": rag_engine.get_store_stats()["total_documents"]
+        "vector_store_documents": stats["total_documents"]
     }
 
 
@@ -174,7 +226,12 @@ async def get_stats():
     if rag_engine is None:
         raise HTTPException(status_code=503, detail="RAG Engine not initialized")
 
-    return rag_engine.get_store_stats()
+    stats = await run_compute(rag_engine.get_store_stats)
+    preprocessing_cache = get_preprocessing_cache()
+    if preprocessing_cache is not None:
+        stats["cache"]["query_preprocessing"] = preprocessing_cache.get_stats()
+    stats["query_preprocessing"] = preprocessing_stats.get_stats()
+    return stats
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -190,6 +247,8 @@ async def chat(request: ChatRequest):
     if rag_engine is None:
         raise HTTPException(status_code=503, detail="RAG Engine not initialized")
 
+    access_filter = await chat_access_filter(request)
+
     try:
         logger.info(f"Received chat request: {request.query[:100]}...")
 
@@ -201,16 +260,16 @@ async def chat(request: ChatRequest):
                 for msg in request.conversation_history
             ]
 
-        # Get retrieved documents for sources
-        retrieved_docs = rag_engine.retrieve(request.query, top_k=request.top_k)
-
-        # Generate response
-        response = rag_engine.query(
+        # Retrieve once and generate from the same documents we report as sources
+        result = await rag_engine.aanswer(
             query=request.query,
             top_k=request.top_k,
             conversation_history=conversation_history,
-            stream=False
+            stream=False,
+            filter_metadata=access_filter
         )
+        response = result["answer"]
+        retrieved_docs = result["documents"]
 
         # Format sources
         sources = [
@@ -242,6 +301,8 @@ async def chat_stream(request: ChatRequest):
     if rag_engine is None:
         raise HTTPException(status_code=503, detail="RAG Engine not initialized")
 
+    access_filter = await chat_access_filter(request)
+
     try:
         logger.info(f"Received streaming chat request: {request.query[:100]}...")
 
@@ -254,15 +315,16 @@ async def chat_stream(request: ChatRequest):
             ]
 
         # Generate streaming response
-        response_stream = rag_engine.query(
+        result = await rag_engine.aanswer(
             query=request.query,
             top_k=request.top_k,
             conversation_history=conversation_history,
-            stream=True
+            stream=True,
+            filter_metadata=access_filter
         )
 
         return StreamingResponse(
-            response_stream,
+            result["answer"],
             media_type="text/plain"
         )
 
@@ -297,7 +359,8 @@ async def upload_file(
 
     try:
         # Process the upload using the file handler
-        result = process_file_upload(
+        result = await run_compute(
+            process_file_upload,
             vector_store=rag_engine.vector_store,
             file=file,
             user_id=user_id,
@@ -305,6 +368,12 @@ async def upload_file(
             visibility=visibility
         )
 
+        # Record the source in the catalog used by the sources endpoint
+        if db is not None and result.get("source"):
+            await run_db(db.upsert_source, **result["source"])
+        if db is not None and result.get("glossary"):
+            await run_db(db.upsert_glossary_terms, result["glossary"])
+
         return UploadResponse(
             message="File uploaded and processed successfully",
             filename=result["filename"],
@@ -338,7 +407,7 @@ async def list_conversations(user_id: str = Query(...)):
         raise HTTPException(status_code=503, detail="Database not initialized")
 
     try:
-        conversations = db.get_user_conversations(user_id, limit=100)
+        conversations = await run_db(db.get_user_conversations, user_id, limit=100)
         return {"conversations": conversations}
 
     except Exception as e:
@@ -363,14 +432,15 @@ async def create_conversation(request: ConversationCreate):
         # Get user to determine org_id if not provided
         org_id = request.org_id
         if not org_id:
-            user = db.get_user(request.user_id)
+            user = await run_db(db.get_user, request.user_id)
             if user:
                 org_id = user['org_id']
             else:
                 # Default org for users not in database
                 org_id = "org_sample_001"
 
-        conversation_id = db.create_conversation(
+        conversation_id = await run_db(
+            db.create_conversation,
             user_id=request.user_id,
             org_id=org_id,
             title=request.title or "New Conversation"
@@ -397,7 +467,7 @@ async def get_conversation(conversation_id: str):
         raise HTTPException(status_code=503, detail="Database not initialized")
 
     try:
-        conversation = db.get_conversation_with_messages(conversation_id)
+        conversation = await run_db(db.get_conversation_with_messages, conversation_id)
 
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
@@ -411,13 +481,128 @@ async def get_conversation(conversation_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def store_conversation_summaries(
+    conversation_id: str,
+    summaries: List[Dict[str, Any]]
+):
+    """Persist new batch summaries of a conversation."""
+    for summary in summaries:
+        await run_db(db.add_conversation_summary, conversation_id, **summary)
+
+
+async def update_conversation_summaries(conversation_id: str, org_name: Optional[str]):
+    """Summarize and store newly completed message batches of a conversation.
+
+    Runs as a background task after the assistant reply is saved, so the next
+    turn finds every completed batch already summarized.
+
+    Args:
+        conversation_id: Conversation ID
+        org_name: Optional organization name for context
+    """
+    try:
+        messages = await run_db(db.get_conversation_messages, conversation_id)
+        stored = await run_db(db.get_conversation_summaries, conversation_id)
+        new_summaries = await summarize_pending_batches(messages, stored, org_name)
+        await store_conversation_summaries(conversation_id, new_summaries)
+    except Exception as e:
+        logger.warning(f"Background summarization failed for {conversation_id}: {e}")
+
+
+async def preprocess_and_retrieve(
+    question: str,
+    preprocessing: Awaitable[Dict[str, Any]],
+    access_filter: Optional[Dict[str, Any]],
+    deadline: Optional[Deadline] = None
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Preprocess a question and retrieve documents for it.
+
+    With speculative retrieval, the raw question is searched while
+    preprocessing is still running. If preprocessing misses its deadline
+    (settings.preprocess_deadline_ms, or less if the request deadline leaves
+    less time), the raw-question results are used on their own. Otherwise
+    the raw question is searched together with the enhanced query and
+    related terms, so its candidates are fused before MMR, the adaptive
+    cutoff and re-ranking (its embedding and search are cached by then).
+
+    Args:
+        question: Raw user question
+        preprocessing: Pending preprocess_query() / preprocess_and_summarize() call
+        access_filter: Metadata filter restricting the search
+        deadline: Optional request deadline
+
+    Returns:
+        Tuple of (preprocessing result, retrieved documents)
+    """
+    top_k = settings.top_k_results
+
+    if not settings.speculative_retrieval:
+        preprocessing_result = await preprocessing
+        search_queries = build_search_queries(preprocessing_result)
+        logger.info(f"Enhanced search queries: {search_queries}")
+        docs = await run_compute(
+            rag_engine.retrieve_many, search_queries,
+            top_k=top_k, filter_metadata=access_filter, deadline=deadline
+        )
+        return preprocessing_result, docs
+
+    speculative = asyncio.ensure_future(
+        run_compute(
+            rag_engine.retrieve, question, top_k=top_k, filter_metadata=access_filter, deadline=deadline
+        )
+    )
+    try:
+        timeout = settings.preprocess_deadline_ms / 1000
+        if deadline is not None:
+            timeout = deadline.timeout(timeout)
+        try:
+            preprocessing_result = await asyncio.wait_for(preprocessing, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Preprocessing exceeded {timeout * 1000:.0f} ms, using raw-question results"
+            )
+            if deadline is not None:
+                deadline.degrade("query_rewrite", "preprocessing deadline exceeded")
+            preprocessing_result = fallback_result(
+                question, "Preprocessing deadline exceeded, using original query"
+            )
+            return preprocessing_result, await speculative
+
+        search_queries = build_search_queries(preprocessing_result)
+        logger.info(f"Enhanced search queries: {search_queries}")
+        if search_queries == [question]:
+            return preprocessing_result, await speculative
+
+        docs = await run_compute(
+            rag_engine.retrieve_many, search_queries + [question],
+            top_k=top_k, filter_metadata=access_filter, deadline=deadline
+        )
+        return preprocessing_result, docs
+    finally:
+        # Never leave the speculative search unobserved (its thread still
+        # finishes and fills the caches)
+        if not speculative.done():
+            speculative.cancel()
+        elif not speculative.cancelled() and speculative.exception() is not None:
+            logger.warning(f"Speculative retrieval failed: {speculative.exception()}")
+
+
 @app.post("/conversations/{conversation_id}/messages")
-async def send_message(conversation_id: str, request: MessageRequest):
+async def send_message(
+    conversation_id: str,
+    request: MessageRequest,
+    background_tasks: BackgroundTasks
+):
     """Send a message in a conversation and get AI response.
 
+    The whole call runs under a request deadline (settings.request_deadline_ms):
+    optional stages are skipped or cut short to meet it, and the response
+    lists the degraded stages.
+
     Args:
         conversation_id: Conversation ID
         request: MessageRequest with question and options
+        background_tasks: Tasks run after the response is sent
 
     Returns:
         AI response with sources
@@ -425,21 +610,24 @@ async def send_message(conversation_id: str, request: MessageRequest):
     if db is None or rag_engine is None:
         raise HTTPException(status_code=503, detail="Services not initialized")
 
+    deadline = Deadline(settings.request_deadline_ms, settings.generation_reserve_ms)
+
     try:
         # Verify conversation exists
-        conversation = db.get_conversation(conversation_id)
+        conversation = await run_db(db.get_conversation, conversation_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
 
         # Save user message
-        db.add_message(
+        await run_db(
+            db.add_message,
             conversation_id=conversation_id,
             role="user",
             content=request.question
         )
 
         # Get conversation history (excluding the message we just added)
-        all_messages = db.get_conversation_messages(conversation_id)
+        all_messages = await run_db(db.get_conversation_messages, conversation_id)
         previous_messages = all_messages[:-1]  # Exclude current user message
 
         conversation_history = [
@@ -448,7 +636,7 @@ async def send_message(conversation_id: str, request: MessageRequest):
         ]
 
         # Get organization name for context
-        org = db.get_organization(conversation["org_id"])
+        org = await run_db(db.get_organization, conversation["org_id"])
         org_name = org["org_name"] if org else None
 
         # Generate response based on mode
@@ -458,12 +646,10 @@ async def send_message(conversation_id: str, request: MessageRequest):
 
         if request.mode == "general_knowledge":
             # Use Claude without RAG
-            from anthropic import Anthropic
-            client = Anthropic(api_key=settings.anthropic_api_key)
-
             message_content = conversation_history + [{"role": "user", "content": request.question}]
 
-            response = client.messages.create(
+            response = await create_message(
+                timeout=deadline.timeout(settings.llm_timeout_seconds, optional=False),
                 model=settings.model_name,
                 max_tokens=settings.max_tokens,
                 messages=message_content
@@ -475,30 +661,83 @@ async def send_message(conversation_id: str, request: MessageRequest):
             response_text = "Web search mode is not yet implemented."
 
         else:  # RAG mode
-            # Build conversation context with summarization
-            context_string = get_conversation_context_string(previous_messages, org_name)
+            # Build conversation context from stored batch summaries
+            stored_summaries = await run_db(db.get_conversation_summaries, conversation_id)
+            conversation_context = await build_conversation_context(
+                previous_messages,
+                org_name,
+                stored_summaries=stored_summaries,
+                summarize_pending=not settings.combined_preprocessing,
+                deadline=deadline
+            )
+            await store_conversation_summaries(conversation_id, conversation_context["new_summaries"])
+            context_string = format_context_for_claude(conversation_context)
+
+            # Restrict retrieval to what the conversation owner may see and
+            # the sources they selected
+            access_filter = build_access_filter(
+                org_id=conversation["org_id"],
+                user_id=conversation["user_id"],
+                selected_sources=request.selected_sources
+            )
 
             # Preprocess query with conversation context
-            preprocessing_result = preprocess_query(
-                query=request.question,
-                org_name=org_name,
-                conversation_context=context_string if context_string else None
+            pending_messages = conversation_context["pending_messages"]
+            if pending_messages:
+                # Older messages without a stored summary: summarize them in
+                # the same LLM call as preprocessing instead of a call before it
+                preprocessing = preprocess_and_summarize(
+                    query=request.question,
+                    messages_to_summarize=pending_messages,
+                    org_name=org_name,
+                    conversation_context=context_string if context_string else None,
+                    deadline=deadline
+                )
+            else:
+                glossary = None
+                if settings.preprocess_fast_path:
+                    glossary = await run_db(db.get_glossary, conversation["org_id"])
+                preprocessing = preprocess_query(
+                    query=request.question,
+                    org_name=org_name,
+                    conversation_context=context_string if context_string else None,
+                    glossary=glossary,
+                    deadline=deadline
+                )
+
+            # Get relevant documents using the enhanced query
+            preprocessing_result, retrieved_docs = await preprocess_and_retrieve(
+                request.question, preprocessing, access_filter, deadline
             )
 
-            # Build enhanced search query
-            search_query = build_search_query(preprocessing_result)
-
-            logger.info(f"Enhanced search query: {search_query}")
-
-            # Get relevant documents using enhanced query
-            retrieved_docs = rag_engine.retrieve(search_query, top_k=5)
-
-            # Generate response with RAG using conversation context
-            response_text = rag_engine.query(
+            if pending_messages:
+                summary = preprocessing_result.get("conversation_summary")
+                conversation_context["summaries"].insert(
+                    conversation_context["pending_summary_index"],
+                    summary or fallback_summary(len(pending_messages))
+                )
+                start = conversation_context["pending_start_index"]
+                end = start + len(pending_messages)
+                # A summary spanning several batches is only reused in hierarchical
+                # mode; otherwise the background task stores per-batch summaries
+                if summary and is_reusable_span(start, end):
+                    await store_conversation_summaries(conversation_id, [{
+                        "start_index": start,
+                        "end_index": end,
+                        "summary": summary
+                    }])
+
+            # Generate response grounded on the same documents we report as sources
+            result = await rag_engine.aanswer(
                 query=request.question,
+                documents=retrieved_docs,
                 conversation_history=conversation_history,
-                stream=False
+                stream=False,
+                summaries=conversation_context["summaries"],
+                deadline=deadline
             )
+            response_text = result["answer"]
+            retrieved_docs = result["documents"]
 
             # Extract sources
             sources_used = list(set([
@@ -512,7 +751,8 @@ async def send_message(conversation_id: str, request: MessageRequest):
                 logger.info(f"Related terms: {', '.join(preprocessing_result['related_terms'][:5])}")
 
         # Save assistant response
-        db.add_message(
+        await run_db(
+            db.add_message,
             conversation_id=conversation_id,
             role="assistant",
             content=response_text
@@ -521,14 +761,23 @@ async def send_message(conversation_id: str, request: MessageRequest):
         # Update conversation title if this is the first message
         if len(all_messages) == 1:  # Only user message exists
             title = request.question[:50] + "..." if len(request.question) > 50 else request.question
-            db.update_conversation_title(conversation_id, title)
+            await run_db(db.update_conversation_title, conversation_id, title)
+
+        # Summarize any batch completed by this exchange once the response is sent
+        background_tasks.add_task(update_conversation_summaries, conversation_id, org_name)
+
+        logger.info(
+            f"Answered in {deadline.elapsed_ms():.0f} of {settings.request_deadline_ms} ms"
+            + (f", degraded: {', '.join(deadline.degradations)}" if deadline.degradations else "")
+        )
 
         return ChatAnswerResponse(
             answer=response_text,
             sources_used=sources_used,
             full_context=None,
             chart=None,
-            data=None
+            data=None,
+            degradations=dict(deadline.degradations) or None
         )
 
     except HTTPException:
@@ -539,53 +788,53 @@ async def send_message(conversation_id: str, request: MessageRequest):
 
 
 @app.get("/organizations/{org_id}/sources")
-async def get_organization_sources(org_id: str, user_id: str = Query(...)):
-    """Get all document sources for an organization.
+async def get_organization_sources(
+    org_id: str,
+    user_id: str = Query(...),
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """Get the document sources a user can select within an organization.
 
-    This endpoint returns documents/sources uploaded to the vector store.
+    Returns org-wide sources of the organization and the user's own uploads
+    from the source catalog, which is maintained at upload and ingest time.
 
     Args:
         org_id: Organization ID
         user_id: User ID
+        limit: Maximum number of sources to return
+        offset: Number of sources to skip
 
     Returns:
-        List of sources
+        Page of sources with the total count
     """
-    if rag_engine is None:
-        raise HTTPException(status_code=503, detail="RAG Engine not initialized")
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not initialized")
 
     try:
-        # Get all documents from vector store
-        # This is a simplified implementation - you may want to enhance this
-        # to filter by org_id and user_id from metadata
-
-        collection = rag_engine.vector_store.collection
-
-        # Get all unique sources from the collection
-        results = collection.get(include=['metadatas'])
-
-        sources_dict = {}
-        if results and results['metadatas']:
-            for metadata in results['metadatas']:
-                source = metadata.get('source', 'Unknown')
-                visibility = metadata.get('visibility', 'personal')
-                doc_user_id = metadata.get('user_id', '')
-                doc_org_id = metadata.get('org_id', '')
-
-                # Filter by org and user
-                if doc_org_id == org_id or doc_user_id == user_id:
-                    if source not in sources_dict:
-                        sources_dict[source] = {
-                            'source_id': source,
-                            'name': source,
-                            'visibility': visibility,
-                            'user_id': doc_user_id,
-                            'org_id': doc_org_id
-                        }
-
-        sources = list(sources_dict.values())
-
-        return {"sources": sources}
+        page = await run_db(db.get_accessible_sources, org_id, user_id, limit=limit, offset=offset)
+
+        sources = [
+            {
+                'source_id': row['source_name'],
+                'name': row['source_name'],
+                'visibility': row['visibility'],
+                'user_id': row['user_id'],
+                'org_id': row['org_id'],
+                'file_type': row['file_type'],
+                'chunk_count': row['chunk_count'],
+                'size_bytes': row['size_bytes'],
+                'updated_at': row['updated_at']
+            }
+            for row in page["sources"]
+        ]
+
+        return {
+            "sources": sources,
+            "total": page["total"],
+            "limit": limit,
+            "offset": offset
+        }
 
     except Exception as e:
         logger.error(f"Error retrieving sources: {e}")
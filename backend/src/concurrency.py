@@ -0,0 +1,63 @@
+"""Thread pools for running blocking work off the asyncio event loop.
+
+CPU-bound work (embedding, vector search, re-ranking, document parsing)
+and SQLite access each get their own bounded pool, so a burst of one kind
+of work cannot starve the other and neither blocks the event loop.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+from loguru import logger
+from config import settings
+
+T = TypeVar("T")
+
+# Embedding, vector search, re-ranking and file processing
+compute_executor = ThreadPoolExecutor(
+    max_workers=settings.compute_threads,
+    thread_name_prefix="compute"
+)
+
+# SQLite access (application database, catalogs, caches)
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.db_threads,
+    thread_name_prefix="db"
+)
+
+
+async def run_compute(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run CPU-bound work in the compute pool.
+
+    Args:
+        func: Blocking function to call
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(compute_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run database work in the DB pool.
+
+    Args:
+        func: Blocking function to call
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    """Wait for queued work and stop the pools (called on server shutdown)."""
+    compute_executor.shutdown(wait=True)
+    db_executor.shutdown(wait=True)
+    logger.info("Worker thread pools shut down")
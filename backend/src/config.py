@@ -1,6 +1,7 @@
 """Configuration management for CTLChat RAG application."""
 import os
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -17,22 +18,116 @@ class Settings(BaseSettings):
     max_tokens: int = int(os.getenv("MAX_TOKENS", "4096"))
     temperature: float = float(os.getenv("TEMPERATURE", "0.7"))
 
-    # ChromaDB Configuration
+    # Shared LLM Client Configuration (connection pool and timeouts)
+    llm_timeout_seconds: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    llm_connect_timeout_seconds: float = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+    llm_aux_timeout_seconds: float = float(os.getenv("LLM_AUX_TIMEOUT_SECONDS", "15"))  # preprocessing, summaries
+    llm_vision_timeout_seconds: float = float(os.getenv("LLM_VISION_TIMEOUT_SECONDS", "120"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    llm_max_keepalive_connections: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    llm_keepalive_seconds: float = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+
+    # Vector Store Configuration (VECTOR_BACKEND: chroma or numpy)
+    vector_backend: str = os.getenv("VECTOR_BACKEND", "chroma")
     chroma_db_path: str = os.getenv("CHROMA_DB_PATH", "./chroma_db")
     collection_name: str = os.getenv("COLLECTION_NAME", "ctl_chat_docs")
+    numpy_store_path: str = os.getenv("NUMPY_STORE_PATH", "./numpy_store")
+    numpy_store_dtype: str = os.getenv("NUMPY_STORE_DTYPE", "float16")
+    numpy_store_quantization: str = os.getenv("NUMPY_STORE_QUANTIZATION", "none")
+    quantization_rescore_factor: int = int(os.getenv("QUANTIZATION_RESCORE_FACTOR", "8"))
 
     # Document Processing Configuration
     chunk_size: int = int(os.getenv("CHUNK_SIZE", "1000"))
     chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "200"))
     top_k_results: int = int(os.getenv("TOP_K_RESULTS", "5"))
 
+    # Context Assembly Configuration
+    context_merge_chunks: bool = os.getenv("CONTEXT_MERGE_CHUNKS", "true").lower() == "true"
+    context_neighbour_window: int = int(os.getenv("CONTEXT_NEIGHBOUR_WINDOW", "0"))
+    context_expansion_chars: int = int(os.getenv("CONTEXT_EXPANSION_CHARS", "2000"))
+
+    # Prompt Token Budget (estimated locally; history and summaries are capped, context gets the rest)
+    prompt_token_budget: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "12000"))
+    history_token_budget: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+    summary_token_budget: int = int(os.getenv("SUMMARY_TOKEN_BUDGET", "800"))
+
+    # Conversation Summaries (SUMMARY_MODE: batches or hierarchical)
+    summary_mode: str = os.getenv("SUMMARY_MODE", "batches")
+    summary_fanout: int = int(os.getenv("SUMMARY_FANOUT", "4"))  # summaries combined into one
+    summary_token_ceiling: int = int(os.getenv("SUMMARY_TOKEN_CEILING", "600"))
+    # Summarize unsummarized older messages in the query preprocessing call
+    combined_preprocessing: bool = os.getenv("COMBINED_PREPROCESSING", "false").lower() == "true"
+
+    # Retrieval Configuration
+    search_mode: str = os.getenv("SEARCH_MODE", "dense")  # dense, hybrid
+    lexical_index_path: str = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index.db")
+    hybrid_candidate_multiplier: int = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "4"))
+    rrf_k: int = int(os.getenv("RRF_K", "60"))
+    filter_oversample_factor: int = int(os.getenv("FILTER_OVERSAMPLE_FACTOR", "4"))
+    mmr_enabled: bool = os.getenv("MMR_ENABLED", "false").lower() == "true"
+    mmr_lambda: float = float(os.getenv("MMR_LAMBDA", "0.5"))
+    mmr_candidate_multiplier: int = int(os.getenv("MMR_CANDIDATE_MULTIPLIER", "4"))
+
+    # Adaptive top_k (distances are squared L2 between normalized embeddings, 0-4)
+    adaptive_k_enabled: bool = os.getenv("ADAPTIVE_K_ENABLED", "false").lower() == "true"
+    adaptive_min_k: int = int(os.getenv("ADAPTIVE_MIN_K", "2"))
+    adaptive_max_k: int = int(os.getenv("ADAPTIVE_MAX_K", "5"))
+    adaptive_max_distance: float = float(os.getenv("ADAPTIVE_MAX_DISTANCE", "1.4"))
+    adaptive_max_gap: float = float(os.getenv("ADAPTIVE_MAX_GAP", "0.25"))
+
+    # Cross-encoder Re-ranking Configuration
+    rerank_enabled: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    rerank_model: str = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    rerank_candidates: int = int(os.getenv("RERANK_CANDIDATES", "20"))
+    rerank_batch_size: int = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+    rerank_score_threshold: Optional[float] = (
+        float(os.getenv("RERANK_SCORE_THRESHOLD")) if os.getenv("RERANK_SCORE_THRESHOLD") else None
+    )
+    rerank_latency_budget_ms: int = int(os.getenv("RERANK_LATENCY_BUDGET_MS", "500"))
+
     # Embedding Model
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    embedding_workers: int = int(os.getenv("EMBEDDING_WORKERS", "1"))
+
+    # Embedding Cache Configuration
+    embedding_cache_enabled: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    embedding_cache_path: str = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")
+    embedding_cache_max_mb: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+
+    # In-process Query Cache Configuration (query embeddings and retrieval results)
+    query_cache_size: int = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+    query_cache_ttl_seconds: int = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+
+    # Query Preprocessing Fast Path (skip the LLM rewrite for self-contained keyword queries)
+    preprocess_fast_path: bool = os.getenv("PREPROCESS_FAST_PATH", "false").lower() == "true"
+    fast_path_min_terms: int = int(os.getenv("FAST_PATH_MIN_TERMS", "3"))  # content words required
+    fast_path_max_words: int = int(os.getenv("FAST_PATH_MAX_WORDS", "16"))  # longer queries use the LLM
+
+    # Speculative retrieval on the raw question while preprocessing runs
+    speculative_retrieval: bool = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+    preprocess_deadline_ms: int = int(os.getenv("PREPROCESS_DEADLINE_MS", "1500"))  # then use raw-query results
+
+    # Request deadline: optional stages are skipped once only the generation reserve is left
+    request_deadline_ms: int = int(os.getenv("REQUEST_DEADLINE_MS", "20000"))
+    generation_reserve_ms: int = int(os.getenv("GENERATION_RESERVE_MS", "10000"))
+    optional_llm_min_ms: int = int(os.getenv("OPTIONAL_LLM_MIN_MS", "1000"))  # skip summaries/rewrite below this
+
+    # Query Preprocessing Cache Configuration (in-process LRU in front of SQLite)
+    preprocess_cache_enabled: bool = os.getenv("PREPROCESS_CACHE_ENABLED", "true").lower() == "true"
+    preprocess_cache_path: str = os.getenv("PREPROCESS_CACHE_PATH", "./preprocess_cache.db")
+    preprocess_cache_size: int = int(os.getenv("PREPROCESS_CACHE_SIZE", "1024"))
+    preprocess_cache_ttl_seconds: int = int(os.getenv("PREPROCESS_CACHE_TTL_SECONDS", "86400"))
 
     # API Server Configuration
     api_host: str = os.getenv("API_HOST", "0.0.0.0")
     api_port: int = int(os.getenv("API_PORT", "8000"))
 
+    # Worker thread pools for blocking work in request handlers
+    compute_threads: int = int(os.getenv("COMPUTE_THREADS", "4"))  # embedding, search, re-ranking
+    db_threads: int = int(os.getenv("DB_THREADS", "8"))  # SQLite access
+
     # Logging
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     log_dir: str = os.getenv("LOG_DIR", "./logs")
@@ -51,6 +146,26 @@ class Settings(BaseSettings):
         """Path to ChromaDB storage."""
         return Path(__file__).parent.parent / self.chroma_db_path
 
+    @property
+    def numpy_store_dir(self) -> Path:
+        """Path to the NumPy vector store directory."""
+        return Path(__file__).parent.parent / self.numpy_store_path
+
+    @property
+    def lexical_index_file(self) -> Path:
+        """Path to the BM25 lexical index (kept next to ChromaDB storage)."""
+        return Path(__file__).parent.parent / self.lexical_index_path
+
+    @property
+    def embedding_cache_file(self) -> Path:
+        """Path to the persistent embedding cache (kept next to ChromaDB storage)."""
+        return Path(__file__).parent.parent / self.embedding_cache_path
+
+    @property
+    def preprocess_cache_file(self) -> Path:
+        """Path to the persistent query preprocessing cache."""
+        return Path(__file__).parent.parent / self.preprocess_cache_path
+
     @property
     def logs_path(self) -> Path:
         """Path to logs directory."""
@@ -0,0 +1,191 @@
+"""Assemble retrieved chunks into coherent passages for the LLM context."""
+from typing import Any, Dict, List, Optional, Tuple
+
+# Shortest suffix/prefix match treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+def chunk_group(metadata: Dict[str, Any]) -> Tuple[str, str]:
+    """Identify the document a chunk was cut from.
+
+    Args:
+        metadata: Chunk metadata
+
+    Returns:
+        (metadata field, value) pair: the chunk's source key, falling back to
+        its file path or source name for chunks ingested before source keys
+    """
+    for field in ('source_key', 'file_path'):
+        if metadata.get(field):
+            return field, str(metadata[field])
+    return 'source', str(metadata.get('source', ''))
+
+
+def remove_overlap(previous: str, following: str, max_overlap: int) -> str:
+    """Join two consecutive chunks, dropping the text they share.
+
+    chunk_text() repeats the tail of each chunk at the head of the next one;
+    the longest suffix of `previous` that is also a prefix of `following`
+    is kept only once.
+
+    Args:
+        previous: Earlier chunk text
+        following: Next chunk text
+        max_overlap: Longest overlap to look for, in characters
+
+    Returns:
+        Combined text
+    """
+    longest = min(len(previous), len(following), max_overlap)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:size]):
+            return previous + following[size:]
+    return previous + "\n" + following
+
+
+def merge_adjacent_chunks(
+    documents: List[Dict[str, Any]],
+    max_overlap: int
+) -> List[Dict[str, Any]]:
+    """Merge hits that are neighbours in the same document into contiguous spans.
+
+    Hits are grouped by document, sorted by chunk_index and merged whenever
+    their indices are consecutive (or equal), with overlapping text removed.
+    Spans are ordered by the best retrieval rank of any chunk they contain.
+
+    Args:
+        documents: Retrieved documents in rank order
+        max_overlap: Longest overlap between consecutive chunks, in characters
+
+    Returns:
+        List of spans, each a document dict whose metadata is that of its first
+        chunk, with added 'chunk_indices' and 'ids' of the merged chunks
+    """
+    groups: Dict[Tuple[str, str], List[tuple]] = {}
+    for rank, doc in enumerate(documents):
+        metadata = doc.get('metadata') or {}
+        groups.setdefault(chunk_group(metadata), []).append((rank, doc))
+
+    spans = []
+    for members in groups.values():
+        # Chunks without an index cannot be placed relative to others
+        indexed = []
+        for rank, doc in members:
+            if isinstance((doc.get('metadata') or {}).get('chunk_index'), int):
+                indexed.append((rank, doc))
+            else:
+                spans.append((rank, _start_span(doc)))
+
+        indexed.sort(key=lambda m: m[1]['metadata']['chunk_index'])
+        current = None
+        current_rank = None
+        for rank, doc in indexed:
+            index = doc['metadata']['chunk_index']
+            if current is not None and index <= current['chunk_indices'][-1] + 1:
+                if index > current['chunk_indices'][-1]:
+                    current['content'] = remove_overlap(current['content'], doc.get('content', ''), max_overlap)
+                    current['chunk_indices'].append(index)
+                current['ids'].append(doc.get('id'))
+                current_rank = min(current_rank, rank)
+                _keep_best_score(current, doc)
+                continue
+            if current is not None:
+                spans.append((current_rank, current))
+            current, current_rank = _start_span(doc), rank
+        if current is not None:
+            spans.append((current_rank, current))
+
+    spans.sort(key=lambda item: item[0])
+    return [span for _, span in spans]
+
+
+def _start_span(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Start a span from a single document."""
+    span = dict(doc)
+    span['content'] = doc.get('content', '')
+    index = (doc.get('metadata') or {}).get('chunk_index')
+    span['chunk_indices'] = [index] if isinstance(index, int) else []
+    span['ids'] = [doc.get('id')]
+    return span
+
+
+def _keep_best_score(span: Dict[str, Any], doc: Dict[str, Any]) -> None:
+    """Carry the best distance / score of the merged chunks onto the span."""
+    if doc.get('distance') is not None and (
+        span.get('distance') is None or doc['distance'] < span['distance']
+    ):
+        span['distance'] = doc['distance']
+    for key in ('rrf_score', 'rerank_score'):
+        if doc.get(key) is not None and (span.get(key) is None or doc[key] > span[key]):
+            span[key] = doc[key]
+
+
+def neighbour_indices(
+    documents: List[Dict[str, Any]],
+    window: int,
+    char_budget: int
+) -> Dict[Tuple[str, str], List[int]]:
+    """Choose neighbouring chunks to add around the strongest hits.
+
+    Hits are expanded in rank order, nearest neighbours first and up to
+    `window` chunks to each side, until the estimated extra text (the hit's
+    length per added chunk) reaches char_budget. Chunks identified only by
+    their source name are not expanded, since the name alone does not tell
+    apart same-named uploads of different users.
+
+    Args:
+        documents: Retrieved documents in rank order
+        window: Chunks to add on each side of a hit
+        char_budget: Maximum extra characters to add
+
+    Returns:
+        Mapping of chunk group (see chunk_group) to the chunk indices to fetch
+    """
+    present = {
+        (chunk_group(doc.get('metadata') or {}), (doc.get('metadata') or {}).get('chunk_index'))
+        for doc in documents
+    }
+    wanted: Dict[Tuple[str, str], List[int]] = {}
+    budget = char_budget
+    for doc in documents:
+        metadata = doc.get('metadata') or {}
+        index = metadata.get('chunk_index')
+        group = chunk_group(metadata)
+        if not isinstance(index, int) or group[0] == 'source':
+            continue
+        total = metadata.get('total_chunks')
+        chunk_chars = max(1, len(doc.get('content', '')))
+        for offset in range(1, window + 1):
+            for neighbour in (index - offset, index + offset):
+                if neighbour < 0 or (isinstance(total, int) and neighbour >= total):
+                    continue
+                if (group, neighbour) in present:
+                    continue
+                if budget < chunk_chars:
+                    return wanted
+                wanted.setdefault(group, []).append(neighbour)
+                present.add((group, neighbour))
+                budget -= chunk_chars
+    return wanted
+
+
+def assemble_context(
+    documents: List[Dict[str, Any]],
+    max_overlap: int,
+    neighbours: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """Build the passages sent to the LLM from retrieved documents.
+
+    Args:
+        documents: Retrieved documents in rank order
+        max_overlap: Longest overlap between consecutive chunks, in characters
+        neighbours: Optional neighbouring chunks fetched for expansion; they
+            are merged into the spans of the hits they border
+
+    Returns:
+        Merged spans in rank order
+    """
+    if neighbours:
+        # Neighbours rank after every hit, so spans keep the hits' order
+        documents = list(documents) + list(neighbours)
+    return merge_adjacent_chunks(documents, max_overlap)
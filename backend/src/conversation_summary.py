@@ -3,20 +3,26 @@ Conversation summarization for efficient context management.
 Summarizes conversation history to reduce token usage while maintaining context.
 """
 
-import anthropic
+import asyncio
+import math
+from typing import Optional
 from loguru import logger
 from config import settings
+from deadline import Deadline
+from llm_client import create_message
+from token_budget import estimate_tokens
 
 MESSAGES_PER_SUMMARY = 10  # Summarize every 10 messages (5 user + 5 assistant)
 
 
-def summarize_messages(messages: list, org_name: str = None) -> str:
+async def summarize_messages(messages: list, org_name: str = None, fallback: bool = True) -> str:
     """
     Create a concise summary of a batch of conversation messages.
 
     Args:
         messages: List of message dicts with 'role' and 'content'
         org_name: Optional organization name for context
+        fallback: Return a generic summary if the LLM call fails (otherwise raise)
 
     Returns:
         Summary string capturing key points and context
@@ -24,8 +30,6 @@ def summarize_messages(messages: list, org_name: str = None) -> str:
     if not messages:
         return ""
 
-    client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
-
     # Format messages for summary
     conversation_text = ""
     for msg in messages:
@@ -65,7 +69,8 @@ Provide a brief summary in 2-4 sentences."""
     logger.info(f"📝 Summarizing {len(messages)} messages...")
 
     try:
-        message = client.messages.create(
+        message = await create_message(
+            timeout=settings.llm_aux_timeout_seconds,
             model=settings.model_name,
             max_tokens=256,
             system=system_prompt,
@@ -80,24 +85,305 @@ Provide a brief summary in 2-4 sentences."""
 
     except Exception as e:
         logger.warning(f"⚠️ Summarization failed: {e}")
+        if not fallback:
+            raise
         # Fallback: create a simple summary
-        return f"Previous discussion covered {len(messages)} messages about various topics."
+        return fallback_summary(len(messages))
+
+
+def fallback_summary(message_count: int) -> str:
+    """Generic summary used when summarization fails (never stored)."""
+    return f"Previous discussion covered {message_count} messages about various topics."
+
+
+async def combine_summaries(summaries: list, org_name: str = None) -> str:
+    """
+    Combine summaries of consecutive parts of a conversation into one.
+
+    Args:
+        summaries: Summary strings, oldest first
+        org_name: Optional organization name for context
+
+    Returns:
+        Combined summary string
+
+    Raises:
+        Exception: If the LLM call fails
+    """
+    org_context = f" for {org_name}" if org_name else ""
+
+    system_prompt = f"""You are a conversation summarizer{org_context}.
+
+You are given summaries of consecutive parts of one conversation, oldest first.
+Combine them into a single concise summary (3-5 sentences) that keeps the main
+topics, key facts and decisions, and anything needed to understand follow-up
+questions. Drop details that later parts made obsolete."""
+
+    parts = "\n\n".join(f"Part {i}: {summary}" for i, summary in enumerate(summaries, 1))
+    user_message = f"""Combine these conversation summaries:
+
+{parts}
+
+Provide a single summary in 3-5 sentences."""
+
+    logger.info(f"📝 Combining {len(summaries)} summaries...")
+
+    message = await create_message(
+        timeout=settings.llm_aux_timeout_seconds,
+        model=settings.model_name,
+        max_tokens=384,
+        system=system_prompt,
+        messages=[
+            {"role": "user", "content": user_message}
+        ]
+    )
+    return message.content[0].text.strip()
+
+
+def completed_batches(message_count: int) -> list:
+    """Message ranges of the completed summary batches of a conversation.
+
+    Args:
+        message_count: Number of messages in the conversation
+
+    Returns:
+        List of (start_index, end_index) tuples, end exclusive
+    """
+    return [
+        (start, start + MESSAGES_PER_SUMMARY)
+        for start in range(0, message_count - MESSAGES_PER_SUMMARY + 1, MESSAGES_PER_SUMMARY)
+    ]
+
+
+def is_reusable_span(start_index: int, end_index: int) -> bool:
+    """Check whether a stored summary of messages [start_index, end_index) would be used.
+
+    Batch mode (settings.summary_mode) only uses summaries of exactly one
+    batch; hierarchical mode uses summaries of any batch-aligned range.
+
+    Args:
+        start_index: Position of the first summarized message
+        end_index: Position after the last summarized message
+
+    Returns:
+        True if the summary is worth storing
+    """
+    if settings.summary_mode == "hierarchical":
+        return True
+    return end_index - start_index == MESSAGES_PER_SUMMARY
+
+
+def summary_level(summary: dict, fanout: int) -> int:
+    """Level of a summary in the hierarchy: 0 for a batch, +1 per combination.
+
+    Args:
+        summary: Summary dict with 'start_index' and 'end_index'
+        fanout: Number of summaries combined into one
+
+    Returns:
+        Level of the summary
+    """
+    batches = (summary["end_index"] - summary["start_index"]) / MESSAGES_PER_SUMMARY
+    if batches <= 1:
+        return 0
+    return round(math.log(batches, max(fanout, 2)))
 
 
-def build_conversation_context(messages: list, org_name: str = None) -> dict:
+def covering_summaries(summaries: list, end_index: int, hierarchical: bool = True) -> list:
+    """Pick the summaries that together cover messages [0, end_index).
+
+    From the oldest message onwards, the summary covering the longest range
+    is used, so combined summaries replace the summaries they were made of.
+
+    Args:
+        summaries: Summary dicts with 'start_index', 'end_index' and 'summary'
+        end_index: Position after the last message to cover
+        hierarchical: Use combined summaries (otherwise only batch summaries)
+
+    Returns:
+        Summary dicts in conversation order; coverage stops at the first gap
+    """
+    longest = {}
+    for summary in summaries:
+        span = summary["end_index"] - summary["start_index"]
+        if summary["end_index"] > end_index:
+            continue
+        if not hierarchical and span != MESSAGES_PER_SUMMARY:
+            continue
+        current = longest.get(summary["start_index"])
+        if current is None or summary["end_index"] > current["end_index"]:
+            longest[summary["start_index"]] = summary
+
+    cover = []
+    position = 0
+    while position < end_index and position in longest:
+        cover.append(longest[position])
+        position = longest[position]["end_index"]
+    return cover
+
+
+async def compact_summaries(
+    summaries: list,
+    org_name: str = None,
+    fanout: int = 4,
+    token_ceiling: int = 600
+) -> list:
+    """Combine older summaries until the whole set is small enough.
+
+    First, every run of `fanout` consecutive summaries at the same level is
+    combined into one summary a level up, oldest first, so a conversation
+    keeps at most fanout - 1 summaries per level. Then, while the summaries
+    still exceed token_ceiling, the oldest ones are combined regardless of
+    level. Recent parts of the conversation keep the most detail.
+
+    Args:
+        summaries: Covering summary dicts in conversation order
+        org_name: Optional organization name for context
+        fanout: Number of summaries combined into one
+        token_ceiling: Maximum estimated tokens of all summaries
+
+    Returns:
+        New combined summary dicts; empty if nothing needed combining or the
+        LLM calls failed
+    """
+    fanout = max(fanout, 2)
+    nodes = list(summaries)
+    new_summaries = []
+
+    async def combine(start: int, count: int) -> bool:
+        group = nodes[start:start + count]
+        try:
+            text = await combine_summaries([node["summary"] for node in group], org_name)
+        except Exception as e:
+            logger.warning(f"⚠️ Combining summaries failed: {e}")
+            return False
+        combined = {
+            "start_index": group[0]["start_index"],
+            "end_index": group[-1]["end_index"],
+            "summary": text
+        }
+        nodes[start:start + count] = [combined]
+        new_summaries.append(combined)
+        return True
+
+    def oldest_full_run():
+        levels = [summary_level(node, fanout) for node in nodes]
+        for i in range(len(nodes) - fanout + 1):
+            if len(set(levels[i:i + fanout])) == 1:
+                return i
+        return None
+
+    run = oldest_full_run()
+    while run is not None:
+        if not await combine(run, fanout):
+            return new_summaries
+        run = oldest_full_run()
+
+    while len(nodes) > 1 and sum(estimate_tokens(node["summary"]) for node in nodes) > token_ceiling:
+        if not await combine(0, min(fanout, len(nodes))):
+            break
+
+    return new_summaries
+
+
+async def summarize_pending_batches(
+    messages: list,
+    stored_summaries: list = None,
+    org_name: str = None
+) -> list:
+    """Summarize the completed batches that have no stored summary yet.
+
+    In hierarchical mode (settings.summary_mode), older summaries are then
+    combined as needed (see compact_summaries).
+
+    Args:
+        messages: List of all conversation messages (ordered chronologically)
+        stored_summaries: Stored summary dicts with 'start_index', 'end_index'
+        org_name: Optional organization name for context
+
+    Returns:
+        List of new summary dicts with 'start_index', 'end_index' and
+        'summary', ready to be stored; batches whose summarization failed
+        are left out
+    """
+    hierarchical = settings.summary_mode == "hierarchical"
+
+    def is_stored(start: int, end: int) -> bool:
+        # In hierarchical mode a batch inside a combined summary needs no summary of its own
+        return any(
+            (s["start_index"], s["end_index"]) == (start, end)
+            or (hierarchical and s["start_index"] <= start and end <= s["end_index"])
+            for s in stored_summaries or []
+        )
+
+    pending = [batch for batch in completed_batches(len(messages)) if not is_stored(*batch)]
+
+    # Batches are independent, so summarize them concurrently
+    if pending:
+        logger.info(f"   Creating {len(pending)} batch summaries...")
+    results = await asyncio.gather(
+        *[summarize_messages(messages[start:end], org_name, fallback=False) for start, end in pending],
+        return_exceptions=True
+    )
+
+    new_summaries = [
+        {"start_index": start, "end_index": end, "summary": summary}
+        for (start, end), summary in zip(pending, results)
+        if not isinstance(summary, BaseException)
+    ]
+
+    if hierarchical:
+        batches = completed_batches(len(messages))
+        end_index = batches[-1][1] if batches else 0
+        cover = covering_summaries((stored_summaries or []) + new_summaries, end_index)
+        new_summaries += await compact_summaries(
+            cover,
+            org_name,
+            fanout=settings.summary_fanout,
+            token_ceiling=settings.summary_token_ceiling
+        )
+
+    return new_summaries
+
+
+async def build_conversation_context(
+    messages: list,
+    org_name: str = None,
+    stored_summaries: list = None,
+    summarize_pending: bool = True,
+    deadline: Optional[Deadline] = None
+) -> dict:
     """
     Build conversation context with smart summarization.
 
     Strategy:
     - If <= 10 messages: return full history
     - If > 10 messages:
-        - Summarize older messages in batches of 10
+        - Use stored summaries of older messages, in batches of 10
+        - Summarize only batches that have no stored summary yet
+        - In hierarchical mode, older summaries are combined into
+          summaries-of-summaries, so the summaries stay under
+          settings.summary_token_ceiling however long the conversation
         - Keep recent unsummarized messages as full text
         - Return: summaries + recent messages
 
+    Batch summaries are normally stored in the background after each reply
+    (see summarize_pending_batches), so a turn costs no summarization calls
+    unless a batch was missed. With summarize_pending=False, missed batches
+    are not summarized here but returned as pending_messages, so the caller
+    can summarize them in the same LLM call as query preprocessing.
+
+    With a deadline, missed batches are only summarized while there is time
+    for optional stages; otherwise they get a generic summary this turn and
+    are summarized after the reply.
+
     Args:
         messages: List of all conversation messages (ordered chronologically)
         org_name: Optional organization name for context
+        stored_summaries: Previously stored summary dicts with 'start_index',
+            'end_index' and 'summary'
+        summarize_pending: Summarize batches that have no stored summary
+        deadline: Optional request deadline limiting inline summarization
 
     Returns:
         Dict with:
@@ -105,13 +391,23 @@ def build_conversation_context(messages: list, org_name: str = None) -> dict:
             - recent_messages: List of recent full messages
             - total_messages: Total message count
             - summarized_count: How many messages were summarized
+            - new_summaries: Summary dicts created by this call, to be stored
+            - pending_messages: Older messages still to be summarized
+              (only with summarize_pending=False; one batch in batch mode)
+            - pending_start_index: Position of the first pending message
+            - pending_summary_index: Position in summaries where the
+              summary of pending_messages belongs
     """
     if not messages:
         return {
             "summaries": [],
             "recent_messages": [],
             "total_messages": 0,
-            "summarized_count": 0
+            "summarized_count": 0,
+            "new_summaries": [],
+            "pending_messages": [],
+            "pending_start_index": 0,
+            "pending_summary_index": 0
         }
 
     total_count = len(messages)
@@ -123,39 +419,86 @@ def build_conversation_context(messages: list, org_name: str = None) -> dict:
             "summaries": [],
             "recent_messages": messages,
             "total_messages": total_count,
-            "summarized_count": 0
+            "summarized_count": 0,
+            "new_summaries": [],
+            "pending_messages": [],
+            "pending_start_index": 0,
+            "pending_summary_index": 0
         }
 
     # Calculate how many messages to summarize
     # Keep the remainder as recent messages
-    num_to_summarize = (total_count // MESSAGES_PER_SUMMARY) * MESSAGES_PER_SUMMARY
+    batches = completed_batches(total_count)
+    num_to_summarize = batches[-1][1]
     num_recent = total_count - num_to_summarize
 
+    new_summaries = []
+    if summarize_pending:
+        new_summaries = await _summarize_within_deadline(messages, stored_summaries, org_name, deadline)
+    cover = covering_summaries(
+        (stored_summaries or []) + new_summaries,
+        num_to_summarize,
+        hierarchical=settings.summary_mode == "hierarchical"
+    )
+
+    # Batches whose summarization failed get a generic summary for this turn
+    summaries = [summary["summary"] for summary in cover]
+    covered = cover[-1]["end_index"] if cover else 0
+    pending_messages = []
+    if covered < num_to_summarize:
+        if summarize_pending:
+            summaries.append(fallback_summary(num_to_summarize - covered))
+        else:
+            # Batch mode only reuses one-batch summaries, so hand over a single
+            # batch; the rest gets a generic summary until the background task runs
+            pending_end = num_to_summarize
+            if settings.summary_mode != "hierarchical":
+                pending_end = covered + MESSAGES_PER_SUMMARY
+            pending_messages = messages[covered:pending_end]
+            if pending_end < num_to_summarize:
+                summaries.append(fallback_summary(num_to_summarize - pending_end))
+
     logger.info(f"💬 Conversation has {total_count} messages")
-    logger.info(f"   Summarizing: {num_to_summarize} messages")
+    logger.info(f"   Summarized: {num_to_summarize} messages in {len(summaries)} summaries "
+                f"({len(new_summaries)} new)")
     logger.info(f"   Keeping recent: {num_recent} messages")
 
-    # Split messages
-    messages_to_summarize = messages[:num_to_summarize]
-    recent_messages = messages[num_to_summarize:]
-
-    # Create summaries in batches
-    summaries = []
-    for i in range(0, num_to_summarize, MESSAGES_PER_SUMMARY):
-        batch = messages_to_summarize[i:i + MESSAGES_PER_SUMMARY]
-        batch_num = (i // MESSAGES_PER_SUMMARY) + 1
-        logger.info(f"   Creating summary {batch_num}...")
-        summary = summarize_messages(batch, org_name)
-        summaries.append(summary)
-
     return {
         "summaries": summaries,
-        "recent_messages": recent_messages,
+        "recent_messages": messages[num_to_summarize:],
         "total_messages": total_count,
-        "summarized_count": num_to_summarize
+        "summarized_count": num_to_summarize,
+        "new_summaries": new_summaries,
+        "pending_messages": pending_messages,
+        "pending_start_index": covered,
+        "pending_summary_index": len(cover)
     }
 
 
+async def _summarize_within_deadline(
+    messages: list,
+    stored_summaries: list,
+    org_name: str,
+    deadline: Optional[Deadline]
+) -> list:
+    """Run summarize_pending_batches(), giving up when the deadline allows no more time."""
+    if deadline is None:
+        return await summarize_pending_batches(messages, stored_summaries, org_name)
+
+    if not deadline.allows(settings.optional_llm_min_ms):
+        deadline.degrade("summaries", "no time left to summarize older messages")
+        return []
+
+    try:
+        return await asyncio.wait_for(
+            summarize_pending_batches(messages, stored_summaries, org_name),
+            timeout=deadline.timeout(settings.llm_aux_timeout_seconds)
+        )
+    except asyncio.TimeoutError:
+        deadline.degrade("summaries", "summarizing older messages exceeded the time left")
+        return []
+
+
 def format_context_for_claude(context: dict) -> str:
     """
     Format conversation context into a string for Claude.
@@ -193,7 +536,7 @@ def format_context_for_claude(context: dict) -> str:
     return "\n".join(parts)
 
 
-def get_conversation_context_string(messages: list, org_name: str = None) -> str:
+async def get_conversation_context_string(messages: list, org_name: str = None) -> str:
     """
     Convenience function to get formatted conversation context in one call.
 
@@ -204,5 +547,5 @@ def get_conversation_context_string(messages: list, org_name: str = None) -> str
     Returns:
         Formatted conversation context string ready for Claude
     """
-    context = build_conversation_context(messages, org_name)
+    context = await build_conversation_context(messages, org_name)
     return format_context_for_claude(context)
@@ -349,3 +349,198 @@ class Database:
         conversation['messages'] = messages
 
         return conversation
+
+    # Conversation summary operations
+    def add_conversation_summary(
+        self,
+        conversation_id: str,
+        start_index: int,
+        end_index: int,
+        summary: str
+    ):
+        """Store the summary of a batch of conversation messages.
+
+        A batch that already has a summary keeps it, so concurrent
+        summarization of the same batch is harmless.
+
+        Args:
+            conversation_id: Conversation ID
+            start_index: Position of the first summarized message
+            end_index: Position after the last summarized message
+            summary: Summary text
+        """
+        with self.get_connection() as conn:
+            conn.execute(
+                """INSERT OR IGNORE INTO conversation_summaries
+                       (conversation_id, start_index, end_index, summary)
+                   VALUES (?, ?, ?, ?)""",
+                (conversation_id, start_index, end_index, summary)
+            )
+            conn.commit()
+
+        logger.debug(f"Stored summary of messages {start_index}-{end_index} for {conversation_id}")
+
+    def get_conversation_summaries(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """Get the stored batch summaries of a conversation.
+
+        Args:
+            conversation_id: Conversation ID
+
+        Returns:
+            List of summary dicts ordered by start_index
+        """
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                """SELECT start_index, end_index, summary FROM conversation_summaries
+                   WHERE conversation_id = ?
+                   ORDER BY start_index ASC""",
+                (conversation_id,)
+            ).fetchall()
+
+            return [dict(row) for row in rows]
+
+    # Source catalog operations
+    def upsert_source(
+        self,
+        source_key: str,
+        source_name: str,
+        chunk_count: int,
+        user_id: Optional[str] = None,
+        org_id: Optional[str] = None,
+        visibility: str = "global",
+        file_type: Optional[str] = None,
+        size_bytes: int = 0,
+        content_digest: Optional[str] = None
+    ):
+        """Insert or update a source in the catalog.
+
+        Args:
+            source_key: Stable source key (as stored in chunk metadata)
+            source_name: Display name (the chunks' 'source' metadata)
+            chunk_count: Number of chunks indexed for the source
+            user_id: Owner user ID
+            org_id: Owner organization ID
+            visibility: 'personal', 'org-wide' or 'global'
+            file_type: File extension
+            size_bytes: Size of the original file
+            content_digest: Digest identifying the indexed version
+        """
+        with self.get_connection() as conn:
+            conn.execute(
+                """INSERT INTO sources (source_key, source_name, user_id, org_id, visibility,
+                                        file_type, chunk_count, size_bytes, content_digest)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(source_key) DO UPDATE SET
+                       source_name = excluded.source_name,
+                       visibility = excluded.visibility,
+                       file_type = excluded.file_type,
+                       chunk_count = excluded.chunk_count,
+                       size_bytes = excluded.size_bytes,
+                       content_digest = excluded.content_digest,
+                       updated_at = CURRENT_TIMESTAMP""",
+                (source_key, source_name, user_id, org_id, visibility,
+                 file_type, chunk_count, size_bytes, content_digest)
+            )
+            conn.commit()
+
+        logger.debug(f"Upserted source: {source_name} ({source_key})")
+
+    def get_accessible_sources(
+        self,
+        org_id: str,
+        user_id: str,
+        limit: int = 100,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """Get sources a user can select: org-wide sources of their org and their own uploads.
+
+        Args:
+            org_id: Organization ID
+            user_id: User ID
+            limit: Maximum number of sources to return
+            offset: Number of sources to skip
+
+        Returns:
+            Dict with 'sources' (list of source dicts) and 'total' count
+        """
+        where = "(org_id = ? AND visibility = 'org-wide') OR user_id = ?"
+
+        with self.get_connection() as conn:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM sources WHERE {where}",
+                (org_id, user_id)
+            ).fetchone()[0]
+
+            rows = conn.execute(
+                f"""SELECT * FROM sources
+                    WHERE {where}
+                    ORDER BY source_name ASC
+                    LIMIT ? OFFSET ?""",
+                (org_id, user_id, limit, offset)
+            ).fetchall()
+
+            return {"sources": [dict(row) for row in rows], "total": total}
+
+    # Glossary operations
+    def upsert_glossary_terms(self, terms: List[Dict[str, Any]]):
+        """Insert or update acronym definitions found in documents.
+
+        Re-ingesting the same documents keeps occurrence counts unchanged.
+
+        Args:
+            terms: Records with 'org_id', 'acronym', 'expansion' and
+                'occurrences' (see glossary.build_glossary_records)
+        """
+        if not terms:
+            return
+
+        with self.get_connection() as conn:
+            conn.executemany(
+                """INSERT INTO glossary (org_id, acronym, expansion, occurrences)
+                   VALUES (:org_id, :acronym, :expansion, :occurrences)
+                   ON CONFLICT(org_id, acronym, expansion) DO UPDATE SET
+                       occurrences = MAX(occurrences, excluded.occurrences)""",
+                [{**term, "org_id": term.get("org_id") or ""} for term in terms]
+            )
+            conn.commit()
+
+        logger.debug(f"Upserted {len(terms)} glossary terms")
+
+    def get_glossary(self, org_id: Optional[str] = None) -> Dict[str, str]:
+        """Get the acronyms available to an organization.
+
+        Combines the shared glossary with the organization's own terms; the
+        organization's definition wins, then the most frequent one.
+
+        Args:
+            org_id: Organization ID
+
+        Returns:
+            Mapping of acronym to expansion
+        """
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                """SELECT acronym, expansion FROM glossary
+                   WHERE org_id = '' OR org_id = ?
+                   ORDER BY org_id = ? ASC, occurrences ASC""",
+                (org_id or "", org_id or "")
+            ).fetchall()
+
+        # Later rows take precedence
+        return {row["acronym"]: row["expansion"] for row in rows}
+
+    def delete_glossary(self):
+        """Remove every glossary term (used when the collection is reset)."""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM glossary")
+            conn.commit()
+
+        logger.info("Cleared glossary")
+
+    def delete_all_sources(self):
+        """Remove every source from the catalog (used when the collection is reset)."""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM sources")
+            conn.commit()
+
+        logger.info("Cleared source catalog")
@@ -0,0 +1,82 @@
+"""Request-scoped deadline shared by the stages of answering a message."""
+import time
+from typing import Dict, Optional
+from loguru import logger
+
+
+class Deadline:
+    """Latency budget of one request and the degradations made to meet it.
+
+    Part of the budget is reserved for generating the answer. Optional
+    stages (summaries, query rewriting, MMR, re-ranking, neighbour
+    expansion) only get what is left above that reserve: they cap their
+    timeouts with it and are skipped or cut short once it is used up,
+    recording a degradation that the response reports.
+    """
+
+    def __init__(self, budget_ms: float, reserve_ms: float = 0):
+        """Start the deadline clock.
+
+        Args:
+            budget_ms: Total time allowed for the request
+            reserve_ms: Part of the budget kept for answer generation
+        """
+        self.budget_ms = budget_ms
+        self.reserve_ms = min(reserve_ms, budget_ms)
+        self.started = time.perf_counter()
+        self.degradations: Dict[str, str] = {}
+
+    def elapsed_ms(self) -> float:
+        """Time spent since the deadline started."""
+        return (time.perf_counter() - self.started) * 1000
+
+    def remaining_ms(self) -> float:
+        """Time left for the whole request."""
+        return max(0.0, self.budget_ms - self.elapsed_ms())
+
+    def optional_ms(self) -> float:
+        """Time left for optional stages (the remaining time above the generation reserve)."""
+        return max(0.0, self.remaining_ms() - self.reserve_ms)
+
+    def allows(self, ms: float = 0) -> bool:
+        """Check whether an optional stage expected to take ms still fits.
+
+        Args:
+            ms: Expected duration of the stage
+
+        Returns:
+            True if more than ms is left for optional stages
+        """
+        return self.optional_ms() > ms
+
+    def timeout(self, seconds: Optional[float] = None, optional: bool = True) -> float:
+        """Cap a stage timeout by the time left.
+
+        Optional stages are capped by the time above the generation reserve.
+        Answer generation is capped by the remaining time but always gets at
+        least the reserve, so an answer is still attempted after an overrun.
+
+        Args:
+            seconds: The stage's own timeout (None for no cap of its own)
+            optional: Whether the stage is optional
+
+        Returns:
+            Timeout in seconds
+        """
+        if optional:
+            left = self.optional_ms() / 1000
+        else:
+            left = max(self.remaining_ms(), self.reserve_ms) / 1000
+        return left if seconds is None else min(seconds, left)
+
+    def degrade(self, stage: str, reason: str) -> None:
+        """Record that a stage was skipped or cut short.
+
+        Args:
+            stage: Stage name (e.g. "summaries", "query_rewrite", "rerank")
+            reason: Why it was degraded
+        """
+        if stage in self.degradations:
+            return
+        self.degradations[stage] = reason
+        logger.warning(f"Degraded {stage} at {self.elapsed_ms():.0f} ms: {reason}")
@@ -7,9 +7,9 @@ import pypdf
 import docx
 import markdown
 from pdf2image import convert_from_path
-from anthropic import Anthropic
 from loguru import logger
 from config import settings
+from llm_client import create_message_sync
 from utils import clean_text, chunk_text, chunk_markdown_by_separator, get_file_extension
 
 
@@ -105,9 +105,6 @@ class DocumentLoader:
                 )
             raise Exception(f"Failed to convert PDF to images: {error_msg}")
 
-        # Initialize Anthropic client
-        client = Anthropic(api_key=settings.anthropic_api_key)
-
         all_text = []
 
         for page_num, image in enumerate(images, 1):
@@ -123,7 +120,8 @@ class DocumentLoader:
                 vision_model = "claude-sonnet-4-5-20250929"  # Known vision-capable model
 
                 # Call Claude API with vision
-                response = client.messages.create(
+                response = create_message_sync(
+                    timeout=settings.llm_vision_timeout_seconds,
                     model=vision_model,
                     max_tokens=settings.max_tokens,
                     messages=[
@@ -250,7 +248,8 @@ class DocumentLoader:
                             'file_path': str(file_path),
                             'chunk_index': i,
                             'total_chunks': len(chunks),
-                            'file_type': extension
+                            'file_type': extension,
+                            'visibility': 'global'
                         }
                     })
 
@@ -0,0 +1,231 @@
+"""Persistent on-disk cache of text embeddings keyed by model and content digest."""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from loguru import logger
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache with size-based LRU eviction.
+
+    Entries are keyed by (embedding model, sha256(text)) so that collection
+    rebuilds and re-ingests with an unchanged model reuse earlier work.
+    The stored size is kept in the database by triggers, so every process
+    sharing the file sees the same total when deciding to evict.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int):
+        """Initialize the cache database.
+
+        Args:
+            db_path: Path to the SQLite cache file
+            max_bytes: Maximum total size of stored vectors before eviction
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                       model TEXT NOT NULL,
+                       digest TEXT NOT NULL,
+                       vector BLOB NOT NULL,
+                       last_used REAL NOT NULL,
+                       PRIMARY KEY (model, digest)
+                   )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+            )
+            conn.commit()
+            self._create_size_counter(conn)
+            size = self._size_bytes(conn)
+
+        logger.info(
+            f"Embedding cache at {self.db_path} "
+            f"({size / 1_048_576:.1f} MB of {self.max_bytes / 1_048_576:.0f} MB)"
+        )
+
+    def _create_size_counter(self, conn: sqlite3.Connection) -> None:
+        """Create the stored-size counter and the triggers maintaining it.
+
+        A cache file from before the counter existed is measured once, in the
+        same transaction that adds the triggers, so no write is missed.
+
+        Args:
+            conn: Open cache database connection
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache_size (
+                   id INTEGER PRIMARY KEY CHECK (id = 0),
+                   bytes INTEGER NOT NULL
+               )"""
+        )
+        if conn.execute("SELECT 1 FROM cache_size").fetchone() is None:
+            conn.execute(
+                "INSERT INTO cache_size (id, bytes) "
+                "SELECT 0, COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            )
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS embeddings_size_insert AFTER INSERT ON embeddings
+               BEGIN
+                   UPDATE cache_size SET bytes = bytes + LENGTH(NEW.vector);
+               END"""
+        )
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS embeddings_size_delete AFTER DELETE ON embeddings
+               BEGIN
+                   UPDATE cache_size SET bytes = bytes - LENGTH(OLD.vector);
+               END"""
+        )
+        conn.commit()
+
+    def _size_bytes(self, conn: sqlite3.Connection) -> int:
+        """Total size of stored vectors across all processes sharing the cache.
+
+        Args:
+            conn: Open cache database connection
+
+        Returns:
+            Stored size in bytes
+        """
+        return conn.execute("SELECT bytes FROM cache_size").fetchone()[0]
+
+    @contextmanager
+    def get_connection(self):
+        """Context manager for cache database connections.
+
+        Yields:
+            sqlite3.Connection: Database connection
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, model: str, digests: List[str]) -> Dict[str, np.ndarray]:
+        """Look up cached embeddings.
+
+        Args:
+            model: Embedding model name
+            digests: Text digests to look up
+
+        Returns:
+            Mapping of digest to embedding for every cache hit
+        """
+        found = {}
+        unique = list(dict.fromkeys(digests))
+
+        with self.get_connection() as conn:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT digest, vector FROM embeddings "
+                    f"WHERE model = ? AND digest IN ({placeholders})",
+                    (model, *batch)
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                with self._lock:
+                    conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND digest = ?",
+                        [(time.time(), model, digest) for digest in found]
+                    )
+                    conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, np.ndarray]) -> None:
+        """Store embeddings and evict the least recently used entries if needed.
+
+        Args:
+            model: Embedding model name
+            items: Mapping of digest to embedding
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = [
+            (model, digest, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for digest, vector in items.items()
+        ]
+
+        with self._lock, self.get_connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, digest, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+
+            if self._size_bytes(conn) > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least recently used entries until the cache is at 90% of its limit.
+
+        Args:
+            conn: Open cache database connection
+        """
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+
+        # Hold the write lock so that processes evicting at once don't both delete
+        conn.execute("BEGIN IMMEDIATE")
+        total = self._size_bytes(conn)
+        while total > target:
+            rows = conn.execute(
+                "SELECT model, digest, LENGTH(vector) FROM embeddings "
+                "ORDER BY last_used ASC LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+
+            doomed = []
+            for model, digest, size in rows:
+                doomed.append((model, digest))
+                total -= size
+                if total <= target:
+                    break
+
+            conn.executemany("DELETE FROM embeddings WHERE model = ? AND digest = ?", doomed)
+            evicted += len(doomed)
+
+        conn.commit()
+        logger.info(f"Evicted {evicted} entries from embedding cache")
+
+    def get_stats(self) -> Dict[str, any]:
+        """Get cache statistics.
+
+        Returns:
+            Dictionary with hit/miss counters and stored size
+        """
+        lookups = self.hits + self.misses
+        with self.get_connection() as conn:
+            size = self._size_bytes(conn)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
@@ -8,7 +8,8 @@ from loguru import logger
 from config import settings
 from utils import clean_text, chunk_text, get_file_extension
 from document_loader import DocumentLoader
-from vector_store import VectorStore
+from vector_store import VectorStore, build_source_records
+from glossary import build_glossary_records
 
 
 class FileUploadHandler:
@@ -68,6 +69,8 @@ class FileUploadHandler:
                 - filename: Name of the processed file
                 - chunks_added: Number of chunks created
                 - total_documents: Total documents in vector store
+                - source: Source catalog record (see Database.upsert_source)
+                - glossary: Acronym definitions found (see Database.upsert_glossary_terms)
 
         Raises:
             HTTPException: If file processing fails
@@ -114,12 +117,20 @@ class FileUploadHandler:
             # Get updated count
             total_docs = self.vector_store.get_collection_count()
 
+            # Catalog record for the source, sized by the original upload
+            source_records = build_source_records(documents)
+            source = source_records[0] if source_records else None
+            if source:
+                source["size_bytes"] = temp_path.stat().st_size
+
             logger.info(f"Successfully processed {file.filename}: {len(chunks)} chunks added")
 
             return {
                 "filename": file.filename,
                 "chunks_added": len(chunks),
-                "total_documents": total_docs
+                "total_documents": total_docs,
+                "source": source,
+                "glossary": build_glossary_records(documents)
             }
 
         except ValueError as e:
@@ -0,0 +1,139 @@
+"""Organization glossary of acronyms, built from documents at ingest time."""
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Acronym in parentheses after its expansion: "paid time off (PTO)"
+_ACRONYM_AFTER = re.compile(r"\(([A-Z][A-Z&]{1,9})s?\)")
+
+# Expansion in parentheses after its acronym: "PTO (paid time off)"
+_ACRONYM_BEFORE = re.compile(r"\b([A-Z][A-Z&]{1,9})s?\s*\(([^()]{3,80})\)")
+
+# Acronym-looking tokens in a query
+_QUERY_ACRONYM = re.compile(r"\b([A-Z][A-Za-z&]*[A-Z])s?\b")
+
+# Words an acronym usually skips ("Department of Labor" -> DOL is fine either way)
+_MINOR_WORDS = {"of", "and", "for", "the", "to", "in", "on", "a", "an", "&"}
+
+_WORD = re.compile(r"[A-Za-z][\w'&-]*")
+
+
+def _letters(acronym: str) -> str:
+    """Lowercase letters an expansion's initials must spell."""
+    return "".join(ch.lower() for ch in acronym if ch.isalpha())
+
+
+def _match_trailing_words(words: List[str], acronym: str) -> Optional[str]:
+    """Find the expansion of an acronym at the end of a run of words.
+
+    Args:
+        words: Words preceding the acronym
+        acronym: The acronym
+
+    Returns:
+        The expansion, or None if the initials don't spell the acronym
+    """
+    letters = _letters(acronym)
+    i = len(letters) - 1
+    start = len(words)
+
+    for j in range(len(words) - 1, -1, -1):
+        word = words[j]
+        if i < 0:
+            break
+        if word.lower() in _MINOR_WORDS and start < len(words):
+            continue
+        if word[0].lower() != letters[i]:
+            return None
+        i -= 1
+        start = j
+
+    if i >= 0:
+        return None
+    return " ".join(words[start:])
+
+
+def _initials_match(expansion: str, acronym: str) -> bool:
+    """Check whether the initials of an expansion spell the acronym."""
+    words = [w for w in _WORD.findall(expansion) if w.lower() not in _MINOR_WORDS]
+    return "".join(w[0].lower() for w in words) == _letters(acronym)
+
+
+def extract_acronyms(text: str) -> Dict[str, str]:
+    """Find acronyms defined in a text.
+
+    Recognizes "Full Name (FN)" and "FN (Full Name)" where the initials of
+    the full name spell the acronym.
+
+    Args:
+        text: Document text
+
+    Returns:
+        Mapping of acronym to expansion
+    """
+    found = {}
+
+    for match in _ACRONYM_AFTER.finditer(text):
+        acronym = match.group(1)
+        preceding = _WORD.findall(text[max(0, match.start() - 200):match.start()])
+        expansion = _match_trailing_words(preceding[-(2 * len(acronym) + 2):], acronym)
+        if expansion:
+            found[acronym] = expansion
+
+    for match in _ACRONYM_BEFORE.finditer(text):
+        acronym, expansion = match.group(1), match.group(2).strip()
+        if acronym not in found and _initials_match(expansion, acronym):
+            found[acronym] = expansion
+
+    return found
+
+
+def build_glossary_records(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collect acronym definitions from chunked documents.
+
+    Personal documents are skipped, so a user's uploads never show up in
+    other users' query expansions. Global documents go into the shared
+    glossary (org_id ''); org-wide documents into their organization's.
+
+    Args:
+        documents: Document chunks with 'content' and 'metadata'
+
+    Returns:
+        List of records matching Database.upsert_glossary_terms() entries
+    """
+    counts = Counter()
+    for doc in documents:
+        metadata = doc.get('metadata', {})
+        visibility = metadata.get('visibility', 'global')
+        if visibility == 'personal':
+            continue
+        org_id = metadata.get('org_id', '') if visibility == 'org-wide' else ''
+        for acronym, expansion in extract_acronyms(doc['content']).items():
+            counts[(org_id, acronym, expansion)] += 1
+
+    return [
+        {"org_id": org_id, "acronym": acronym, "expansion": expansion, "occurrences": count}
+        for (org_id, acronym, expansion), count in counts.items()
+    ]
+
+
+def expand_acronyms(query: str, glossary: Dict[str, str]) -> Dict[str, str]:
+    """Look up the acronyms of a query in a glossary.
+
+    Args:
+        query: User query
+        glossary: Mapping of acronym to expansion
+
+    Returns:
+        Mapping of each known acronym in the query to its expansion
+    """
+    if not glossary:
+        return {}
+
+    expansions = {}
+    for match in _QUERY_ACRONYM.finditer(query):
+        token = match.group(1)
+        expansion = glossary.get(token) or glossary.get(token.upper())
+        if expansion and expansion.lower() not in query.lower():
+            expansions[token] = expansion
+    return expansions
@@ -0,0 +1,180 @@
+"""BM25 lexical index over chunk text using SQLite FTS5."""
+import json
+import re
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+
+class LexicalIndex:
+    """Inverted index over chunk text, kept alongside the vector collection.
+
+    Complements dense retrieval on exact terms such as program names,
+    acronyms and people's names that embeddings tend to blur.
+    """
+
+    def __init__(self, db_path: str):
+        """Initialize the index database.
+
+        Args:
+            db_path: Path to the SQLite index file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    rowid INTEGER PRIMARY KEY,
+                    doc_id TEXT NOT NULL UNIQUE,
+                    content TEXT NOT NULL,
+                    metadata TEXT
+                );
+
+                CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                    content,
+                    content='chunks',
+                    content_rowid='rowid',
+                    tokenize='porter unicode61'
+                );
+
+                CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+                    INSERT INTO chunks_fts(rowid, content) VALUES (new.rowid, new.content);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+                    INSERT INTO chunks_fts(chunks_fts, rowid, content)
+                    VALUES ('delete', old.rowid, old.content);
+                END;
+                """
+            )
+            conn.commit()
+
+        logger.info(f"Lexical index at {self.db_path}")
+
+    @contextmanager
+    def get_connection(self):
+        """Context manager for index database connections.
+
+        Yields:
+            sqlite3.Connection: Database connection
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def upsert(self, ids: List[str], contents: List[str], metadatas: List[Dict]) -> None:
+        """Insert or replace chunks in the index.
+
+        Args:
+            ids: Chunk IDs
+            contents: Chunk texts
+            metadatas: Chunk metadata
+        """
+        if not ids:
+            return
+
+        with self.get_connection() as conn:
+            conn.executemany("DELETE FROM chunks WHERE doc_id = ?", [(i,) for i in ids])
+            conn.executemany(
+                "INSERT INTO chunks (doc_id, content, metadata) VALUES (?, ?, ?)",
+                [
+                    (doc_id, content, json.dumps(metadata))
+                    for doc_id, content, metadata in zip(ids, contents, metadatas)
+                ]
+            )
+            conn.commit()
+
+    def delete(self, ids: List[str]) -> None:
+        """Remove chunks from the index.
+
+        Args:
+            ids: Chunk IDs to remove
+        """
+        if not ids:
+            return
+
+        with self.get_connection() as conn:
+            conn.executemany("DELETE FROM chunks WHERE doc_id = ?", [(i,) for i in ids])
+            conn.commit()
+
+    def clear(self) -> None:
+        """Remove every chunk from the index."""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM chunks")
+            conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('rebuild')")
+            conn.commit()
+
+    def count(self) -> int:
+        """Get the number of indexed chunks.
+
+        Returns:
+            Number of chunks in the index
+        """
+        with self.get_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def search(self, query: str, top_k: int) -> List[Dict[str, any]]:
+        """Rank chunks against a query with BM25.
+
+        Args:
+            query: Free-text query
+            top_k: Maximum number of results
+
+        Returns:
+            List of documents with id, content, metadata and bm25 score
+            (lower is better, as reported by SQLite)
+        """
+        match = build_match_expression(query)
+        if not match:
+            return []
+
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute(
+                    """SELECT c.doc_id, c.content, c.metadata, bm25(chunks_fts) AS score
+                       FROM chunks_fts
+                       JOIN chunks c ON c.rowid = chunks_fts.rowid
+                       WHERE chunks_fts MATCH ?
+                       ORDER BY score
+                       LIMIT ?""",
+                    (match, top_k)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error searching lexical index: {e}")
+            return []
+
+        return [
+            {
+                'content': content,
+                'metadata': json.loads(metadata) if metadata else {},
+                'distance': None,
+                'bm25': score,
+                'id': doc_id
+            }
+            for doc_id, content, metadata, score in rows
+        ]
+
+
+def build_match_expression(query: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Each word is quoted so punctuation and FTS5 operators in user input
+    cannot break the query, and words are OR-ed so BM25 does the ranking.
+
+    Args:
+        query: Free-text query
+
+    Returns:
+        MATCH expression, or None if the query has no searchable terms
+    """
+    terms = list(dict.fromkeys(re.findall(r"\w+", query.lower())))
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
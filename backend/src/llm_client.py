@@ -0,0 +1,130 @@
+"""Process-wide Anthropic clients shared by every module that calls Claude.
+
+Creating a client per call pays connection and TLS setup every time; these
+clients are created once and keep a pool of keep-alive connections. Tests
+can swap in stand-ins with set_clients().
+"""
+import threading
+from typing import Any, Optional
+import anthropic
+from loguru import logger
+from config import settings
+
+_client: Optional[anthropic.Anthropic] = None
+_async_client: Optional[anthropic.AsyncAnthropic] = None
+_lock = threading.Lock()
+
+
+def _limits() -> Any:
+    """Connection pool limits for the HTTP clients.
+
+    Built from the type of the SDK's own default limits, so the object always
+    matches the HTTP library the installed SDK uses.
+    """
+    return type(anthropic.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+        keepalive_expiry=settings.llm_keepalive_seconds
+    )
+
+
+def _timeout() -> anthropic.Timeout:
+    """Default request timeout, with a shorter connect timeout."""
+    return anthropic.Timeout(settings.llm_timeout_seconds, connect=settings.llm_connect_timeout_seconds)
+
+
+def get_client() -> anthropic.Anthropic:
+    """Get the shared synchronous client (for scripts and worker threads).
+
+    Returns:
+        anthropic.Anthropic instance
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = anthropic.Anthropic(
+                    api_key=settings.anthropic_api_key,
+                    timeout=_timeout(),
+                    max_retries=settings.llm_max_retries,
+                    http_client=anthropic.DefaultHttpxClient(limits=_limits())
+                )
+                logger.info("Created shared Anthropic client")
+    return _client
+
+
+def get_async_client() -> anthropic.AsyncAnthropic:
+    """Get the shared async client (for request handlers).
+
+    Returns:
+        anthropic.AsyncAnthropic instance
+    """
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = anthropic.AsyncAnthropic(
+                    api_key=settings.anthropic_api_key,
+                    timeout=_timeout(),
+                    max_retries=settings.llm_max_retries,
+                    http_client=anthropic.DefaultAsyncHttpxClient(limits=_limits())
+                )
+                logger.info("Created shared async Anthropic client")
+    return _async_client
+
+
+def set_clients(client: Any = None, async_client: Any = None) -> None:
+    """Replace the shared clients, e.g. with local stand-ins in tests.
+
+    Stand-ins only need the ``messages.create`` / ``messages.stream``
+    methods that are used. Passing None resets a client so that the real
+    one is created again on next use.
+
+    Args:
+        client: Synchronous client to use
+        async_client: Async client to use
+    """
+    global _client, _async_client
+    with _lock:
+        _client = client
+        _async_client = async_client
+
+
+async def create_message(timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """Create a message with the shared async client.
+
+    Args:
+        timeout: Per-call timeout in seconds (defaults to the client timeout)
+        **kwargs: Arguments for messages.create (model, messages, ...)
+
+    Returns:
+        The API response
+    """
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return await get_async_client().messages.create(**kwargs)
+
+
+def create_message_sync(timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """Create a message with the shared synchronous client.
+
+    Args:
+        timeout: Per-call timeout in seconds (defaults to the client timeout)
+        **kwargs: Arguments for messages.create (model, messages, ...)
+
+    Returns:
+        The API response
+    """
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return get_client().messages.create(**kwargs)
+
+
+async def close_clients() -> None:
+    """Close the shared clients' connection pools (called on server shutdown)."""
+    global _client, _async_client
+    if _async_client is not None and hasattr(_async_client, "close"):
+        await _async_client.close()
+    if _client is not None and hasattr(_client, "close"):
+        _client.close()
+    _client = _async_client = None
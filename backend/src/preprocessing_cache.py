@@ -0,0 +1,181 @@
+"""Cache of query preprocessing results: in-process LRU in front of SQLite."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+from loguru import logger
+from cache import LRUCache
+from utils import normalize_query
+
+
+class PreprocessingCache:
+    """Two-level cache of preprocess_query() results with a TTL.
+
+    Entries are keyed by (normalized query, organization, digest of the
+    conversation context, model), so a standalone question that was asked
+    before skips the LLM call. The in-process LRU answers repeats without
+    touching disk; the SQLite store keeps entries across restarts.
+    """
+
+    # Expired rows are deleted every this many writes
+    PRUNE_EVERY = 500
+
+    def __init__(self, db_path: str, maxsize: int, ttl_seconds: float):
+        """Initialize the cache database.
+
+        Args:
+            db_path: Path to the SQLite cache file
+            maxsize: Maximum number of in-process entries
+            ttl_seconds: Seconds before an entry expires
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self.persistent_hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS preprocessing (
+                       key TEXT PRIMARY KEY,
+                       result TEXT NOT NULL,
+                       expires_at REAL NOT NULL
+                   )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_preprocessing_expires_at ON preprocessing(expires_at)"
+            )
+            conn.commit()
+        self._prune()
+
+        logger.info(f"Preprocessing cache at {self.db_path}")
+
+    @contextmanager
+    def get_connection(self):
+        """Context manager for cache database connections.
+
+        Yields:
+            sqlite3.Connection: Database connection
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(
+        query: str,
+        org_name: Optional[str],
+        conversation_context: Optional[str],
+        model: str
+    ) -> str:
+        """Build the cache key of a preprocessing request.
+
+        Args:
+            query: Raw user question
+            org_name: Organization name, if any
+            conversation_context: Conversation context sent with the query, if any
+            model: Model that does the preprocessing
+
+        Returns:
+            Hex digest identifying the request
+        """
+        context_digest = hashlib.sha256((conversation_context or "").encode("utf-8")).hexdigest()
+        parts = [normalize_query(query), org_name or "", context_digest, model]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a result in the in-process cache only (no disk access).
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            Copy of the cached result or None
+        """
+        result = self.memory.get(key)
+        return dict(result) if result is not None else None
+
+    def get_persistent(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a result in the SQLite store, promoting hits to memory.
+
+        Call after get_memory() missed; counts the final hit or miss.
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            Copy of the cached result or None
+        """
+        with self.get_connection() as conn:
+            row = conn.execute(
+                "SELECT result FROM preprocessing WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.persistent_hits += 1
+        result = json.loads(row[0])
+        self.memory.put(key, result)
+        return dict(result)
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result in both levels.
+
+        Args:
+            key: Cache key from make_key()
+            result: Preprocessing result (JSON-serializable)
+        """
+        self.memory.put(key, dict(result))
+
+        with self._lock, self.get_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO preprocessing (key, result, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time() + self.ttl_seconds)
+            )
+            conn.commit()
+            self._writes += 1
+
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Delete expired rows from the SQLite store."""
+        with self._lock, self.get_connection() as conn:
+            deleted = conn.execute(
+                "DELETE FROM preprocessing WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+            conn.commit()
+
+        if deleted:
+            logger.info(f"Pruned {deleted} expired preprocessing cache entries")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics.
+
+        Returns:
+            Dictionary with per-level hits, misses and the overall hit rate
+        """
+        memory_stats = self.memory.get_stats()
+        memory_hits = memory_stats["hits"]
+        hits = memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "memory_size": memory_stats["size"],
+            "memory_hits": memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
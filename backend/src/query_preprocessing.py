@@ -2,41 +2,97 @@
 Query preprocessing using Claude to enhance intent understanding and searchability.
 """
 
-import anthropic
 import json
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
 from loguru import logger
 from config import settings
+from llm_client import create_message
+from preprocessing_cache import PreprocessingCache
+from concurrency import run_db
+from glossary import expand_acronyms
+from deadline import Deadline
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Words that carry no search signal on their own
+_STOP_WORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "of", "to", "in", "on", "at", "for", "by",
+    "with", "from", "about", "as", "into", "is", "are", "was", "were", "be", "been", "am",
+    "do", "does", "did", "can", "could", "should", "would", "will", "may", "might", "must",
+    "have", "has", "had", "i", "me", "my", "we", "our", "us", "you", "your", "what", "what's",
+    "how", "how's", "who", "who's", "when", "where", "where's", "which", "why", "there",
+    "it", "its", "it's", "this", "that", "these", "those", "they", "them", "their", "he", "she",
+    "his", "her", "any", "some", "please", "tell", "know", "get", "need", "want", "not", "no"
+}
 
+# Words that usually point back into the conversation
+_REFERRING_WORDS = {
+    "it", "its", "it's", "that", "this", "these", "those", "they", "them", "their", "he", "she",
+    "him", "her", "his", "there", "same", "above", "previous", "earlier", "former", "latter",
+    "else", "more", "again", "instead", "one", "ones"
+}
 
-def preprocess_query(query: str, org_name: str = None, conversation_context: str = None) -> dict:
-    """
-    Use Claude to analyze and enhance a user's query before embedding.
+# Openings of follow-up questions that only make sense after an earlier turn
+_FOLLOW_UP_OPENINGS = ("and ", "but ", "also ", "what about ", "how about ", "so ", "then ")
 
-    This preprocessing step:
-    1. Identifies query intent (facts, procedures, people, policy, etc.)
-    2. Rewrites the query to be more searchable
-    3. Suggests related organizational terms and jargon
-    4. Expands abbreviations and implicit context
-    5. Resolves references from conversation history
+_QUERY_WORD = re.compile(r"[a-z0-9][a-z0-9'&-]*")
 
-    Args:
-        query: Raw user question
-        org_name: Optional organization name for context
-        conversation_context: Optional conversation history for resolving references
 
-    Returns:
-        Dict containing:
-            - original_query: The raw user input
-            - intent_type: Categorized intent (facts/procedures/people/policy/general)
-            - enhanced_query: Rewritten query optimized for embedding search
-            - related_terms: List of related terms and synonyms
-            - reasoning: Brief explanation of the enhancement
-    """
-    client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+class FastPathStats:
+    """Counters for how queries were preprocessed and what the fast path saved."""
 
-    org_context = f" for {org_name}" if org_name else ""
+    def __init__(self):
+        self.fast_path = 0
+        self.cache_hits = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, path: str, seconds: float = 0.0) -> None:
+        """Count one preprocessed query.
+
+        Args:
+            path: 'fast_path', 'cache' or 'llm'
+            seconds: LLM call duration (for 'llm')
+        """
+        with self._lock:
+            if path == "fast_path":
+                self.fast_path += 1
+            elif path == "cache":
+                self.cache_hits += 1
+            else:
+                self.llm_calls += 1
+                self.llm_seconds += seconds
+
+    def get_stats(self) -> Dict[str, any]:
+        """Get preprocessing statistics.
+
+        Latency saved is estimated from the average duration of the LLM
+        preprocessing calls that were made.
+
+        Returns:
+            Dictionary with counts, the fast-path fraction and latency saved
+        """
+        total = self.fast_path + self.cache_hits + self.llm_calls
+        avg_llm_ms = self.llm_seconds / self.llm_calls * 1000 if self.llm_calls else 0.0
+        return {
+            "queries": total,
+            "fast_path": self.fast_path,
+            "cache_hits": self.cache_hits,
+            "llm_calls": self.llm_calls,
+            "fast_path_fraction": self.fast_path / total if total else 0.0,
+            "avg_llm_ms": round(avg_llm_ms, 1),
+            "latency_saved_ms": round(self.fast_path * avg_llm_ms, 1)
+        }
+
+
+preprocessing_stats = FastPathStats()
 
-    system_prompt = """You are a query preprocessing expert for organizational knowledge retrieval systems.
+SYSTEM_PROMPT = """You are a query preprocessing expert for organizational knowledge retrieval systems.
 
 Your task is to analyze user queries and optimize them for semantic search against organizational documents.
 
@@ -102,73 +158,363 @@ Response:
   "reasoning": "Expanded PTO acronym and added related leave terminology"
 }"""
 
-    # Build user message with optional conversation context
-    user_message_parts = []
+COMBINED_SYSTEM_PROMPT = SYSTEM_PROMPT + """
 
-    if conversation_context:
-        user_message_parts.append(
-            f"Conversation History:\n{conversation_context}\n\n---\n")
+In addition, you will be given older conversation messages that have not been
+summarized yet. Summarize them concisely (2-4 sentences): main topics, key
+questions, important information in the answers, decisions or follow-ups, and
+context needed to understand future questions. Use those messages, too, when
+resolving references in the query.
 
-    user_message_parts.append(f"Analyze and enhance this query{org_context}:")
-    user_message_parts.append(f"\nQuery: {query}")
-    user_message_parts.append("\nRespond with the JSON object only.")
+In this case, respond with ONLY a valid JSON object in this exact format:
+{
+  "intent_type": "facts|procedures|people|policy|general",
+  "enhanced_query": "rewritten query with key terms",
+  "related_terms": ["term1", "term2", "term3"],
+  "reasoning": "brief explanation of enhancements made",
+  "conversation_summary": "summary of the older messages"
+}"""
+
+
+async def preprocess_query(
+    query: str,
+    org_name: str = None,
+    conversation_context: str = None,
+    glossary: Optional[Dict[str, str]] = None,
+    deadline: Optional[Deadline] = None
+) -> dict:
+    """
+    Use Claude to analyze and enhance a user's query before embedding.
+
+    This preprocessing step:
+    1. Identifies query intent (facts, procedures, people, policy, etc.)
+    2. Rewrites the query to be more searchable
+    3. Suggests related organizational terms and jargon
+    4. Expands abbreviations and implicit context
+    5. Resolves references from conversation history
 
-    user_message = "".join(user_message_parts)
+    Self-contained keyword queries skip the LLM (see classify_query) and are
+    enhanced locally by expanding acronyms from the organization glossary.
+    With a deadline, the LLM rewrite is skipped when there is no time left
+    for it and its timeout is capped by the time left.
+
+    Args:
+        query: Raw user question
+        org_name: Optional organization name for context
+        conversation_context: Optional conversation history for resolving references
+        glossary: Optional mapping of acronym to expansion for the organization
+        deadline: Optional request deadline
+
+    Returns:
+        Dict containing:
+            - original_query: The raw user input
+            - intent_type: Categorized intent (facts/procedures/people/policy/general)
+            - enhanced_query: Rewritten query optimized for embedding search
+            - related_terms: List of related terms and synonyms
+            - reasoning: Brief explanation of the enhancement
+    """
+    if settings.preprocess_fast_path:
+        use_fast_path, reason = classify_query(query, conversation_context)
+        if use_fast_path:
+            preprocessing_stats.record("fast_path")
+            result = local_preprocess(query, glossary, reason)
+            logger.info(f"⚡ Fast-path preprocessing: '{result['enhanced_query']}'")
+            return result
+
+    cache = get_preprocessing_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(query, org_name, conversation_context, settings.model_name)
+        cached = cache.get_memory(cache_key)
+        if cached is None:
+            cached = await run_db(cache.get_persistent, cache_key)
+        if cached is not None:
+            cached["original_query"] = query
+            preprocessing_stats.record("cache")
+            logger.info(f"✅ Preprocessing cache hit: '{query}' -> '{cached['enhanced_query']}'")
+            return cached
+
+    timeout = _llm_timeout(deadline)
+    if timeout is None:
+        deadline.degrade("query_rewrite", "no time left to rewrite the query")
+        return fallback_result(query, "No time left for preprocessing, using original query")
 
     logger.info(f"🔍 Preprocessing query: '{query}'")
 
+    started = time.perf_counter()
     try:
-        message = client.messages.create(
+        try:
+            message = await create_message(
+                timeout=timeout,
+                model=settings.model_name,
+                max_tokens=512,
+                system=SYSTEM_PROMPT,
+                messages=[
+                    {"role": "user", "content": _build_user_message(query, org_name, conversation_context)}
+                ]
+            )
+        finally:
+            preprocessing_stats.record("llm", time.perf_counter() - started)
+
+        result = _parse_response(message.content[0].text.strip())
+
+        # Add original query
+        result["original_query"] = query
+
+        _log_result(result)
+
+        # Fallback results are not cached, so a failed call is retried next time
+        if cache is not None:
+            await run_db(cache.put, cache_key, result)
+        return result
+
+    except Exception as e:
+        logger.warning(f"⚠️ Query preprocessing failed: {e}")
+        logger.warning("   Using original query as fallback")
+        if deadline is not None:
+            deadline.degrade("query_rewrite", f"preprocessing failed: {e}")
+        return fallback_result(query)
+
+
+async def preprocess_and_summarize(
+    query: str,
+    messages_to_summarize: list,
+    org_name: str = None,
+    conversation_context: str = None,
+    deadline: Optional[Deadline] = None
+) -> dict:
+    """
+    Preprocess a query and summarize older conversation messages in one LLM call.
+
+    Used when a turn finds older messages without a stored summary: instead
+    of a summarization call followed by a preprocessing call, one structured
+    call returns both.
+
+    Args:
+        query: Raw user question
+        messages_to_summarize: Older messages (dicts with 'role' and 'content') to summarize
+        org_name: Optional organization name for context
+        conversation_context: Optional formatted summaries and recent messages
+        deadline: Optional request deadline (as in preprocess_query())
+
+    Returns:
+        Dict with the same keys as preprocess_query(), plus:
+            - conversation_summary: Summary of messages_to_summarize, or None
+              if the call failed
+    """
+    older_messages = "".join(
+        f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}\n\n"
+        for msg in messages_to_summarize
+    )
+    user_message = (
+        f"Older Messages To Summarize:\n{older_messages}---\n"
+        + _build_user_message(query, org_name, conversation_context)
+    )
+
+    timeout = _llm_timeout(deadline)
+    if timeout is None:
+        deadline.degrade("query_rewrite", "no time left to rewrite the query")
+        deadline.degrade("summaries", "no time left to summarize older messages")
+        result = fallback_result(query, "No time left for preprocessing, using original query")
+        result["conversation_summary"] = None
+        return result
+
+    logger.info(f"🔍 Preprocessing query and summarizing {len(messages_to_summarize)} messages: '{query}'")
+
+    try:
+        message = await create_message(
+            timeout=timeout,
             model=settings.model_name,
-            max_tokens=512,
-            system=system_prompt,
+            max_tokens=768,
+            system=COMBINED_SYSTEM_PROMPT,
             messages=[
                 {"role": "user", "content": user_message}
             ]
         )
 
-        response_text = message.content[0].text.strip()
-
-        # Parse JSON response
-        try:
-            result = json.loads(response_text)
-        except json.JSONDecodeError:
-            # If response isn't valid JSON, extract it from markdown code blocks
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-                result = json.loads(response_text)
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-                result = json.loads(response_text)
-            else:
-                raise
-
-        # Add original query
+        result = _parse_response(message.content[0].text.strip())
         result["original_query"] = query
+        result["conversation_summary"] = (result.get("conversation_summary") or "").strip() or None
 
-        logger.info(f"✅ Query enhanced: '{result['enhanced_query']}'")
-        logger.info(f"   Intent: {result['intent_type']}")
-        logger.info(
-            f"   Related terms: {', '.join(result['related_terms'][:3])}...")
-
+        _log_result(result)
         return result
 
     except Exception as e:
-        logger.warning(f"⚠️ Query preprocessing failed: {e}")
+        logger.warning(f"⚠️ Combined preprocessing failed: {e}")
         logger.warning("   Using original query as fallback")
+        if deadline is not None:
+            deadline.degrade("query_rewrite", f"preprocessing failed: {e}")
+            deadline.degrade("summaries", f"preprocessing failed: {e}")
+        result = fallback_result(query)
+        result["conversation_summary"] = None
+        return result
 
-        # Fallback to original query if preprocessing fails
-        return {
-            "original_query": query,
-            "intent_type": "general",
-            "enhanced_query": query,
-            "related_terms": [],
-            "reasoning": "Preprocessing failed, using original query"
-        }
+
+def classify_query(query: str, conversation_context: str = None) -> Tuple[bool, str]:
+    """
+    Decide locally whether a query needs the LLM rewrite.
+
+    A query can skip it when it already reads like a search: a handful of
+    content words, not too long, and - when there is conversation history -
+    nothing that refers back to earlier turns.
+
+    Args:
+        query: Raw user question
+        conversation_context: Optional conversation history
+
+    Returns:
+        Tuple of (use the fast path, reason)
+    """
+    text = query.lower().strip()
+    words = _QUERY_WORD.findall(text)
+
+    if len(words) > settings.fast_path_max_words:
+        return False, "long query"
+
+    content_words = [w for w in words if w not in _STOP_WORDS]
+    if len(content_words) < settings.fast_path_min_terms:
+        return False, "too few content words"
+
+    if conversation_context:
+        if text.startswith(_FOLLOW_UP_OPENINGS):
+            return False, "follow-up question"
+        if any(w in _REFERRING_WORDS for w in words):
+            return False, "refers to earlier conversation"
+
+    return True, "self-contained keyword query"
+
+
+def local_preprocess(query: str, glossary: Optional[Dict[str, str]] = None, reason: str = "") -> dict:
+    """
+    Enhance a query without the LLM.
+
+    Acronyms found in the glossary are expanded and the intent is guessed
+    from keywords.
+
+    Args:
+        query: Raw user question
+        glossary: Optional mapping of acronym to expansion
+        reason: Why the fast path was taken (recorded in 'reasoning')
+
+    Returns:
+        Dict with the same keys as preprocess_query()
+    """
+    expansions = expand_acronyms(query, glossary or {})
+    enhanced_query = " ".join([query.strip()] + list(expansions.values()))
+
+    reasoning = f"Local fast path ({reason})" if reason else "Local fast path"
+    if expansions:
+        reasoning += "; expanded " + ", ".join(f"{a} = {e}" for a, e in expansions.items())
+
+    return {
+        "original_query": query,
+        "intent_type": _guess_intent(_QUERY_WORD.findall(query.lower())),
+        "enhanced_query": enhanced_query,
+        "related_terms": list(expansions.values()),
+        "reasoning": reasoning
+    }
+
+
+def _guess_intent(words: list) -> str:
+    """Guess the intent type of a query from its words."""
+    vocabulary = set(words)
+    first = words[0] if words else ""
+
+    if first in ("who", "who's") or vocabulary & {"contact", "contacts", "manager", "director", "staff", "lead"}:
+        return "people"
+    if vocabulary & {"policy", "policies", "rule", "rules", "allowed", "required", "requirements",
+                     "guideline", "guidelines", "eligible", "eligibility"}:
+        return "policy"
+    if first in ("how", "how's") or vocabulary & {"steps", "process", "procedure", "submit", "apply", "request"}:
+        return "procedures"
+    if first in ("what", "what's", "when", "where", "where's", "which"):
+        return "facts"
+    return "general"
+
+
+def get_preprocessing_cache():
+    """Get the shared preprocessing cache.
+
+    Returns:
+        PreprocessingCache instance, or None if caching is disabled
+    """
+    global _cache
+    if not settings.preprocess_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PreprocessingCache(
+                    str(settings.preprocess_cache_file),
+                    maxsize=settings.preprocess_cache_size,
+                    ttl_seconds=settings.preprocess_cache_ttl_seconds
+                )
+    return _cache
+
+
+def _llm_timeout(deadline: Optional[Deadline]) -> Optional[float]:
+    """Timeout of a preprocessing call, or None if the deadline leaves no time for one."""
+    if deadline is None:
+        return settings.llm_aux_timeout_seconds
+    if not deadline.allows(settings.optional_llm_min_ms):
+        return None
+    return deadline.timeout(settings.llm_aux_timeout_seconds)
+
+
+def _build_user_message(query: str, org_name: str = None, conversation_context: str = None) -> str:
+    """Build the preprocessing request with optional conversation context."""
+    org_context = f" for {org_name}" if org_name else ""
+    user_message_parts = []
+
+    if conversation_context:
+        user_message_parts.append(
+            f"Conversation History:\n{conversation_context}\n\n---\n")
+
+    user_message_parts.append(f"Analyze and enhance this query{org_context}:")
+    user_message_parts.append(f"\nQuery: {query}")
+    user_message_parts.append("\nRespond with the JSON object only.")
+
+    return "".join(user_message_parts)
+
+
+def _parse_response(response_text: str) -> dict:
+    """Parse the JSON object in a preprocessing response.
+
+    Raises:
+        json.JSONDecodeError: If no valid JSON object is found
+    """
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        # If response isn't valid JSON, extract it from markdown code blocks
+        if "```json" in response_text:
+            json_start = response_text.find("```json") + 7
+            json_end = response_text.find("```", json_start)
+            return json.loads(response_text[json_start:json_end].strip())
+        elif "```" in response_text:
+            json_start = response_text.find("```") + 3
+            json_end = response_text.find("```", json_start)
+            return json.loads(response_text[json_start:json_end].strip())
+        raise
+
+
+def _log_result(result: dict):
+    """Log a preprocessing result."""
+    logger.info(f"✅ Query enhanced: '{result['enhanced_query']}'")
+    logger.info(f"   Intent: {result['intent_type']}")
+    logger.info(
+        f"   Related terms: {', '.join(result['related_terms'][:3])}...")
+
+
+def fallback_result(query: str, reasoning: str = "Preprocessing failed, using original query") -> dict:
+    """Preprocessing result that searches the original query."""
+    return {
+        "original_query": query,
+        "intent_type": "general",
+        "enhanced_query": query,
+        "related_terms": [],
+        "reasoning": reasoning
+    }
 
 
 def build_search_query(preprocessing_result: dict) -> str:
@@ -196,3 +542,22 @@ def build_search_query(preprocessing_result: dict) -> str:
         search_parts.append(" ".join(related[:5]))
 
     return " ".join(search_parts)
+
+
+def build_search_queries(preprocessing_result: dict) -> list:
+    """
+    Build the list of queries to search together from preprocessing results.
+
+    Unlike build_search_query(), which folds everything into one string that
+    a single embedding has to represent, this keeps the enhanced query and
+    each related term as separate queries for VectorStore.search_many().
+
+    Args:
+        preprocessing_result: Output from preprocess_query()
+
+    Returns:
+        List of query strings, enhanced query first
+    """
+    queries = [preprocessing_result["enhanced_query"]]
+    queries.extend(preprocessing_result.get("related_terms", [])[:5])
+    return queries
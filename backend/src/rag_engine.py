@@ -1,10 +1,39 @@
 """RAG (Retrieval-Augmented Generation) engine for CTLChat."""
-from typing import List, Dict, Optional, Iterator
-import anthropic
+import json
+import time
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional, Iterator
 from loguru import logger
 from config import settings
 from vector_store import VectorStore
-from utils import format_context
+from utils import format_context, normalize_query
+from cache import LRUCache
+from reranker import CrossEncoderReranker
+from context_assembly import assemble_context, neighbour_indices
+from token_budget import pack_prompt
+from concurrency import run_compute
+from llm_client import get_client, get_async_client
+from deadline import Deadline
+
+SYSTEM_PROMPT = """You are a helpful AI assistant. You answer questions based on the provided context from the knowledge base.
+
+If the context contains relevant information, use it to provide accurate and detailed answers.
+If the context doesn't contain enough information to answer the question, say so honestly.
+Always be clear about what information comes from the provided context."""
+
+# User message when passages were retrieved
+CONTEXT_TEMPLATE = """Context from knowledge base:
+{context}
+
+User question: {query}
+
+Please answer the question based on the context provided above."""
+
+# User message when nothing relevant was retrieved
+NO_CONTEXT_TEMPLATE = """No relevant context was found in the knowledge base.
+
+User question: {query}
+
+Please provide a helpful response, but note that this is based on general knowledge rather than specific documents."""
 
 
 class RAGEngine:
@@ -16,66 +45,277 @@ class RAGEngine:
         Args:
             vector_store: Optional VectorStore instance (creates new if not provided)
         """
-        # Initialize Anthropic client
+        # Anthropic clients are shared process-wide (see llm_client)
         if not settings.anthropic_api_key:
             raise ValueError("ANTHROPIC_API_KEY not set in environment variables")
 
-        self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
-
         # Initialize vector store
         self.vector_store = vector_store or VectorStore()
 
+        # Cache of (normalized query, top_k, filter, collection generation) -> (results, search stats)
+        self.retrieval_cache = LRUCache(
+            maxsize=settings.query_cache_size,
+            ttl_seconds=settings.query_cache_ttl_seconds
+        )
+
+        # Optional cross-encoder re-ranking, loaded now rather than on the first request
+        self.reranker = None
+        if settings.rerank_enabled:
+            self.reranker = CrossEncoderReranker()
+            self.reranker.load()
+
         logger.info("RAG Engine initialized")
 
-    def retrieve(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, any]]:
+    @property
+    def client(self):
+        """Shared synchronous Anthropic client."""
+        return get_client()
+
+    @property
+    def async_client(self):
+        """Shared async Anthropic client."""
+        return get_async_client()
+
+    def retrieve(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        filter_metadata: Optional[Dict] = None,
+        timings: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, any]]:
         """Retrieve relevant documents for a query.
 
+        Results are cached per (normalized query, top_k, filter) and invalidated
+        whenever the vector store's collection generation changes. With
+        re-ranking enabled, settings.rerank_candidates documents are fetched
+        and the cross-encoder keeps the best top_k. With adaptive top_k, top_k
+        is capped at settings.adaptive_max_k.
+
         Args:
             query: User query
             top_k: Number of documents to retrieve
+            filter_metadata: Optional metadata filter for the search
+            timings: Optional dict filled with per-stage timings
+            deadline: Optional request deadline limiting diversification and re-ranking
 
         Returns:
             List of retrieved documents
         """
-        return self.vector_store.search(query, top_k=top_k)
+        return self._retrieve(
+            [query],
+            query,
+            top_k,
+            filter_metadata,
+            lambda k, stats: self.vector_store.search(
+                query, top_k=k, filter_metadata=filter_metadata, stats=stats, deadline=deadline
+            ),
+            timings,
+            deadline
+        )
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: Optional[int] = None,
+        filter_metadata: Optional[Dict] = None,
+        timings: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, any]]:
+        """Retrieve documents for several queries with one batched search.
 
-    def generate(
+        Re-ranking, when enabled, scores candidates against the first query.
+
+        Args:
+            queries: Queries expressing the same information need, main query first
+            top_k: Number of fused documents to retrieve
+            filter_metadata: Optional metadata filter for the search
+            timings: Optional dict filled with per-stage timings
+            deadline: Optional request deadline limiting diversification and re-ranking
+
+        Returns:
+            Fused list of retrieved documents
+        """
+        return self._retrieve(
+            queries,
+            queries[0] if queries else "",
+            top_k,
+            filter_metadata,
+            lambda k, stats: self.vector_store.search_many(
+                queries, top_k=k, filter_metadata=filter_metadata, stats=stats, deadline=deadline
+            ),
+            timings,
+            deadline
+        )
+
+    def _retrieve(
+        self,
+        queries: List[str],
+        rerank_query: str,
+        top_k: Optional[int],
+        filter_metadata: Optional[Dict],
+        search: Callable[[int, Dict[str, Any]], List[Dict[str, any]]],
+        timings: Optional[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, any]]:
+        """Run a cached search, optionally followed by cross-encoder re-ranking.
+
+        Args:
+            queries: Queries making up the cache key
+            rerank_query: Query the re-ranker scores documents against
+            top_k: Number of documents to return
+            filter_metadata: Optional metadata filter (part of the cache key)
+            search: Function running the vector store search for a given k, filling a stats dict
+            timings: Optional dict filled with per-stage timings and result counts
+            deadline: Optional request deadline; re-ranking gets at most the
+                time it leaves for optional stages
+
+        Returns:
+            List of retrieved documents
+        """
+        top_k = top_k or settings.top_k_results
+        if settings.adaptive_k_enabled:
+            # The distance cutoff may return fewer, never more
+            top_k = min(top_k, settings.adaptive_max_k)
+        timings = timings if timings is not None else {}
+        cache_key = self._retrieval_cache_key(queries, top_k, filter_metadata)
+
+        cached = self.retrieval_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Retrieval cache hit for {len(queries)} queries: {rerank_query[:100]}")
+            cached_docs, search_stats = cached
+            timings["retrieval_cache_hit"] = True
+            timings.update(search_stats)
+            return [dict(doc) for doc in cached_docs]
+        timings["retrieval_cache_hit"] = False
+
+        started = time.perf_counter()
+        fetch = max(top_k, settings.rerank_candidates) if self.reranker else top_k
+        search_stats = {}
+        docs = search(fetch, search_stats)
+        timings["search_ms"] = (time.perf_counter() - started) * 1000
+        timings.update(search_stats)
+
+        if self.reranker:
+            # The budget covers the whole retrieval, so a slow search leaves less for re-ranking
+            budget_ms = settings.rerank_latency_budget_ms - timings["search_ms"]
+            if deadline is not None:
+                budget_ms = min(budget_ms, deadline.optional_ms())
+            docs, info = self.reranker.rerank(rerank_query, docs, top_k, budget_ms=budget_ms)
+            timings.update(info)
+            if info["skipped_reason"] and deadline is not None:
+                deadline.degrade("rerank", info["skipped_reason"])
+
+        logger.info(
+            "Retrieval timings: " + ", ".join(
+                f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in timings.items()
+            )
+        )
+
+        # Don't cache a degraded (budget-skipped) ranking
+        if docs and not timings.get("skipped_reason") and not timings.get("mmr_skipped"):
+            # Keep the search stats (cutoff counts) so a hit reports the same
+            self.retrieval_cache.put(cache_key, ([dict(doc) for doc in docs], search_stats))
+        return docs
+
+    def _retrieval_cache_key(
+        self,
+        queries: List[str],
+        top_k: int,
+        filter_metadata: Optional[Dict]
+    ) -> tuple:
+        """Build the retrieval cache key, tied to the current collection generation."""
+        return (
+            tuple(normalize_query(q) for q in queries),
+            top_k,
+            json.dumps(filter_metadata, sort_keys=True) if filter_metadata else None,
+            self.vector_store.generation
+        )
+
+    def assemble_passages(
+        self,
+        documents: List[Dict[str, any]],
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, any]]:
+        """Turn retrieved documents into the passages passed to the LLM.
+
+        Hits from the same file that are neighbours are merged into one
+        passage with their overlapping text removed; optionally the top hits
+        are first expanded with their neighbouring chunks, unless a deadline
+        leaves no time for it.
+
+        Args:
+            documents: Retrieved documents in rank order
+            deadline: Optional request deadline
+
+        Returns:
+            Passages in rank order
+        """
+        if not settings.context_merge_chunks:
+            return documents
+
+        neighbours = None
+        if settings.context_neighbour_window > 0 and deadline is not None and not deadline.allows():
+            deadline.degrade("neighbour_expansion", "no time left to fetch neighbouring chunks")
+        elif settings.context_neighbour_window > 0:
+            wanted = neighbour_indices(
+                documents,
+                settings.context_neighbour_window,
+                settings.context_expansion_chars
+            )
+            if wanted:
+                neighbours = self.vector_store.get_chunks_by_index(wanted)
+
+        # Chunks overlap by chunk_overlap characters, give or take whitespace stripping
+        spans = assemble_context(documents, 2 * settings.chunk_overlap, neighbours)
+        if len(spans) < len(documents) or neighbours:
+            logger.info(
+                f"Assembled {len(documents)} hits and {len(neighbours or [])} neighbours "
+                f"into {len(spans)} passages"
+            )
+        return spans
+
+    def build_context(self, documents: List[Dict[str, any]]) -> str:
+        """Format retrieved documents as the context string passed to the LLM.
+
+        Args:
+            documents: Retrieved documents in rank order
+
+        Returns:
+            Formatted context string
+        """
+        return format_context(self.assemble_passages(documents))
+
+    def build_prompt(
         self,
         query: str,
         context: str,
-        conversation_history: Optional[List[Dict[str, str]]] = None
-    ) -> str:
-        """Generate a response using Claude with retrieved context.
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        summaries: Optional[List[str]] = None
+    ) -> tuple:
+        """Build the system prompt and messages for a grounded answer.
 
         Args:
             query: User query
             context: Retrieved context from documents
             conversation_history: Optional list of previous messages
+            summaries: Optional summaries of earlier, omitted conversation
 
         Returns:
-            Generated response
+            Tuple of (system prompt, messages)
         """
-        # Build the system prompt
-        system_prompt = """You are a helpful AI assistant. You answer questions based on the provided context from the knowledge base.
-
-If the context contains relevant information, use it to provide accurate and detailed answers.
-If the context doesn't contain enough information to answer the question, say so honestly.
-Always be clear about what information comes from the provided context."""
+        system_prompt = SYSTEM_PROMPT
+        if summaries:
+            system_prompt += "\n\nSummary of the earlier conversation:\n" + "\n".join(
+                f"- {summary}" for summary in summaries
+            )
 
         # Build the user message with context
         if context:
-            user_message = f"""Context from knowledge base:
-{context}
-
-User question: {query}
-
-Please answer the question based on the context provided above."""
+            user_message = CONTEXT_TEMPLATE.format(context=context, query=query)
         else:
-            user_message = f"""No relevant context was found in the knowledge base.
-
-User question: {query}
-
-Please provide a helpful response, but note that this is based on general knowledge rather than specific documents."""
+            user_message = NO_CONTEXT_TEMPLATE.format(query=query)
 
         # Build messages array
         messages = []
@@ -90,6 +330,31 @@ Please provide a helpful response, but note that this is based on general knowle
             "content": user_message
         })
 
+        return system_prompt, messages
+
+    def generate(
+        self,
+        query: str,
+        context: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        summaries: Optional[List[str]] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Generate a response using Claude with retrieved context.
+
+        Args:
+            query: User query
+            context: Retrieved context from documents
+            conversation_history: Optional list of previous messages
+            summaries: Optional summaries of earlier, omitted conversation
+            timeout: Optional request timeout in seconds (defaults to the client timeout)
+
+        Returns:
+            Generated response
+        """
+        system_prompt, messages = self.build_prompt(query, context, conversation_history, summaries)
+        options = {"timeout": timeout} if timeout is not None else {}
+
         try:
             # Call Claude API
             response = self.client.messages.create(
@@ -97,12 +362,16 @@ Please provide a helpful response, but note that this is based on general knowle
                 max_tokens=settings.max_tokens,
                 temperature=settings.temperature,
                 system=system_prompt,
-                messages=messages
+                messages=messages,
+                **options
             )
 
             # Extract response text
             answer = response.content[0].text
-            logger.info("Generated response successfully")
+            logger.info(
+                f"Generated response successfully "
+                f"({response.usage.input_tokens} input / {response.usage.output_tokens} output tokens)"
+            )
             return answer
 
         except Exception as e:
@@ -113,7 +382,8 @@ Please provide a helpful response, but note that this is based on general knowle
         self,
         query: str,
         context: str,
-        conversation_history: Optional[List[Dict[str, str]]] = None
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        summaries: Optional[List[str]] = None
     ) -> Iterator[str]:
         """Generate a streaming response using Claude with retrieved context.
 
@@ -121,94 +391,325 @@ Please provide a helpful response, but note that this is based on general knowle
             query: User query
             context: Retrieved context from documents
             conversation_history: Optional list of previous messages
+            summaries: Optional summaries of earlier, omitted conversation
 
         Yields:
             Chunks of the generated response
         """
-        # Build the system prompt
-        system_prompt = """You are a helpful AI assistant. You answer questions based on the provided context from the knowledge base.
+        system_prompt, messages = self.build_prompt(query, context, conversation_history, summaries)
 
-If the context contains relevant information, use it to provide accurate and detailed answers.
-If the context doesn't contain enough information to answer the question, say so honestly.
-Always be clear about what information comes from the provided context."""
+        try:
+            # Call Claude API with streaming
+            with self.client.messages.stream(
+                model=settings.model_name,
+                max_tokens=settings.max_tokens,
+                temperature=settings.temperature,
+                system=system_prompt,
+                messages=messages
+            ) as stream:
+                for text in stream.text_stream:
+                    yield text
 
-        # Build the user message with context
-        if context:
-            user_message = f"""Context from knowledge base:
-{context}
+        except Exception as e:
+            logger.error(f"Error in streaming response: {e}")
+            raise
 
-User question: {query}
+    async def agenerate(
+        self,
+        query: str,
+        context: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        summaries: Optional[List[str]] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Async version of generate() using the async Anthropic client.
 
-Please answer the question based on the context provided above."""
-        else:
-            user_message = f"""No relevant context was found in the knowledge base.
+        Args:
+            query: User query
+            context: Retrieved context from documents
+            conversation_history: Optional list of previous messages
+            summaries: Optional summaries of earlier, omitted conversation
+            timeout: Optional request timeout in seconds (defaults to the client timeout)
 
-User question: {query}
+        Returns:
+            Generated response
+        """
+        system_prompt, messages = self.build_prompt(query, context, conversation_history, summaries)
+        options = {"timeout": timeout} if timeout is not None else {}
 
-Please provide a helpful response, but note that this is based on general knowledge rather than specific documents."""
+        try:
+            response = await self.async_client.messages.create(
+                model=settings.model_name,
+                max_tokens=settings.max_tokens,
+                temperature=settings.temperature,
+                system=system_prompt,
+                messages=messages,
+                **options
+            )
 
-        # Build messages array
-        messages = []
+            answer = response.content[0].text
+            logger.info(
+                f"Generated response successfully "
+                f"({response.usage.input_tokens} input / {response.usage.output_tokens} output tokens)"
+            )
+            return answer
 
-        # Add conversation history if provided
-        if conversation_history:
-            messages.extend(conversation_history)
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            raise
 
-        # Add current query
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
+    async def agenerate_stream(
+        self,
+        query: str,
+        context: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        summaries: Optional[List[str]] = None
+    ) -> AsyncIterator[str]:
+        """Async version of generate_stream() using the async Anthropic client.
+
+        Args:
+            query: User query
+            context: Retrieved context from documents
+            conversation_history: Optional list of previous messages
+            summaries: Optional summaries of earlier, omitted conversation
+
+        Yields:
+            Chunks of the generated response
+        """
+        system_prompt, messages = self.build_prompt(query, context, conversation_history, summaries)
 
         try:
-            # Call Claude API with streaming
-            with self.client.messages.stream(
+            async with self.async_client.messages.stream(
                 model=settings.model_name,
                 max_tokens=settings.max_tokens,
                 temperature=settings.temperature,
                 system=system_prompt,
                 messages=messages
             ) as stream:
-                for text in stream.text_stream:
+                async for text in stream.text_stream:
                     yield text
 
         except Exception as e:
             logger.error(f"Error in streaming response: {e}")
             raise
 
-    def query(
+    def prepare_answer(
         self,
         query: str,
+        documents: Optional[List[Dict[str, any]]] = None,
         top_k: Optional[int] = None,
         conversation_history: Optional[List[Dict[str, str]]] = None,
-        stream: bool = False
-    ) -> str | Iterator[str]:
-        """Execute a complete RAG query: retrieve + generate.
+        filter_metadata: Optional[Dict] = None,
+        summaries: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, any]:
+        """Retrieve (if needed), assemble and budget everything a grounded answer needs.
+
+        This is the blocking, CPU- and disk-bound half of answering; the LLM
+        call is made by answer() or aanswer().
+
+        The prompt is packed into settings.prompt_token_budget: oldest history
+        is trimmed first (with summaries standing in for it) and the
+        lowest-scoring passages are dropped first.
 
         Args:
             query: User query
-            top_k: Number of documents to retrieve
+            documents: Pre-retrieved documents (retrieved with query if None)
+            top_k: Number of documents to retrieve when documents is None
             conversation_history: Optional conversation history
-            stream: Whether to stream the response
+            filter_metadata: Metadata filter used when documents is None
+            summaries: Optional summaries of earlier conversation, oldest first
+            deadline: Optional request deadline for retrieval and passage assembly
 
         Returns:
-            Generated response (string or iterator if streaming)
+            Dict with context, conversation_history and summaries to send, plus
+            documents, timings and token_usage to report
         """
         logger.info(f"Processing RAG query: {query[:100]}...")
 
-        # Retrieve relevant documents
-        retrieved_docs = self.retrieve(query, top_k=top_k)
+        timings = {}
+        if documents is None:
+            documents = self.retrieve(
+                query, top_k=top_k, filter_metadata=filter_metadata, timings=timings, deadline=deadline
+            )
+
+        passages = self.assemble_passages(documents, deadline)
+
+        # Fit history, summaries and passages into the prompt token budget; the
+        # fixed part is the prompt that will be sent, minus the passage text
+        if passages:
+            user_message = CONTEXT_TEMPLATE.format(context="", query=query)
+        else:
+            user_message = NO_CONTEXT_TEMPLATE.format(query=query)
+        packed = pack_prompt(
+            SYSTEM_PROMPT + user_message,
+            passages,
+            conversation_history,
+            summaries,
+            total_budget=settings.prompt_token_budget,
+            history_budget=settings.history_token_budget,
+            summary_budget=settings.summary_token_budget
+        )
+        token_usage = packed["token_usage"]
+        logger.info(f"Prompt token estimate: {token_usage}")
+
+        # Report as sources only the documents that made it into the prompt
+        kept_ids = {
+            doc_id for passage in packed["documents"] for doc_id in passage.get("ids", [passage.get("id")])
+        }
+        documents = [doc for doc in documents if doc.get("id") in kept_ids]
+
+        logger.info(f"Answering from {len(documents)} documents")
+
+        return {
+            "context": format_context(packed["documents"]),
+            "conversation_history": packed["conversation_history"],
+            "summaries": packed["summaries"],
+            "documents": documents,
+            "timings": timings,
+            "token_usage": token_usage
+        }
+
+    def answer(
+        self,
+        query: str,
+        documents: Optional[List[Dict[str, any]]] = None,
+        top_k: Optional[int] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        stream: bool = False,
+        filter_metadata: Optional[Dict] = None,
+        summaries: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, any]:
+        """Generate an answer grounded on pre-retrieved documents.
+
+        Callers that already retrieved documents (e.g. to show sources) pass
+        them in so the answer is grounded on exactly those documents and no
+        second search is made. When documents is None they are retrieved here.
 
-        # Format context
-        context = format_context(retrieved_docs)
+        Args:
+            query: User query
+            documents: Pre-retrieved documents (retrieved with query if None)
+            top_k: Number of documents to retrieve when documents is None
+            conversation_history: Optional conversation history
+            stream: Whether to stream the response
+            filter_metadata: Metadata filter used when documents is None
+            summaries: Optional summaries of earlier conversation, oldest first
+            deadline: Optional request deadline; optional stages degrade to meet
+                it and a non-streaming LLM call is timed out by it
 
-        logger.info(f"Retrieved {len(retrieved_docs)} documents")
+        Returns:
+            Dict with:
+                - answer: Generated response (string or iterator if streaming)
+                - documents: Documents the answer was grounded on
+                - timings: Per-stage retrieval timings (empty if documents were passed in)
+                - token_usage: Estimated prompt tokens per part and what was trimmed
+                - degradations: Stages degraded to meet the deadline, with reasons
+        """
+        prepared = self.prepare_answer(
+            query, documents, top_k, conversation_history, filter_metadata, summaries, deadline
+        )
+        if stream:
+            answer = self.generate_stream(
+                query, prepared["context"], prepared["conversation_history"], prepared["summaries"]
+            )
+        else:
+            answer = self.generate(
+                query, prepared["context"], prepared["conversation_history"], prepared["summaries"],
+                timeout=self._generation_timeout(deadline)
+            )
+        return self._answer_result(answer, prepared, deadline)
+
+    async def aanswer(
+        self,
+        query: str,
+        documents: Optional[List[Dict[str, any]]] = None,
+        top_k: Optional[int] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        stream: bool = False,
+        filter_metadata: Optional[Dict] = None,
+        summaries: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, any]:
+        """Async version of answer() for use from request handlers.
+
+        Retrieval and prompt assembly run in the compute thread pool and the
+        LLM call uses the async client, so the event loop is never blocked.
+
+        Args:
+            query: User query
+            documents: Pre-retrieved documents (retrieved with query if None)
+            top_k: Number of documents to retrieve when documents is None
+            conversation_history: Optional conversation history
+            stream: Whether to stream the response (as an async iterator)
+            filter_metadata: Metadata filter used when documents is None
+            summaries: Optional summaries of earlier conversation, oldest first
+            deadline: Optional request deadline (see answer())
 
-        # Generate response
+        Returns:
+            Same as answer()
+        """
+        prepared = await run_compute(
+            self.prepare_answer,
+            query, documents, top_k, conversation_history, filter_metadata, summaries, deadline
+        )
         if stream:
-            return self.generate_stream(query, context, conversation_history)
+            answer = self.agenerate_stream(
+                query, prepared["context"], prepared["conversation_history"], prepared["summaries"]
+            )
         else:
-            return self.generate(query, context, conversation_history)
+            answer = await self.agenerate(
+                query, prepared["context"], prepared["conversation_history"], prepared["summaries"],
+                timeout=self._generation_timeout(deadline)
+            )
+        return self._answer_result(answer, prepared, deadline)
+
+    def _generation_timeout(self, deadline: Optional[Deadline]) -> Optional[float]:
+        """LLM timeout for answer generation under a deadline (None for the client default)."""
+        if deadline is None:
+            return None
+        return deadline.timeout(settings.llm_timeout_seconds, optional=False)
+
+    def _answer_result(
+        self,
+        answer: any,
+        prepared: Dict[str, any],
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, any]:
+        """Build the result dict returned by answer() and aanswer()."""
+        return {
+            "answer": answer,
+            "documents": prepared["documents"],
+            "timings": prepared["timings"],
+            "token_usage": prepared["token_usage"],
+            "degradations": dict(deadline.degradations) if deadline is not None else {}
+        }
+
+    def query(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        stream: bool = False
+    ) -> str | Iterator[str]:
+        """Execute a complete RAG query: retrieve + generate.
+
+        Args:
+            query: User query
+            top_k: Number of documents to retrieve
+            conversation_history: Optional conversation history
+            stream: Whether to stream the response
+
+        Returns:
+            Generated response (string or iterator if streaming)
+        """
+        result = self.answer(
+            query,
+            top_k=top_k,
+            conversation_history=conversation_history,
+            stream=stream
+        )
+        return result["answer"]
 
     def get_store_stats(self) -> Dict[str, any]:
         """Get statistics about the vector store.
@@ -216,8 +717,20 @@ Please provide a helpful response, but note that this is based on general knowle
         Returns:
             Dictionary with store statistics
         """
-        return {
+        cache_stats = {
+            "query_embeddings": self.vector_store.query_embedding_cache.get_stats(),
+            "retrieval_results": self.retrieval_cache.get_stats(),
+            "collection_generation": self.vector_store.generation
+        }
+        if self.vector_store.embedding_cache is not None:
+            cache_stats["persistent_embeddings"] = self.vector_store.embedding_cache.get_stats()
+
+        stats = {
             "total_documents": self.vector_store.get_collection_count(),
             "collection_name": settings.collection_name,
-            "embedding_model": settings.embedding_model
+            "embedding_model": settings.embedding_model,
+            "cache": cache_stats
         }
+        if self.reranker:
+            stats["reranker"] = self.reranker.get_stats()
+        return stats
@@ -0,0 +1,150 @@
+"""Cross-encoder re-ranking of retrieved documents."""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+from config import settings
+
+
+class CrossEncoderReranker:
+    """Re-rank candidate documents by scoring (query, chunk) pairs with a cross-encoder.
+
+    The model is loaded lazily on first use and runs on CPU. Pairs are scored
+    in batches; if the latency budget runs out before all batches are done,
+    re-ranking is abandoned and the original order is kept.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+        latency_budget_ms: Optional[int] = None
+    ):
+        """Initialize the reranker.
+
+        Args:
+            model_name: Cross-encoder model (defaults to settings.rerank_model)
+            batch_size: Pairs scored per forward pass (defaults to settings.rerank_batch_size)
+            score_threshold: Drop documents scoring below this (defaults to settings.rerank_score_threshold)
+            latency_budget_ms: Time allowed for scoring (defaults to settings.rerank_latency_budget_ms)
+        """
+        self.model_name = model_name or settings.rerank_model
+        self.batch_size = batch_size or settings.rerank_batch_size
+        self.score_threshold = score_threshold if score_threshold is not None else settings.rerank_score_threshold
+        self.latency_budget_ms = latency_budget_ms or settings.rerank_latency_budget_ms
+
+        self._model = None
+        self._load_lock = threading.Lock()
+
+        self.calls = 0
+        self.skipped = 0
+        self.total_ms = 0.0
+
+    def load(self):
+        """Load the cross-encoder if it is not loaded yet (e.g. at startup).
+
+        Returns:
+            The loaded CrossEncoder
+        """
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    started = time.perf_counter()
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+                    logger.info(
+                        f"Loaded cross-encoder {self.model_name} "
+                        f"in {time.perf_counter() - started:.2f}s"
+                    )
+        return self._model
+
+    @property
+    def model(self):
+        """Load the cross-encoder on first use."""
+        return self.load()
+
+    def rerank(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_k: int,
+        budget_ms: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Re-rank documents for a query and keep the best top_k.
+
+        Args:
+            query: Query the documents were retrieved for
+            documents: Candidate documents in retrieval order
+            top_k: Number of documents to keep
+            budget_ms: Time left for re-ranking (defaults to the configured budget)
+
+        Returns:
+            Tuple of (documents, info) where documents carry a 'rerank_score' and
+            info holds 'rerank_ms', 'reranked', 'skipped_reason' and 'dropped'
+        """
+        budget_ms = self.latency_budget_ms if budget_ms is None else budget_ms
+        info = {"rerank_ms": 0.0, "reranked": False, "skipped_reason": None, "dropped": 0}
+
+        if not documents:
+            return documents, info
+        if budget_ms <= 0:
+            return self._skip(documents, top_k, info, "latency budget exhausted before re-ranking")
+
+        started = time.perf_counter()
+        pairs = [(query, doc['content']) for doc in documents]
+        scores = []
+        try:
+            for start in range(0, len(pairs), self.batch_size):
+                if (time.perf_counter() - started) * 1000 > budget_ms:
+                    info["rerank_ms"] = (time.perf_counter() - started) * 1000
+                    return self._skip(documents, top_k, info, "latency budget exceeded")
+                batch = pairs[start:start + self.batch_size]
+                scores.extend(float(s) for s in self.model.predict(batch, batch_size=len(batch)))
+        except Exception as e:
+            logger.error(f"Error re-ranking documents: {e}")
+            info["rerank_ms"] = (time.perf_counter() - started) * 1000
+            return self._skip(documents, top_k, info, "re-ranking failed")
+
+        ranked = sorted(zip(documents, scores), key=lambda pair: pair[1], reverse=True)
+        reranked = []
+        for doc, score in ranked[:top_k]:
+            if self.score_threshold is not None and score < self.score_threshold:
+                info["dropped"] += 1
+                continue
+            doc = dict(doc)
+            doc['rerank_score'] = score
+            reranked.append(doc)
+
+        info["rerank_ms"] = (time.perf_counter() - started) * 1000
+        info["reranked"] = True
+        self.calls += 1
+        self.total_ms += info["rerank_ms"]
+        return reranked, info
+
+    def _skip(
+        self,
+        documents: List[Dict[str, Any]],
+        top_k: int,
+        info: Dict[str, Any],
+        reason: str
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Fall back to the retrieval order."""
+        logger.warning(f"Skipping re-ranking: {reason}")
+        info["skipped_reason"] = reason
+        self.skipped += 1
+        return documents[:top_k], info
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get re-ranking statistics.
+
+        Returns:
+            Dictionary with call counts and average latency
+        """
+        return {
+            "model": self.model_name,
+            "calls": self.calls,
+            "skipped": self.skipped,
+            "avg_ms": self.total_ms / self.calls if self.calls else 0.0
+        }
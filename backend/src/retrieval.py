@@ -0,0 +1,236 @@
+"""Ranking helpers for combining and selecting retrieval candidates."""
+from typing import Dict, List, Optional
+import numpy as np
+
+# Visibility values set on uploaded documents; anything else (including no
+# visibility at all, as for ingested knowledge base files) is shared with everyone
+UPLOAD_VISIBILITIES = ["personal", "org-wide"]
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict[str, any]]],
+    top_k: int,
+    k: int = 60
+) -> List[Dict[str, any]]:
+    """Fuse several ranked result lists with reciprocal rank fusion.
+
+    Each document scores sum(1 / (k + rank)) over the lists it appears in, so
+    documents ranked well by several retrievers rise to the top. Documents are
+    deduplicated by 'id'; the first copy seen (keeping e.g. its distance) wins.
+
+    Args:
+        result_lists: Ranked lists of documents with an 'id' key
+        top_k: Number of fused results to return
+        k: RRF smoothing constant
+
+    Returns:
+        Fused list of documents, each with an added 'rrf_score'
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Dict[str, any]] = {}
+
+    for results in result_lists:
+        for rank, doc in enumerate(results, 1):
+            doc_id = doc['id']
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+            if doc_id not in docs:
+                docs[doc_id] = dict(doc)
+            elif docs[doc_id].get('distance') is None and doc.get('distance') is not None:
+                docs[doc_id]['distance'] = doc['distance']
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    fused = []
+    for doc_id in ranked:
+        doc = docs[doc_id]
+        doc['rrf_score'] = scores[doc_id]
+        fused.append(doc)
+    return fused
+
+
+def maximal_marginal_relevance(
+    query_embeddings: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    top_k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """Select a relevant but diverse subset of candidates with MMR.
+
+    Each step picks the candidate maximizing
+    lambda * relevance - (1 - lambda) * (max similarity to already selected),
+    so near-duplicates of a selected chunk (e.g. overlapping neighbours from
+    the same file) are pushed down. Relevance is the best cosine similarity
+    to any of the queries. All similarities are computed up front with one
+    matrix product each.
+
+    Args:
+        query_embeddings: Query vectors of shape (n_queries, dim)
+        candidate_embeddings: Candidate vectors of shape (n_candidates, dim)
+        top_k: Number of candidates to select
+        lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by diversity
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    candidates = _normalize(np.atleast_2d(np.asarray(candidate_embeddings, dtype=np.float32)))
+    queries = _normalize(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+    top_k = min(top_k, len(candidates))
+    if top_k <= 0:
+        return []
+
+    relevance = (candidates @ queries.T).max(axis=1)
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < top_k:
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+    return selected
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def adaptive_cutoff(
+    docs: List[Dict[str, any]],
+    max_distance: Optional[float],
+    max_gap: Optional[float],
+    min_k: int
+) -> List[Dict[str, any]]:
+    """Drop low-value tail results by distance.
+
+    A document is dropped if its distance exceeds max_distance, or if it
+    lies beyond the first large relative gap in the sorted distances (a jump
+    of more than max_gap times the previous distance), which separates the
+    relevant cluster from the tail. Documents without a distance (lexical-only
+    hybrid hits) are kept. At least min_k documents are always kept.
+
+    Args:
+        docs: Ranked documents with optional 'distance'
+        max_distance: Absolute distance cutoff (None disables)
+        max_gap: Relative gap cutoff (None disables)
+        min_k: Minimum number of documents to keep
+
+    Returns:
+        Kept documents in their original order
+    """
+    distances = sorted(d['distance'] for d in docs if d.get('distance') is not None)
+    if not distances:
+        return docs
+
+    cutoff = distances[-1]
+    if max_distance is not None:
+        cutoff = min(cutoff, max_distance)
+    if max_gap is not None:
+        for previous, current in zip(distances, distances[1:]):
+            if previous > 0 and (current - previous) / previous > max_gap:
+                cutoff = min(cutoff, previous)
+                break
+
+    kept = [d for d in docs if d.get('distance') is None or d['distance'] <= cutoff]
+    if len(kept) < min_k:
+        # Top up with the best-ranked dropped documents
+        kept_ids = {id(d) for d in kept}
+        extra = [d for d in docs if id(d) not in kept_ids][:min_k - len(kept)]
+        extra_ids = {id(d) for d in extra}
+        kept = [d for d in docs if id(d) in kept_ids or id(d) in extra_ids]
+    return kept
+
+
+def build_access_filter(
+    org_id: Optional[str],
+    user_id: Optional[str],
+    selected_sources: Optional[List[str]] = None
+) -> Dict[str, any]:
+    """Build the ``where`` filter restricting a search to what a user may see.
+
+    A user sees the shared knowledge base, org-wide uploads of their
+    organization and their own personal uploads. When selected_sources is
+    given, uploads are further limited to those sources; the shared knowledge
+    base is not listed as selectable and always stays searchable.
+
+    Args:
+        org_id: Organization of the requesting user
+        user_id: Requesting user
+        selected_sources: Optional list of upload source names to restrict to
+
+    Returns:
+        Chroma-style where filter
+    """
+    clauses = [{"visibility": {"$nin": UPLOAD_VISIBILITIES}}]
+    source_clause = [{"source": {"$in": selected_sources}}] if selected_sources else []
+
+    if org_id:
+        clauses.append({"$and": [{"visibility": "org-wide"}, {"org_id": org_id}] + source_clause})
+    if user_id:
+        clauses.append({"$and": [{"visibility": "personal"}, {"user_id": user_id}] + source_clause})
+
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def matches_filter(metadata: Dict[str, any], where: Dict[str, any]) -> bool:
+    """Evaluate a Chroma-style ``where`` filter against a metadata dict.
+
+    Supports the operators used in this codebase: $and, $or, $eq, $ne, $in,
+    $nin, $gt, $gte, $lt, $lte and implicit equality.
+
+    Args:
+        metadata: Chunk metadata
+        where: Filter expression
+
+    Returns:
+        True if the metadata satisfies the filter
+    """
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if not _compare(value, op, operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+
+    return True
+
+
+def _compare(value: any, op: str, operand: any) -> bool:
+    """Apply a single filter operator."""
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if value is None:
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    raise ValueError(f"Unsupported filter operator: {op}")
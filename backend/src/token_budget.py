@@ -0,0 +1,176 @@
+"""Token budgeting for the prompts sent to Claude."""
+import math
+from typing import Any, Dict, List, Optional
+
+# Rough characters per token for English prose with Claude's tokenizer
+CHARS_PER_TOKEN = 3.5
+
+# Per-message framing overhead (role markers etc.)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without calling the API.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated number of tokens
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(message: Dict[str, str]) -> int:
+    """Estimate the token count of one chat message, including framing."""
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def document_score(doc: Dict[str, Any], rank: int) -> float:
+    """Relevance of a retrieved document, higher is better.
+
+    Uses the strongest signal available: cross-encoder score, then fusion
+    score, then vector distance, then retrieval rank.
+
+    Args:
+        doc: Retrieved document or merged span
+        rank: Position of the document in retrieval order
+
+    Returns:
+        Score comparable across the documents of one request
+    """
+    for key in ("rerank_score", "rrf_score"):
+        if doc.get(key) is not None:
+            return float(doc[key])
+    if doc.get("distance") is not None:
+        return -float(doc["distance"])
+    return -float(rank)
+
+
+def trim_history(
+    history: List[Dict[str, str]],
+    budget: int
+) -> List[Dict[str, str]]:
+    """Keep the most recent messages that fit in the budget.
+
+    Oldest messages are dropped first, and the kept history always starts
+    with a user message as the Messages API requires.
+
+    Args:
+        history: Conversation messages in chronological order
+        budget: Token budget for the history
+
+    Returns:
+        The kept suffix of the history
+    """
+    used = 0
+    start = len(history)
+    for i in range(len(history) - 1, -1, -1):
+        cost = estimate_message_tokens(history[i])
+        if used + cost > budget:
+            break
+        used += cost
+        start = i
+
+    kept = history[start:]
+    while kept and kept[0].get("role") != "user":
+        kept = kept[1:]
+    return kept
+
+
+def pack_prompt(
+    fixed_text: str,
+    documents: List[Dict[str, Any]],
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    summaries: Optional[List[str]] = None,
+    total_budget: int = 12000,
+    history_budget: int = 3000,
+    summary_budget: int = 800
+) -> Dict[str, Any]:
+    """Fit history, summaries and retrieved context into a token budget.
+
+    The fixed part of the prompt (system prompt and question) is always
+    kept. History gets up to history_budget, dropping oldest messages first.
+    Summaries of earlier conversation are only used when history had to be
+    trimmed, standing in for the dropped turns, up to summary_budget.
+    Retrieved documents get everything left over; the lowest-scoring ones
+    are dropped first, and if even the best one does not fit it is truncated.
+
+    Args:
+        fixed_text: Text always sent (system prompt, question and template)
+        documents: Retrieved documents or merged spans in rank order
+        conversation_history: Optional previous messages, chronological
+        summaries: Optional summaries of earlier conversation, oldest first
+        total_budget: Token budget for the whole prompt
+        history_budget: Maximum tokens for conversation history
+        summary_budget: Maximum tokens for summaries
+
+    Returns:
+        Dict with:
+            - documents: Kept documents, in their original order
+            - conversation_history: Kept messages
+            - summaries: Kept summaries
+            - token_usage: Estimated tokens per part, budget and what was dropped
+    """
+    history = conversation_history or []
+    fixed_tokens = estimate_tokens(fixed_text)
+    available = max(0, total_budget - fixed_tokens)
+
+    kept_history = trim_history(history, min(history_budget, available))
+    history_tokens = sum(estimate_message_tokens(m) for m in kept_history)
+    available -= history_tokens
+
+    # Newest summaries are most relevant to a follow-up question
+    kept_summaries = []
+    summary_tokens = 0
+    if summaries and len(kept_history) < len(history):
+        for summary in reversed(summaries):
+            cost = estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS
+            if summary_tokens + cost > min(summary_budget, available):
+                break
+            kept_summaries.insert(0, summary)
+            summary_tokens += cost
+    available -= summary_tokens
+
+    costs = [estimate_tokens(doc.get("content", "")) + MESSAGE_OVERHEAD_TOKENS for doc in documents]
+    by_score = sorted(
+        range(len(documents)),
+        key=lambda i: document_score(documents[i], i),
+        reverse=True
+    )
+    keep = set()
+    context_tokens = 0
+    for i in by_score:
+        if context_tokens + costs[i] <= available:
+            keep.add(i)
+            context_tokens += costs[i]
+
+    kept_documents = [doc for i, doc in enumerate(documents) if i in keep]
+    truncated = False
+    if not kept_documents and documents and available > MESSAGE_OVERHEAD_TOKENS:
+        best = dict(documents[by_score[0]])
+        max_chars = int((available - MESSAGE_OVERHEAD_TOKENS) * CHARS_PER_TOKEN)
+        best["content"] = best.get("content", "")[:max_chars]
+        kept_documents = [best]
+        context_tokens = estimate_tokens(best["content"]) + MESSAGE_OVERHEAD_TOKENS
+        truncated = True
+
+    return {
+        "documents": kept_documents,
+        "conversation_history": kept_history,
+        "summaries": kept_summaries,
+        "token_usage": {
+            "budget": total_budget,
+            "fixed": fixed_tokens,
+            "history": history_tokens,
+            "summaries": summary_tokens,
+            "context": context_tokens,
+            "total": fixed_tokens + history_tokens + summary_tokens + context_tokens,
+            "dropped_documents": len(documents) - len(kept_documents),
+            "truncated_document": truncated,
+            "dropped_messages": len(history) - len(kept_history),
+            "dropped_summaries": len(summaries or []) - len(kept_summaries)
+        }
+    }
@@ -51,6 +51,18 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
+def normalize_query(query: str) -> str:
+    """Normalize a query for use as a cache key.
+
+    Args:
+        query: Raw query text
+
+    Returns:
+        Lowercased query with collapsed whitespace and trailing punctuation removed
+    """
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
 def chunk_text(text: str, chunk_size: int = None, overlap: int = None) -> list[str]:
     """Split text into overlapping chunks.
 
@@ -93,7 +105,7 @@ def format_context(retrieved_docs: list[dict]) -> str:
     """Format retrieved documents into context for the LLM.
 
     Args:
-        retrieved_docs: List of retrieved document chunks with metadata
+        retrieved_docs: List of retrieved document chunks (or merged spans) with metadata
 
     Returns:
         Formatted context string
@@ -105,6 +117,10 @@ def format_context(retrieved_docs: list[dict]) -> str:
     for i, doc in enumerate(retrieved_docs, 1):
         content = doc.get("content", "")
         source = doc.get("metadata", {}).get("source", "Unknown")
+        # Merged spans (see context_assembly) note which chunks they cover
+        indices = doc.get("chunk_indices") or []
+        if len(indices) > 1:
+            source = f"{source}, chunks {indices[0] + 1}-{indices[-1] + 1}"
         context_parts.append(f"[Source {i}: {source}]\n{content}")
 
     return "\n\n".join(context_parts)
@@ -0,0 +1,838 @@
+"""Storage backends for VectorStore: ChromaDB (HNSW) and exact NumPy search."""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+from config import settings
+from cache import LRUCache
+from retrieval import matches_filter
+
+# Maximum number of IDs to look up per backend call
+LOOKUP_BATCH_SIZE = 500
+
+# Quantization modes supported by the NumPy backend
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Number of set bits in every byte value, for Hamming distances on packed codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Scalar-quantize vectors to int8 with one scale per vector.
+
+    Args:
+        vectors: float32 array of shape (n, dim)
+
+    Returns:
+        Tuple of (int8 codes of shape (n, dim), float32 scales of shape (n,))
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.clip(np.round(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """Binary-quantize vectors to packed sign bits.
+
+    Args:
+        vectors: float32 array of shape (n, dim)
+
+    Returns:
+        uint8 array of shape (n, ceil(dim / 8))
+    """
+    return np.packbits(vectors > 0, axis=1)
+
+
+class VectorBackend:
+    """Interface implemented by the storage backends behind VectorStore.
+
+    Backends store precomputed embeddings with their text and metadata;
+    embedding, caching and hybrid ranking stay in VectorStore.
+    """
+
+    name = "base"
+
+    def count(self) -> int:
+        """Get the number of stored chunks."""
+        raise NotImplementedError
+
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict]:
+        """Get metadata for the given IDs that exist in the store."""
+        raise NotImplementedError
+
+    def get_ids(self, where: Optional[Dict] = None) -> List[str]:
+        """Get IDs of all chunks matching a metadata filter (all chunks if None)."""
+        raise NotImplementedError
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Get stored embeddings for the given IDs that exist in the store."""
+        raise NotImplementedError
+
+    def get_chunks(self, where: Dict) -> List[Dict[str, any]]:
+        """Get all chunks (id, content, metadata) matching a metadata filter."""
+        raise NotImplementedError
+
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings: List[np.ndarray],
+        contents: List[str],
+        metadatas: List[Dict]
+    ) -> None:
+        """Insert or replace chunks."""
+        raise NotImplementedError
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]) -> None:
+        """Replace the metadata of stored chunks, keeping their embeddings."""
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]) -> None:
+        """Delete chunks by ID."""
+        raise NotImplementedError
+
+    def query(
+        self,
+        embeddings: List[np.ndarray],
+        top_k: int,
+        where: Optional[Dict] = None
+    ) -> List[List[Dict[str, any]]]:
+        """Find the nearest chunks for each query embedding.
+
+        Returns one list per query of documents with id, content, metadata
+        and distance (squared L2 between normalized vectors), nearest first.
+        """
+        raise NotImplementedError
+
+    def iter_chunks(self, batch_size: int = LOOKUP_BATCH_SIZE) -> Iterator[Tuple[List, List, List]]:
+        """Iterate over all chunks as (ids, contents, metadatas) batches."""
+        raise NotImplementedError
+
+    def get_info(self, key: str) -> Optional[str]:
+        """Get a value stored with the collection (e.g. a completed migration)."""
+        raise NotImplementedError
+
+    def set_info(self, key: str, value: str) -> None:
+        """Store a value with the collection; it is removed by reset()."""
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Remove all chunks and recreate empty storage."""
+        raise NotImplementedError
+
+    def drop(self) -> None:
+        """Remove the storage entirely."""
+        raise NotImplementedError
+
+
+class ChromaBackend(VectorBackend):
+    """Approximate nearest-neighbour search using a ChromaDB HNSW collection."""
+
+    name = "chroma"
+
+    def __init__(self, path: Path, collection_name: str, embedding_function):
+        """Initialize ChromaDB client and collection.
+
+        Args:
+            path: ChromaDB storage directory
+            collection_name: Collection name
+            embedding_function: Embedding function registered with the collection
+        """
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        # Ensure the chroma_db directory exists
+        path.mkdir(parents=True, exist_ok=True)
+
+        self.collection_name = collection_name
+        self.embedding_function = embedding_function
+        self.client = chromadb.PersistentClient(
+            path=str(path),
+            settings=ChromaSettings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+        self.collection = self._get_or_create_collection()
+
+        logger.info(f"Initialized ChromaDB collection: {collection_name}")
+
+    def _get_or_create_collection(self):
+        """Get or create the collection."""
+        return self.client.get_or_create_collection(
+            name=self.collection_name,
+            embedding_function=self.embedding_function,
+            metadata={"description": "CTLChat RAG document embeddings"}
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict]:
+        found = {}
+        for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+            result = self.collection.get(
+                ids=ids[start:start + LOOKUP_BATCH_SIZE],
+                include=['metadatas']
+            )
+            for doc_id, metadata in zip(result['ids'], result['metadatas'] or []):
+                found[doc_id] = metadata or {}
+        return found
+
+    def get_ids(self, where: Optional[Dict] = None) -> List[str]:
+        return self.collection.get(where=where or None, include=[])['ids']
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+            result = self.collection.get(
+                ids=ids[start:start + LOOKUP_BATCH_SIZE],
+                include=['embeddings']
+            )
+            for doc_id, embedding in zip(result['ids'], result['embeddings']):
+                found[doc_id] = np.asarray(embedding, dtype=np.float32)
+        return found
+
+    def get_chunks(self, where: Dict) -> List[Dict[str, any]]:
+        result = self.collection.get(where=where, include=['documents', 'metadatas'])
+        return [
+            {'id': doc_id, 'content': content, 'metadata': metadata or {}}
+            for doc_id, content, metadata in zip(
+                result['ids'], result['documents'], result['metadatas']
+            )
+        ]
+
+    def upsert(self, ids, embeddings, contents, metadatas) -> None:
+        self.collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=contents,
+            metadatas=metadatas
+        )
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]) -> None:
+        for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+            self.collection.update(
+                ids=ids[start:start + LOOKUP_BATCH_SIZE],
+                metadatas=metadatas[start:start + LOOKUP_BATCH_SIZE]
+            )
+
+    def delete(self, ids: List[str]) -> None:
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def query(self, embeddings, top_k, where=None) -> List[List[Dict[str, any]]]:
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=top_k,
+            where=where
+        )
+
+        # Format results
+        ranked_lists = []
+        for q in range(len(embeddings)):
+            retrieved_docs = []
+            if results and results['documents'] and results['documents'][q]:
+                for i, content in enumerate(results['documents'][q]):
+                    retrieved_docs.append({
+                        'content': content,
+                        'metadata': results['metadatas'][q][i] if results['metadatas'] else {},
+                        'distance': results['distances'][q][i] if results['distances'] else None,
+                        'id': results['ids'][q][i] if results['ids'] else None
+                    })
+            ranked_lists.append(retrieved_docs)
+        return ranked_lists
+
+    def iter_chunks(self, batch_size: int = LOOKUP_BATCH_SIZE):
+        offset = 0
+        while True:
+            result = self.collection.get(
+                include=['documents', 'metadatas'],
+                limit=batch_size,
+                offset=offset
+            )
+            if not result['ids']:
+                break
+            yield result['ids'], result['documents'], result['metadatas']
+            offset += len(result['ids'])
+
+    def get_info(self, key: str) -> Optional[str]:
+        # Fetched again so that values set by other processes are seen
+        metadata = self.client.get_collection(name=self.collection_name).metadata or {}
+        return metadata.get(key)
+
+    def set_info(self, key: str, value: str) -> None:
+        metadata = self.client.get_collection(name=self.collection_name).metadata or {}
+        self.collection.modify(metadata={**metadata, key: value})
+
+    def reset(self) -> None:
+        self.drop()
+        self.collection = self._get_or_create_collection()
+
+    def drop(self) -> None:
+        self.client.delete_collection(name=self.collection_name)
+
+
+class NumpyBackend(VectorBackend):
+    """Exact brute-force search over a memory-mapped embedding matrix.
+
+    Normalized embeddings live in a float16/float32 memory-mapped file with
+    one row per chunk; chunk IDs, text and metadata live in a SQLite sidecar
+    and are mirrored in memory. Search is a blocked matrix product followed
+    by argpartition, which for corpora up to ~100k chunks is faster and more
+    predictable than HNSW, with no recall loss.
+
+    With quantization enabled, candidate search scans compact int8 (4x
+    smaller than float32) or binary (32x smaller) codes instead, and only a
+    shortlist of top_k * rescore_factor rows is rescored exactly against the
+    full-precision matrix, which then stays mostly paged out.
+
+    Several processes (the API and scripts/ingest_documents.py) can share a
+    store: writes hold a SQLite write lock on the sidecar and bump a stored
+    generation, and a process that sees a newer generation reloads before
+    reading (checked at most every RELOAD_CHECK_SECONDS) or writing.
+    """
+
+    name = "numpy"
+
+    # Rows multiplied per block, bounding float32 temporaries during search
+    SEARCH_BLOCK_ROWS = 16384
+
+    # Minimum seconds between checks for changes made by other processes
+    RELOAD_CHECK_SECONDS = 1.0
+
+    def __init__(
+        self,
+        path: Path,
+        collection_name: str,
+        dtype: str = "float16",
+        quantization: str = "none",
+        rescore_factor: int = 8
+    ):
+        """Open (or create) the store.
+
+        Args:
+            path: Directory holding the store files
+            collection_name: Collection name (used as a subdirectory)
+            dtype: Storage dtype for embeddings ("float16" or "float32")
+            quantization: Candidate search codes: "none", "int8" or "binary"
+            rescore_factor: Shortlist size for exact rescoring, as a multiple of top_k
+        """
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {quantization}")
+
+        self.path = Path(path) / collection_name
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        self.matrix_path = self.path / f"embeddings.{self.dtype.name}"
+        self.sidecar_path = self.path / "chunks.db"
+        self._lock = threading.RLock()
+
+        # Cached boolean row masks per (filter, store version)
+        self._filter_masks = LRUCache(maxsize=256)
+        self._version = 0
+        self._checked_at = time.monotonic()
+
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    row INTEGER PRIMARY KEY,
+                    doc_id TEXT NOT NULL UNIQUE,
+                    content TEXT NOT NULL,
+                    metadata TEXT
+                );
+                CREATE TABLE IF NOT EXISTS store_info (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                """
+            )
+            conn.commit()
+
+        self._load()
+        logger.info(
+            f"Initialized NumPy vector store at {self.path} "
+            f"({self.count()} chunks, quantization: {self.quantization})"
+        )
+
+    @contextmanager
+    def get_connection(self):
+        """Context manager for sidecar database connections.
+
+        Yields:
+            sqlite3.Connection: Database connection
+        """
+        conn = sqlite3.connect(self.sidecar_path, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _load(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Load the sidecar into memory and map the embedding matrix.
+
+        Args:
+            conn: Optional open sidecar connection (e.g. one holding the write lock)
+        """
+        if conn is None:
+            with self.get_connection() as conn:
+                return self._load(conn)
+
+        info = dict(conn.execute("SELECT key, value FROM store_info").fetchall())
+        rows = conn.execute("SELECT row, doc_id, content, metadata FROM chunks").fetchall()
+
+        self.generation = int(info.get("generation", 0))
+        self.dim = int(info.get("dim", 0))
+        self.capacity = int(info.get("capacity", 0))
+
+        self.ids: List[Optional[str]] = [None] * self.capacity
+        self.contents: List[Optional[str]] = [None] * self.capacity
+        self.metadatas: List[Optional[Dict]] = [None] * self.capacity
+        self.row_of: Dict[str, int] = {}
+        self.active = np.zeros(self.capacity, dtype=bool)
+
+        for row, doc_id, content, metadata in rows:
+            self.ids[row] = doc_id
+            self.contents[row] = content
+            self.metadatas[row] = json.loads(metadata) if metadata else {}
+            self.row_of[doc_id] = row
+            self.active[row] = True
+
+        self.free_rows = [row for row in range(self.capacity) if not self.active[row]]
+        self.matrix = self.codes = self.scales = None
+        if not self.capacity or not self.matrix_path.exists():
+            return
+
+        for attr, path, dtype, row_shape in self._arrays():
+            if path.exists():
+                setattr(self, attr, np.memmap(
+                    path, dtype=dtype, mode="r+", shape=(self.capacity,) + row_shape
+                ))
+
+        # Codes are missing or were written under another mode: rebuild them
+        if self.quantization != "none" and (
+            self.codes is None or info.get("quantization") != self.quantization
+        ):
+            self._rebuild_codes(conn)
+
+    def _arrays(self) -> List[Tuple[str, Path, np.dtype, tuple]]:
+        """Memory-mapped arrays of the store as (attribute, path, dtype, row shape)."""
+        arrays = [("matrix", self.matrix_path, self.dtype, (self.dim,))]
+        if self.quantization == "int8":
+            arrays.append(("codes", self.path / "codes.int8", np.dtype(np.int8), (self.dim,)))
+            arrays.append(("scales", self.path / "scales.float32", np.dtype(np.float32), ()))
+        elif self.quantization == "binary":
+            arrays.append(("codes", self.path / "codes.binary", np.dtype(np.uint8), ((self.dim + 7) // 8,)))
+        return arrays
+
+    def _rebuild_codes(self, conn: sqlite3.Connection) -> None:
+        """Recompute the quantized codes of every row from the full-precision matrix.
+
+        Args:
+            conn: Open sidecar connection (committed here unless already in a transaction)
+        """
+        logger.info(f"Building {self.quantization} codes for {self.count()} chunks")
+        for attr, path, dtype, row_shape in self._arrays()[1:]:
+            setattr(self, attr, np.memmap(
+                path, dtype=dtype, mode="w+", shape=(self.capacity,) + row_shape
+            ))
+        for start in range(0, self.capacity, self.SEARCH_BLOCK_ROWS):
+            rows = np.arange(start, min(start + self.SEARCH_BLOCK_ROWS, self.capacity))
+            self._write_codes(rows, self.matrix[rows].astype(np.float32))
+        in_transaction = conn.in_transaction
+        self._save_info(conn)
+        if not in_transaction:
+            conn.commit()
+
+    def _write_codes(self, rows, vectors: np.ndarray) -> None:
+        """Write the quantized codes for the given rows.
+
+        Args:
+            rows: Row indices
+            vectors: Normalized float32 vectors for those rows
+        """
+        if self.quantization == "int8":
+            self.codes[rows], self.scales[rows] = quantize_int8(vectors)
+            self.scales.flush()
+        elif self.quantization == "binary":
+            self.codes[rows] = quantize_binary(vectors)
+        else:
+            return
+        self.codes.flush()
+
+    def _save_info(self, conn: sqlite3.Connection) -> None:
+        """Persist the generation, matrix shape and quantization information."""
+        conn.executemany(
+            "INSERT OR REPLACE INTO store_info (key, value) VALUES (?, ?)",
+            [
+                ("generation", str(self.generation)),
+                ("dim", str(self.dim)),
+                ("capacity", str(self.capacity)),
+                ("quantization", self.quantization)
+            ]
+        )
+
+    def _sync(self, conn: sqlite3.Connection) -> None:
+        """Reload the store if another process wrote to it since it was loaded.
+
+        Args:
+            conn: Open sidecar connection
+        """
+        row = conn.execute("SELECT value FROM store_info WHERE key = 'generation'").fetchone()
+        generation = int(row[0]) if row else 0
+        if generation != self.generation:
+            logger.info(f"NumPy vector store at {self.path} changed on disk, reloading")
+            self._load(conn)
+            self._version += 1
+        self._checked_at = time.monotonic()
+
+    def _check_for_changes(self) -> None:
+        """Pick up writes made by other processes before a read (rate-limited)."""
+        if time.monotonic() - self._checked_at < self.RELOAD_CHECK_SECONDS:
+            return
+        with self.get_connection() as conn:
+            self._sync(conn)
+
+    @contextmanager
+    def _write(self):
+        """Run a write under the in-process lock and the sidecar write lock.
+
+        The store is first brought up to date with other processes' writes,
+        so rows are allocated from the current free list, and the stored
+        generation is bumped on commit. The row lists are replaced rather
+        than modified in place, so searches running outside the lock see a
+        consistent snapshot.
+
+        Yields:
+            sqlite3.Connection: Sidecar connection holding the write lock
+        """
+        with self._lock, self.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync(conn)
+                # Copy on write: searches keep scoring against the lists they snapshot
+                self.ids, self.contents, self.metadatas = (
+                    list(self.ids), list(self.contents), list(self.metadatas)
+                )
+                yield conn
+                self.generation += 1
+                self._save_info(conn)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                self._load(conn)
+                raise
+            finally:
+                self._version += 1
+
+    def _grow(self, needed: int) -> None:
+        """Grow the matrix (doubling) so that at least `needed` more rows are free.
+
+        Args:
+            needed: Number of free rows required
+        """
+        if len(self.free_rows) >= needed:
+            return
+
+        old_capacity = self.capacity
+        new_capacity = max(1024, old_capacity * 2)
+        while new_capacity - old_capacity + len(self.free_rows) < needed:
+            new_capacity *= 2
+
+        for attr, path, dtype, row_shape in self._arrays():
+            tmp_path = path.with_suffix(".tmp")
+            new_array = np.memmap(tmp_path, dtype=dtype, mode="w+", shape=(new_capacity,) + row_shape)
+            old_array = getattr(self, attr)
+            if old_array is not None:
+                new_array[:old_capacity] = old_array
+                setattr(self, attr, None)
+                del old_array
+            new_array.flush()
+            del new_array
+            tmp_path.replace(path)
+            setattr(self, attr, np.memmap(
+                path, dtype=dtype, mode="r+", shape=(new_capacity,) + row_shape
+            ))
+
+        extra = new_capacity - old_capacity
+        self.ids.extend([None] * extra)
+        self.contents.extend([None] * extra)
+        self.metadatas.extend([None] * extra)
+        self.active = np.concatenate([self.active, np.zeros(extra, dtype=bool)])
+        self.free_rows.extend(range(old_capacity, new_capacity))
+        self.capacity = new_capacity
+
+    def count(self) -> int:
+        with self._lock:
+            self._check_for_changes()
+            return len(self.row_of)
+
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict]:
+        with self._lock:
+            self._check_for_changes()
+            return {
+                doc_id: self.metadatas[self.row_of[doc_id]]
+                for doc_id in ids if doc_id in self.row_of
+            }
+
+    def get_ids(self, where: Optional[Dict] = None) -> List[str]:
+        with self._lock:
+            self._check_for_changes()
+            rows = np.flatnonzero(self._mask(where))
+            return [self.ids[row] for row in rows]
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            self._check_for_changes()
+            found = [doc_id for doc_id in ids if doc_id in self.row_of]
+            if not found:
+                return {}
+            vectors = self.matrix[[self.row_of[doc_id] for doc_id in found]].astype(np.float32)
+            return dict(zip(found, vectors))
+
+    def get_chunks(self, where: Dict) -> List[Dict[str, any]]:
+        with self._lock:
+            self._check_for_changes()
+            rows = np.flatnonzero(self._mask(where))
+            return [
+                {'id': self.ids[row], 'content': self.contents[row], 'metadata': self.metadatas[row]}
+                for row in rows
+            ]
+
+    def upsert(self, ids, embeddings, contents, metadatas) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._write() as conn:
+            if not self.dim:
+                self.dim = vectors.shape[1]
+            new_count = sum(1 for doc_id in ids if doc_id not in self.row_of)
+            self._grow(new_count)
+
+            rows = []
+            for doc_id in ids:
+                row = self.row_of.get(doc_id)
+                if row is None:
+                    row = self.free_rows.pop()
+                rows.append(row)
+
+            self.matrix[rows] = vectors.astype(self.dtype)
+            self.matrix.flush()
+            self._write_codes(rows, vectors)
+
+            for row, doc_id, content, metadata in zip(rows, ids, contents, metadatas):
+                self.ids[row] = doc_id
+                self.contents[row] = content
+                self.metadatas[row] = metadata
+                self.row_of[doc_id] = row
+                self.active[row] = True
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks (row, doc_id, content, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (row, doc_id, content, json.dumps(metadata))
+                    for row, doc_id, content, metadata in zip(rows, ids, contents, metadatas)
+                ]
+            )
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]) -> None:
+        with self._write() as conn:
+            updated = [
+                (doc_id, metadata) for doc_id, metadata in zip(ids, metadatas) if doc_id in self.row_of
+            ]
+            for doc_id, metadata in updated:
+                self.metadatas[self.row_of[doc_id]] = metadata
+            conn.executemany(
+                "UPDATE chunks SET metadata = ? WHERE doc_id = ?",
+                [(json.dumps(metadata), doc_id) for doc_id, metadata in updated]
+            )
+
+    def delete(self, ids: List[str]) -> None:
+        with self._write() as conn:
+            for doc_id in ids:
+                row = self.row_of.pop(doc_id, None)
+                if row is None:
+                    continue
+                self.ids[row] = self.contents[row] = self.metadatas[row] = None
+                self.active[row] = False
+                self.free_rows.append(row)
+            conn.executemany("DELETE FROM chunks WHERE doc_id = ?", [(i,) for i in ids])
+
+    def _mask(self, where: Optional[Dict]) -> np.ndarray:
+        """Boolean mask of active rows matching a filter (cached per store version).
+
+        Args:
+            where: Optional metadata filter
+
+        Returns:
+            Boolean array over all matrix rows
+        """
+        if not where:
+            return self.active
+
+        key = (json.dumps(where, sort_keys=True), self._version)
+        mask = self._filter_masks.get(key)
+        if mask is None:
+            mask = np.zeros(self.capacity, dtype=bool)
+            for row in np.flatnonzero(self.active):
+                mask[row] = matches_filter(self.metadatas[row], where)
+            self._filter_masks.put(key, mask)
+        return mask
+
+    def query(self, embeddings, top_k, where=None) -> List[List[Dict[str, any]]]:
+        if not self.count() or self.matrix is None:
+            return [[] for _ in embeddings]
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        # Snapshot under the lock, then score without it so searches run concurrently
+        with self._lock:
+            self._check_for_changes()
+            if self.matrix is None:
+                return [[] for _ in embeddings]
+            candidates = np.flatnonzero(self._mask(where))
+            matrix, codes, scales = self.matrix, self.codes, self.scales
+            ids, contents, metadatas = self.ids, self.contents, self.metadatas
+        if not len(candidates):
+            return [[] for _ in embeddings]
+
+        # Blocked (approximate, if quantized) similarity: (n_candidates, n_queries)
+        scores = np.empty((len(candidates), len(queries)), dtype=np.float32)
+        for start in range(0, len(candidates), self.SEARCH_BLOCK_ROWS):
+            block = candidates[start:start + self.SEARCH_BLOCK_ROWS]
+            scores[start:start + len(block)] = self._block_scores(block, queries, matrix, codes, scales)
+
+        k = min(top_k, len(candidates))
+        shortlist_size = k if self.quantization == "none" else min(
+            len(candidates), k * self.rescore_factor
+        )
+        ranked_lists = []
+        for q in range(len(queries)):
+            column = scores[:, q]
+            top = np.argpartition(-column, shortlist_size - 1)[:shortlist_size]
+            if self.quantization == "none":
+                similarity = column[top]
+            else:
+                # Exact rescoring of the shortlist against the full-precision rows
+                similarity = matrix[candidates[top]].astype(np.float32) @ queries[q]
+            order = np.argsort(-similarity)[:k]
+            ranked_lists.append([
+                {
+                    'content': contents[candidates[top[i]]],
+                    'metadata': metadatas[candidates[top[i]]],
+                    # Squared L2 between unit vectors, matching Chroma's default space
+                    'distance': float(2.0 - 2.0 * similarity[i]),
+                    'id': ids[candidates[top[i]]]
+                }
+                for i in order
+            ])
+        return ranked_lists
+
+    def _block_scores(self, rows: np.ndarray, queries: np.ndarray, matrix, codes, scales) -> np.ndarray:
+        """Similarity of a block of rows to each query, higher is closer.
+
+        Without quantization this is the exact inner product; with int8 codes
+        it is the inner product of the dequantized rows, and with binary codes
+        the negated Hamming distance between sign bits.
+
+        Args:
+            rows: Row indices
+            queries: Normalized float32 queries of shape (n_queries, dim)
+            matrix: Full-precision matrix snapshot
+            codes: Quantized codes snapshot (None without quantization)
+            scales: int8 scales snapshot (None unless int8)
+
+        Returns:
+            float32 array of shape (len(rows), n_queries)
+        """
+        if self.quantization == "int8":
+            return (codes[rows].astype(np.float32) @ queries.T) * scales[rows][:, None]
+        if self.quantization == "binary":
+            block = codes[rows]
+            query_bits = quantize_binary(queries)
+            return -np.stack([
+                _POPCOUNT[np.bitwise_xor(block, bits)].sum(axis=1, dtype=np.int32)
+                for bits in query_bits
+            ], axis=1).astype(np.float32)
+        return matrix[rows].astype(np.float32) @ queries.T
+
+    def index_bytes(self) -> int:
+        """Bytes scanned per search over all rows (the hot, resident part of the store)."""
+        if self.matrix is None:
+            return 0
+        if self.quantization == "none":
+            return self.matrix.nbytes
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def iter_chunks(self, batch_size: int = LOOKUP_BATCH_SIZE):
+        with self._lock:
+            self._check_for_changes()
+            rows = list(np.flatnonzero(self.active))
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            yield (
+                [self.ids[r] for r in batch],
+                [self.contents[r] for r in batch],
+                [self.metadatas[r] for r in batch]
+            )
+
+    def get_info(self, key: str) -> Optional[str]:
+        with self.get_connection() as conn:
+            row = conn.execute("SELECT value FROM store_info WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_info(self, key: str, value: str) -> None:
+        with self.get_connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO store_info (key, value) VALUES (?, ?)", (key, value))
+            conn.commit()
+
+    def reset(self) -> None:
+        self.drop()
+
+    def drop(self) -> None:
+        with self._write() as conn:
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM store_info")
+            for attr, path, _, _ in self._arrays():
+                setattr(self, attr, None)
+                if path.exists():
+                    path.unlink()
+            # Keep the generation increasing so other processes notice the reset
+            generation = self.generation
+            self._load(conn)
+            self.generation = generation
+
+
+def create_backend(backend: str, embedding_function) -> VectorBackend:
+    """Create the configured storage backend.
+
+    Args:
+        backend: "chroma" or "numpy"
+        embedding_function: Embedding function (registered with Chroma collections)
+
+    Returns:
+        VectorBackend instance
+    """
+    if backend == "numpy":
+        return NumpyBackend(
+            settings.numpy_store_dir,
+            settings.collection_name,
+            dtype=settings.numpy_store_dtype,
+            quantization=settings.numpy_store_quantization,
+            rescore_factor=settings.quantization_rescore_factor
+        )
+    if backend == "chroma":
+        return ChromaBackend(settings.chroma_path, settings.collection_name, embedding_function)
+    raise ValueError(f"Unknown vector backend: {backend}")
@@ -1,124 +1,765 @@
-"""Vector store operations using ChromaDB for RAG retrieval."""
+"""Vector store operations for RAG retrieval (ChromaDB or exact NumPy backend)."""
+import hashlib
+import time
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+import numpy as np
 from chromadb.utils import embedding_functions
 from loguru import logger
 from config import settings
+from embedding_cache import EmbeddingCache
+from cache import LRUCache
+from lexical_index import LexicalIndex
+from retrieval import reciprocal_rank_fusion, matches_filter, maximal_marginal_relevance, adaptive_cutoff
+from vector_backends import create_backend, LOOKUP_BATCH_SIZE
+from deadline import Deadline
+
+# Prefix of chunk IDs written before IDs were content-addressed
+LEGACY_ID_PREFIX = "doc_"
+
+# Collection info key recording that legacy IDs have been migrated
+LEGACY_MIGRATED_KEY = "legacy_ids_migrated"
 
 
 class VectorStore:
-    """Manage vector embeddings and similarity search using ChromaDB."""
-
-    def __init__(self):
-        """Initialize ChromaDB client and collection."""
-        # Ensure the chroma_db directory exists
-        settings.chroma_path.mkdir(parents=True, exist_ok=True)
-
-        # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(
-            path=str(settings.chroma_path),
-            settings=ChromaSettings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
-        )
+    """Manage vector embeddings and similarity search.
 
+    Embedding, caching and hybrid ranking live here; chunk storage and
+    nearest-neighbour search are delegated to a pluggable backend selected
+    with settings.vector_backend ("chroma" or "numpy").
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        """Initialize the embedding function, caches and storage backend.
+
+        Args:
+            backend: Backend name (defaults to settings.vector_backend)
+        """
         # Initialize embedding function
         self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
             model_name=settings.embedding_model
         )
 
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name=settings.collection_name,
-            embedding_function=self.embedding_function,
-            metadata={"description": "CTLChat RAG document embeddings"}
+        # Persistent embedding cache shared by ingestion and query embedding
+        self.embedding_cache = None
+        if settings.embedding_cache_enabled:
+            self.embedding_cache = EmbeddingCache(
+                str(settings.embedding_cache_file),
+                max_bytes=settings.embedding_cache_max_mb * 1_048_576
+            )
+
+        # In-process cache of query text -> embedding
+        self.query_embedding_cache = LRUCache(
+            maxsize=settings.query_cache_size,
+            ttl_seconds=settings.query_cache_ttl_seconds
         )
 
-        logger.info(f"Initialized ChromaDB collection: {settings.collection_name}")
+        # Bumped whenever the collection contents change, so that callers
+        # caching search results can tell when they are stale
+        self.generation = 0
+
+        # Chunk storage and nearest-neighbour search
+        self.backend = create_backend(backend or settings.vector_backend, self.embedding_function)
+
+        # BM25 index over chunk text, maintained alongside the collection
+        self.lexical_index = LexicalIndex(str(settings.lexical_index_file))
+        if self.lexical_index.count() != self.get_collection_count():
+            self.rebuild_lexical_index()
+
+        self.migrate_legacy_ids()
+
+        logger.info(f"Initialized vector store ({self.backend.name}): {settings.collection_name}")
 
-    def add_documents(self, documents: List[Dict[str, any]]) -> None:
+    def rebuild_lexical_index(self) -> None:
+        """Rebuild the lexical index from the chunks stored in the collection."""
+        logger.info("Rebuilding lexical index from collection...")
+        self.lexical_index.clear()
+
+        total = 0
+        for ids, contents, metadatas in self.backend.iter_chunks():
+            self.lexical_index.upsert(ids, contents, metadatas)
+            total += len(ids)
+
+        logger.info(f"Lexical index rebuilt with {total} chunks")
+
+    def migrate_legacy_ids(self) -> int:
+        """Move chunks stored under legacy IDs to content-addressed IDs.
+
+        Chunks written before IDs were content-addressed ('doc_<i>_<hash>')
+        carry no 'source_key' or 'content_digest', so re-ingesting their
+        source would neither skip nor prune them. They are re-keyed to the
+        IDs add_documents() would give them, keeping their stored embeddings;
+        duplicates collapse onto one chunk. The collection is only scanned
+        until the migration has completed once, which is recorded with the
+        collection.
+
+        Returns:
+            Number of legacy chunks migrated
+        """
+        if self.backend.get_info(LEGACY_MIGRATED_KEY):
+            return 0
+
+        legacy = {}
+        for ids, contents, metadatas in self.backend.iter_chunks():
+            for doc_id, content, metadata in zip(ids, contents, metadatas):
+                if doc_id.startswith(LEGACY_ID_PREFIX):
+                    legacy[doc_id] = (content, metadata or {})
+
+        legacy_ids = list(legacy)
+        for start in range(0, len(legacy_ids), LOOKUP_BATCH_SIZE):
+            batch = legacy_ids[start:start + LOOKUP_BATCH_SIZE]
+            embeddings = self.backend.get_embeddings(batch)
+
+            chunks = {}
+            for doc_id in batch:
+                if doc_id not in embeddings:
+                    continue
+                content, metadata = legacy[doc_id]
+                metadata = dict(metadata)
+                metadata['content_digest'] = content_digest(content)
+                metadata['source_key'] = make_source_key(metadata)
+                chunks.setdefault(make_chunk_id(metadata), (content, metadata, embeddings[doc_id]))
+
+            # A chunk already stored under its new ID (re-ingested since) wins
+            stored = self.backend.get_metadatas(list(chunks))
+            new_ids = [doc_id for doc_id in chunks if doc_id not in stored]
+            if new_ids:
+                contents = [chunks[doc_id][0] for doc_id in new_ids]
+                metadatas = [chunks[doc_id][1] for doc_id in new_ids]
+                self.backend.upsert(new_ids, [chunks[doc_id][2] for doc_id in new_ids], contents, metadatas)
+                self.lexical_index.upsert(new_ids, contents, metadatas)
+            self.backend.delete(batch)
+            self.lexical_index.delete(batch)
+
+        if legacy_ids:
+            self.generation += 1
+            logger.info(f"Migrated {len(legacy_ids)} chunks stored under legacy IDs")
+        self.backend.set_info(LEGACY_MIGRATED_KEY, "true")
+        return len(legacy_ids)
+
+    def add_documents(
+        self,
+        documents: List[Dict[str, any]],
+        batch_size: Optional[int] = None,
+        workers: Optional[int] = None
+    ) -> Dict[str, any]:
         """Add documents to the vector store.
 
+        Each chunk gets a stable, content-addressed ID derived from its source,
+        chunk index and content digest, and is written with upsert semantics.
+        Chunks already stored with the same digest are skipped before any
+        embedding work (only their metadata is rewritten if it changed, e.g.
+        a new visibility), and chunks left over from a previous version of a
+        re-ingested source are removed. Chunks stored under the legacy
+        'doc_<i>_<hash>' IDs are migrated once at startup
+        (see migrate_legacy_ids), so they are skipped and pruned the same way.
+
+        Documents are embedded in batches, optionally spread across a pool of
+        worker threads, and each batch is written to the collection as soon as
+        its embeddings are ready.
+
         Args:
             documents: List of document dictionaries with 'content' and 'metadata'
+            batch_size: Documents per embedding batch (defaults to settings.embedding_batch_size)
+            workers: Number of embedding worker threads (defaults to settings.embedding_workers)
+
+        Returns:
+            Dictionary with ingestion statistics (counts, seconds and docs/sec per stage)
         """
         if not documents:
             logger.warning("No documents to add")
-            return
+            return {"documents": 0, "batches": 0, "skipped": 0}
 
-        # Prepare data for ChromaDB
+        batch_size = max(1, batch_size or settings.embedding_batch_size)
+        workers = max(1, workers or settings.embedding_workers)
+
+        # Prepare data for the backend
         ids = []
         contents = []
         metadatas = []
+        seen_ids = set()
+        source_ids = {}
+
+        for doc in documents:
+            metadata = dict(doc.get('metadata', {}))
+            metadata['content_digest'] = content_digest(doc['content'])
+            metadata['source_key'] = make_source_key(metadata)
+
+            doc_id = make_chunk_id(metadata)
+            source_ids.setdefault(metadata['source_key'], set()).add(doc_id)
+            if doc_id in seen_ids:
+                continue
+            seen_ids.add(doc_id)
 
-        for i, doc in enumerate(documents):
-            # Create unique ID
-            doc_id = f"doc_{i}_{hash(doc['content'][:100])}"
             ids.append(doc_id)
             contents.append(doc['content'])
-            metadatas.append(doc.get('metadata', {}))
+            metadatas.append(metadata)
+
+        # Skip chunks that are already embedded with the same content, but
+        # keep their stored metadata (visibility, owner, ...) up to date
+        embedded = self._find_embedded(ids, metadatas)
+        relabelled = 0
+        if embedded:
+            changed = [
+                i for i, doc_id in enumerate(ids)
+                if doc_id in embedded and embedded[doc_id] != metadatas[i]
+            ]
+            if changed:
+                self._update_metadatas(
+                    [ids[i] for i in changed],
+                    [contents[i] for i in changed],
+                    [metadatas[i] for i in changed]
+                )
+                relabelled = len(changed)
+                logger.info(f"Updated metadata of {relabelled} unchanged chunks")
+
+            keep = [i for i, doc_id in enumerate(ids) if doc_id not in embedded]
+            ids = [ids[i] for i in keep]
+            contents = [contents[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            logger.info(f"Skipping {len(embedded)} chunks that are already embedded")
+
+        stats = {
+            "documents": len(documents),
+            "embedded": len(ids),
+            "skipped": len(embedded),
+            "relabelled": relabelled,
+            "batches": 0,
+            "batch_size": batch_size,
+            "workers": workers,
+            "embed_seconds": 0.0,
+            "write_seconds": 0.0
+        }
+        started = time.perf_counter()
 
-        # Add to collection
         try:
-            self.collection.add(
-                ids=ids,
-                documents=contents,
-                metadatas=metadatas
-            )
-            logger.info(f"Added {len(documents)} documents to vector store")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Keep a bounded number of batches in flight so memory stays
+                # proportional to batch_size * workers rather than corpus size
+                pending = deque()
+                embed_finished = started
+                for start in range(0, len(contents), batch_size):
+                    end = start + batch_size
+                    future = pool.submit(self._embed_batch, contents[start:end])
+                    pending.append((start, end, future))
+                    if len(pending) >= workers * 2:
+                        embed_finished = max(
+                            embed_finished,
+                            self._write_batch(pending.popleft(), ids, contents, metadatas, stats)
+                        )
+
+                while pending:
+                    embed_finished = max(
+                        embed_finished,
+                        self._write_batch(pending.popleft(), ids, contents, metadatas, stats)
+                    )
+
+            # Wall-clock span of the embedding phase; batches overlap across
+            # workers, so summing their durations would under-report throughput
+            stats["embed_seconds"] = embed_finished - started
         except Exception as e:
             logger.error(f"Error adding documents to vector store: {e}")
             raise
 
+        stats["pruned"] = self._prune_stale_chunks(source_ids)
+        if stats["batches"] or stats["pruned"] or stats["relabelled"]:
+            self.generation += 1
+        stats["total_seconds"] = time.perf_counter() - started
+        stats["embed_docs_per_sec"] = _rate(len(ids), stats["embed_seconds"])
+        stats["write_docs_per_sec"] = _rate(len(ids), stats["write_seconds"])
+        stats["docs_per_sec"] = _rate(len(ids), stats["total_seconds"])
+
+        logger.info(
+            f"Added {len(ids)} documents to vector store in {stats['batches']} batches, "
+            f"skipped {stats['skipped']} unchanged, pruned {stats['pruned']} stale "
+            f"(embed: {stats['embed_docs_per_sec']:.1f} docs/sec, "
+            f"write: {stats['write_docs_per_sec']:.1f} docs/sec, "
+            f"overall: {stats['docs_per_sec']:.1f} docs/sec)"
+        )
+        return stats
+
+    def _find_embedded(self, ids: List[str], metadatas: List[Dict]) -> Dict[str, Dict]:
+        """Find chunks that are already stored with the same content digest.
+
+        Args:
+            ids: Chunk IDs to look up
+            metadatas: Chunk metadata (carrying 'content_digest'), aligned with ids
+
+        Returns:
+            Mapping of each ID that does not need to be embedded again to its stored metadata
+        """
+        digests = {doc_id: meta['content_digest'] for doc_id, meta in zip(ids, metadatas)}
+        stored = self.backend.get_metadatas(ids)
+
+        return {
+            doc_id: metadata for doc_id, metadata in stored.items()
+            if metadata.get('content_digest') == digests.get(doc_id)
+        }
+
+    def _update_metadatas(self, ids: List[str], contents: List[str], metadatas: List[Dict]) -> None:
+        """Rewrite the metadata of stored chunks without embedding them again.
+
+        Args:
+            ids: Chunk IDs
+            contents: Chunk texts (the lexical index stores text and metadata together)
+            metadatas: New chunk metadata
+        """
+        self.backend.update_metadatas(ids, metadatas)
+        self.lexical_index.upsert(ids, contents, metadatas)
+
+    def _prune_stale_chunks(self, source_ids: Dict[str, set]) -> int:
+        """Delete chunks of re-ingested sources that are no longer present.
+
+        Args:
+            source_ids: Mapping of source key to the chunk IDs it now contains
+
+        Returns:
+            Number of chunks deleted
+        """
+        pruned = 0
+        for key, current_ids in source_ids.items():
+            stale = [
+                doc_id for doc_id in self.backend.get_ids({"source_key": key})
+                if doc_id not in current_ids
+            ]
+            if stale:
+                self.backend.delete(stale)
+                self.lexical_index.delete(stale)
+                pruned += len(stale)
+        return pruned
+
+    def _embed_batch(self, texts: List[str]) -> tuple:
+        """Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Tuple of (embeddings, seconds spent embedding, perf_counter() when done)
+        """
+        started = time.perf_counter()
+        embeddings = self.embed_texts(texts)
+        finished = time.perf_counter()
+        return embeddings, finished - started, finished
+
+    def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed texts, consulting the persistent embedding cache first.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of embeddings aligned with texts
+        """
+        if self.embedding_cache is None:
+            return [np.asarray(e, dtype=np.float32) for e in self.embedding_function(texts)]
+
+        digests = [content_digest(text) for text in texts]
+        cached = self.embedding_cache.get_many(settings.embedding_model, digests)
+
+        missing = {}
+        for text, digest in zip(texts, digests):
+            if digest not in cached and digest not in missing:
+                missing[digest] = text
+
+        if missing:
+            computed = self.embedding_function(list(missing.values()))
+            fresh = {
+                digest: np.asarray(embedding, dtype=np.float32)
+                for digest, embedding in zip(missing.keys(), computed)
+            }
+            self.embedding_cache.put_many(settings.embedding_model, fresh)
+            cached.update(fresh)
+
+        return [cached[digest] for digest in digests]
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a search query, consulting the in-process query cache first.
+
+        Args:
+            query: Query text
+
+        Returns:
+            Query embedding
+        """
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """Embed several search queries in one batch, using the query cache.
+
+        Args:
+            queries: Query texts
+
+        Returns:
+            Query embeddings aligned with queries
+        """
+        embeddings = {}
+        missing = []
+        for query in queries:
+            if query in embeddings:
+                continue
+            embedding = self.query_embedding_cache.get(query)
+            if embedding is None:
+                missing.append(query)
+            embeddings[query] = embedding
+
+        if missing:
+            for query, embedding in zip(missing, self.embed_texts(missing)):
+                self.query_embedding_cache.put(query, embedding)
+                embeddings[query] = embedding
+
+        return [embeddings[query] for query in queries]
+
+    def _write_batch(
+        self,
+        item: tuple,
+        ids: List[str],
+        contents: List[str],
+        metadatas: List[Dict],
+        stats: Dict[str, any]
+    ) -> float:
+        """Wait for an embedded batch and write it to the collection.
+
+        Args:
+            item: Tuple of (start, end, future) for the batch
+            ids: All document IDs
+            contents: All document texts
+            metadatas: All document metadata
+            stats: Ingestion statistics to update in place
+
+        Returns:
+            perf_counter() time at which the batch finished embedding
+        """
+        start, end, future = item
+        embeddings, embed_seconds, embed_finished = future.result()
+
+        started = time.perf_counter()
+        self.backend.upsert(ids[start:end], embeddings, contents[start:end], metadatas[start:end])
+        self.lexical_index.upsert(ids[start:end], contents[start:end], metadatas[start:end])
+        write_seconds = time.perf_counter() - started
+
+        stats["batches"] += 1
+        stats["write_seconds"] += write_seconds
+        logger.debug(
+            f"Batch {stats['batches']}: {end - start} docs "
+            f"(embed {embed_seconds:.2f}s, write {write_seconds:.2f}s)"
+        )
+        return embed_finished
+
     def search(
         self,
         query: str,
         top_k: Optional[int] = None,
-        filter_metadata: Optional[Dict] = None
+        filter_metadata: Optional[Dict] = None,
+        mode: Optional[str] = None,
+        diversify: Optional[bool] = None,
+        stats: Optional[Dict[str, any]] = None,
+        deadline: Optional[Deadline] = None
     ) -> List[Dict[str, any]]:
-        """Search for similar documents using semantic similarity.
+        """Search for similar documents.
+
+        In "dense" mode this is pure semantic similarity. In "hybrid" mode the
+        dense results are fused with BM25 lexical results using reciprocal
+        rank fusion, which recovers exact matches on names and acronyms.
+        With diversification, extra candidates are fetched and re-ranked with
+        maximal marginal relevance so overlapping chunks don't crowd the top_k.
+        With adaptive top_k, irrelevant tail results are cut by distance.
+        Diversification is skipped once a deadline leaves no time for it.
 
         Args:
             query: Search query text
             top_k: Number of results to return (defaults to settings.top_k_results)
             filter_metadata: Optional metadata filters
+            mode: "dense" or "hybrid" (defaults to settings.search_mode)
+            diversify: Apply MMR re-ranking (defaults to settings.mmr_enabled)
+            stats: Optional dict filled with candidate/returned/dropped counts
+            deadline: Optional request deadline
 
         Returns:
             List of retrieved documents with content, metadata, and relevance scores
         """
         top_k = top_k or settings.top_k_results
+        mode = mode or settings.search_mode
+        diversify = settings.mmr_enabled if diversify is None else diversify
+        diversify = diversify and self._mmr_within_deadline(deadline, stats)
+        fetch = top_k * settings.mmr_candidate_multiplier if diversify else top_k
 
-        try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=top_k,
-                where=filter_metadata
+        if mode == "hybrid":
+            retrieved_docs = self._hybrid_search(query, fetch, filter_metadata)
+        else:
+            retrieved_docs = self._dense_search(query, fetch, filter_metadata)
+
+        if diversify:
+            retrieved_docs = self._diversify([query], retrieved_docs, top_k)
+
+        retrieved_docs = self._apply_cutoff(retrieved_docs[:top_k], stats)
+        logger.info(f"Retrieved {len(retrieved_docs)} documents for query ({mode})")
+        return retrieved_docs
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: Optional[int] = None,
+        filter_metadata: Optional[Dict] = None,
+        mode: Optional[str] = None,
+        diversify: Optional[bool] = None,
+        stats: Optional[Dict[str, any]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, any]]:
+        """Search several queries at once and fuse the results.
+
+        All queries are embedded in one batch and sent in a single
+        collection query, so several intents cost about one search. Results
+        are deduplicated by ID and fused with reciprocal rank fusion; in
+        hybrid mode each query's lexical ranking joins the fusion too.
+
+        Args:
+            queries: Search query texts (duplicates and blanks are ignored)
+            top_k: Number of fused results to return (defaults to settings.top_k_results)
+            filter_metadata: Optional metadata filters
+            mode: "dense" or "hybrid" (defaults to settings.search_mode)
+            diversify: Apply MMR re-ranking (defaults to settings.mmr_enabled)
+            stats: Optional dict filled with candidate/returned/dropped counts
+            deadline: Optional request deadline (see search())
+
+        Returns:
+            Fused list of retrieved documents
+        """
+        top_k = top_k or settings.top_k_results
+        mode = mode or settings.search_mode
+        diversify = settings.mmr_enabled if diversify is None else diversify
+        diversify = diversify and self._mmr_within_deadline(deadline, stats)
+        queries = [q for q in dict.fromkeys(q.strip() for q in queries) if q]
+        if not queries:
+            return []
+
+        fetch = top_k * settings.mmr_candidate_multiplier if diversify else top_k
+        candidates = fetch * settings.hybrid_candidate_multiplier if mode == "hybrid" else fetch
+        ranked_lists = self._dense_search_many(queries, candidates, filter_metadata)
+        if mode == "hybrid":
+            ranked_lists += [
+                self._filtered_lexical_search(query, candidates, filter_metadata)
+                for query in queries
+            ]
+
+        retrieved_docs = reciprocal_rank_fusion(ranked_lists, top_k=fetch, k=settings.rrf_k)
+        if diversify:
+            retrieved_docs = self._diversify(queries, retrieved_docs, top_k)
+        retrieved_docs = self._apply_cutoff(retrieved_docs[:top_k], stats)
+        logger.info(f"Retrieved {len(retrieved_docs)} documents for {len(queries)} queries ({mode})")
+        return retrieved_docs
+
+    def _apply_cutoff(
+        self,
+        docs: List[Dict[str, any]],
+        stats: Optional[Dict[str, any]] = None
+    ) -> List[Dict[str, any]]:
+        """Apply the adaptive top_k distance cutoff and record what it dropped.
+
+        Args:
+            docs: Ranked results
+            stats: Optional dict receiving candidate/returned/dropped counts
+
+        Returns:
+            Kept results
+        """
+        kept = docs
+        if settings.adaptive_k_enabled:
+            kept = adaptive_cutoff(
+                docs,
+                settings.adaptive_max_distance,
+                settings.adaptive_max_gap,
+                settings.adaptive_min_k
             )
+            if len(kept) < len(docs):
+                logger.info(f"Adaptive top_k dropped {len(docs) - len(kept)} of {len(docs)} results")
+
+        if stats is not None:
+            stats["candidates"] = len(docs)
+            stats["returned"] = len(kept)
+            stats["dropped_by_cutoff"] = len(docs) - len(kept)
+        return kept
+
+    def _mmr_within_deadline(
+        self,
+        deadline: Optional[Deadline],
+        stats: Optional[Dict[str, any]] = None
+    ) -> bool:
+        """Check whether a deadline leaves time for MMR, recording the degradation if not.
+
+        Args:
+            deadline: Optional request deadline
+            stats: Optional dict receiving 'mmr_skipped'
+
+        Returns:
+            True if diversification should run
+        """
+        if deadline is None or deadline.allows():
+            return True
+        deadline.degrade("mmr", "no time left for diversification")
+        if stats is not None:
+            stats["mmr_skipped"] = True
+        return False
+
+    def _diversify(
+        self,
+        queries: List[str],
+        docs: List[Dict[str, any]],
+        top_k: int
+    ) -> List[Dict[str, any]]:
+        """Pick a diverse top_k from ranked candidates with maximal marginal relevance.
+
+        Args:
+            queries: Query texts the candidates were retrieved for
+            docs: Ranked candidate documents
+            top_k: Number of documents to keep
+
+        Returns:
+            Selected documents in MMR order (the leading candidates on failure)
+        """
+        if len(docs) <= top_k:
+            return docs
+
+        try:
+            embeddings = self.backend.get_embeddings([doc['id'] for doc in docs])
+        except Exception as e:
+            logger.warning(f"Could not load candidate embeddings for MMR: {e}")
+            return docs[:top_k]
+
+        if len(embeddings) < len(docs):
+            return docs[:top_k]
+
+        selected = maximal_marginal_relevance(
+            np.asarray(self.embed_queries(queries)),
+            np.asarray([embeddings[doc['id']] for doc in docs]),
+            top_k,
+            settings.mmr_lambda
+        )
+        return [docs[i] for i in selected]
+
+    def _dense_search(
+        self,
+        query: str,
+        top_k: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, any]]:
+        """Search the collection by embedding similarity.
+
+        Args:
+            query: Search query text
+            top_k: Number of results to return
+            filter_metadata: Optional metadata filters
+
+        Returns:
+            List of retrieved documents ordered by distance
+        """
+        return self._dense_search_many([query], top_k, filter_metadata)[0]
 
-            # Format results
-            retrieved_docs = []
-            if results and results['documents'] and results['documents'][0]:
-                for i, content in enumerate(results['documents'][0]):
-                    retrieved_docs.append({
-                        'content': content,
-                        'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                        'distance': results['distances'][0][i] if results['distances'] else None,
-                        'id': results['ids'][0][i] if results['ids'] else None
-                    })
+    def _dense_search_many(
+        self,
+        queries: List[str],
+        top_k: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict[str, any]]]:
+        """Search the collection by embedding similarity for several queries in one call.
 
-            logger.info(f"Retrieved {len(retrieved_docs)} documents for query")
-            return retrieved_docs
+        Args:
+            queries: Search query texts
+            top_k: Number of results to return per query
+            filter_metadata: Optional metadata filters
 
+        Returns:
+            One list of retrieved documents per query, each ordered by distance
+        """
+        try:
+            return self.backend.query(self.embed_queries(queries), top_k, filter_metadata)
         except Exception as e:
             logger.error(f"Error searching vector store: {e}")
-            return []
+            return [[] for _ in queries]
+
+    def _hybrid_search(
+        self,
+        query: str,
+        top_k: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, any]]:
+        """Fuse dense and BM25 lexical rankings with reciprocal rank fusion.
+
+        Args:
+            query: Search query text
+            top_k: Number of results to return
+            filter_metadata: Optional metadata filters
+
+        Returns:
+            List of fused documents
+        """
+        candidates = top_k * settings.hybrid_candidate_multiplier
+        dense_docs = self._dense_search(query, candidates, filter_metadata)
+
+        lexical_docs = self._filtered_lexical_search(query, candidates, filter_metadata)
+
+        return reciprocal_rank_fusion([dense_docs, lexical_docs], top_k=top_k, k=settings.rrf_k)
+
+    def _filtered_lexical_search(
+        self,
+        query: str,
+        top_k: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, any]]:
+        """Run a lexical search, oversampling so filtered queries still fill top_k.
+
+        The FTS index cannot apply metadata filters itself, so candidates are
+        fetched in growing rounds and filtered until enough survive or the
+        index runs out of matches.
+
+        Args:
+            query: Search query text
+            top_k: Number of results wanted after filtering
+            filter_metadata: Optional metadata filters
+
+        Returns:
+            Up to top_k lexical results satisfying the filter
+        """
+        if not filter_metadata:
+            return self.lexical_index.search(query, top_k)
+
+        fetch = top_k * settings.filter_oversample_factor
+        for _ in range(3):
+            raw = self.lexical_index.search(query, fetch)
+            filtered = [doc for doc in raw if matches_filter(doc['metadata'], filter_metadata)]
+            if len(filtered) >= top_k or len(raw) < fetch:
+                break
+            fetch *= settings.filter_oversample_factor
+
+        return filtered[:top_k]
+
+    def get_chunks_by_index(self, wanted: Dict[tuple, List[int]]) -> List[Dict[str, any]]:
+        """Fetch specific chunks of documents by chunk_index.
+
+        Args:
+            wanted: Mapping of (metadata field, value) identifying a document
+                (see context_assembly.chunk_group) to the chunk indices to fetch
+
+        Returns:
+            List of documents with id, content and metadata
+        """
+        chunks = []
+        for (field, value), indices in wanted.items():
+            where = {"$and": [{field: value}, {"chunk_index": {"$in": sorted(set(indices))}}]}
+            try:
+                chunks.extend(self.backend.get_chunks(where))
+            except Exception as e:
+                logger.error(f"Error fetching neighbouring chunks: {e}")
+        return chunks
 
     def delete_collection(self) -> None:
         """Delete the entire collection (use with caution)."""
         try:
-            self.client.delete_collection(name=settings.collection_name)
+            self.backend.drop()
+            self.lexical_index.clear()
+            self.generation += 1
             logger.warning(f"Deleted collection: {settings.collection_name}")
         except Exception as e:
             logger.error(f"Error deleting collection: {e}")
@@ -131,7 +772,7 @@ class VectorStore:
             Number of documents in the collection
         """
         try:
-            return self.collection.count()
+            return self.backend.count()
         except Exception as e:
             logger.error(f"Error getting collection count: {e}")
             return 0
@@ -139,18 +780,100 @@ class VectorStore:
     def reset_collection(self) -> None:
         """Reset the collection (delete and recreate)."""
         try:
-            self.delete_collection()
-            self.collection = self.client.get_or_create_collection(
-                name=settings.collection_name,
-                embedding_function=self.embedding_function,
-                metadata={"description": "CTLChat RAG document embeddings"}
-            )
+            self.backend.reset()
+            self.lexical_index.clear()
+            self.generation += 1
             logger.info(f"Reset collection: {settings.collection_name}")
         except Exception as e:
             logger.error(f"Error resetting collection: {e}")
             raise
 
 
+def content_digest(text: str) -> str:
+    """Return the SHA-256 hex digest of a chunk's text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def make_source_key(metadata: Dict[str, any]) -> str:
+    """Build a stable key identifying the source a chunk belongs to.
+
+    The key covers the owner as well as the file so that two users uploading
+    files with the same name never share chunk IDs.
+
+    Args:
+        metadata: Chunk metadata
+
+    Returns:
+        Short hex key for the source
+    """
+    parts = [
+        str(metadata.get('org_id', '')),
+        str(metadata.get('user_id', '')),
+        str(metadata.get('file_path') or metadata.get('source', ''))
+    ]
+    return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def make_chunk_id(metadata: Dict[str, any]) -> str:
+    """Build a content-addressed chunk ID.
+
+    Args:
+        metadata: Chunk metadata with 'source_key', 'content_digest' and 'chunk_index'
+
+    Returns:
+        ID of the form '<source_key>:<chunk_index>:<digest prefix>'
+    """
+    return f"{metadata['source_key']}:{metadata.get('chunk_index', 0)}:{metadata['content_digest'][:16]}"
+
+
+def build_source_records(documents: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    """Summarize chunked documents into one source catalog record per source.
+
+    Args:
+        documents: Document chunks with 'content' and 'metadata'
+
+    Returns:
+        List of records matching Database.upsert_source() arguments
+    """
+    records = {}
+    for doc in documents:
+        metadata = doc.get('metadata', {})
+        key = make_source_key(metadata)
+        record = records.get(key)
+        if record is None:
+            record = records[key] = {
+                "source_key": key,
+                "source_name": metadata.get('source', 'Unknown'),
+                "chunk_count": 0,
+                "user_id": metadata.get('user_id'),
+                "org_id": metadata.get('org_id'),
+                "visibility": metadata.get('visibility', 'global'),
+                "file_type": metadata.get('file_type'),
+                "size_bytes": 0,
+                "file_path": metadata.get('file_path'),
+                "digests": []
+            }
+        record["chunk_count"] += 1
+        record["size_bytes"] += len(doc['content'].encode('utf-8'))
+        record["digests"].append(content_digest(doc['content']))
+
+    for record in records.values():
+        # Digest over the chunk digests identifies the indexed version of a source
+        record["content_digest"] = content_digest("".join(record.pop("digests")))
+
+        # Prefer the on-disk size of the original file when it is available
+        file_path = record.pop("file_path")
+        if file_path and Path(file_path).is_file():
+            record["size_bytes"] = Path(file_path).stat().st_size
+
+    return list(records.values())
+
+
+def _rate(count: int, seconds: float) -> float:
+    """Return items per second, guarding against zero durations."""
+    return count / seconds if seconds > 0 else 0.0
+
+
 # Convenience functions
 def create_vector_store() -> VectorStore:
     """Create and return a VectorStore instance."""